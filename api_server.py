@@ -1,6 +1,10 @@
-from fastapi import FastAPI, HTTPException
+from startup_profiler import install_import_hook, mark_ready, track, report as startup_report, print_report as print_startup_report
+install_import_hook()
+
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
 import uvicorn
 import json
@@ -12,25 +16,34 @@ import pickle
 import numpy as np
 import pandas as pd
 from datetime import datetime, timezone
-from typing import List, Dict, Optional
-import openai
+from typing import List, Dict, Optional, Literal
+import threading
+from collections import Counter
 
 # Add the current directory to Python path to import your existing modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Import your existing sentiment analysis functions
-from dashboard_enhanced import (
-    generate_ai_response,
-    load_model,
-    predict_sentiment
-)
+# Import the sentiment inference core (no Streamlit or dashboard dependencies)
+with track('sentiment_inference', 'import'):
+    from sentiment_inference import predict_sentiment, predict_sentiments, enhanced_preprocess_tweet
 
 # Import the new multi-source fetcher
-from reliable_data_fetcher import ReliableDataFetcher
+with track('reliable_data_fetcher', 'import'):
+    from reliable_data_fetcher import ReliableDataFetcher
 
 # Import enhanced components
-from enhanced_sentiment_analyzer import EnhancedSentimentAnalyzer
-from enhanced_ai_chat import EnhancedAIChat
+with track('enhanced_sentiment_analyzer', 'import'):
+    from enhanced_sentiment_analyzer import EnhancedSentimentAnalyzer
+with track('enhanced_ai_chat', 'import'):
+    from enhanced_ai_chat import EnhancedAIChat
+from sentiment_cascade import SentimentCascade
+from model_registry import ModelServer
+from model_router import ModelRouter
+from lexicon_store import get_lexicon_store
+from llm_client import get_llm_client, sse_events, SSE_HEADERS
+from intent_matcher import question_matcher
+from result_columns import ResultColumns, SENTIMENT_CODES, NEUTRAL_CODE, to_epoch_seconds
+from timeline_engine import build_timeline
 
 # Load environment variables
 try:
@@ -60,25 +73,73 @@ app.add_middleware(
 # Initialize components
 print("🚀 Initializing SentimentalAI - Enhanced Sentiment Analysis API...")
 
-# Load the sentiment analysis model
+# Load the active sentiment model from the registry; new versions are swapped in without a restart
 print("📊 Loading SentimentalAI ensemble model...")
-model = load_model()
+model_server = ModelServer()
+with track('ModelServer.load_active()'):
+    model_server.load_active()
+model_server.start_watcher()
+# Shadow scoring and A/B routing to a candidate version, once one is set
+model_router = ModelRouter(model_server, predict_sentiment, predict_many=predict_sentiments)
 print("✅ SentimentalAI model loaded successfully!")
 
 # Initialize the reliable data fetcher
 print("🔗 Initializing reliable data fetcher...")
-data_fetcher = ReliableDataFetcher()
+with track('ReliableDataFetcher()'):
+    data_fetcher = ReliableDataFetcher()
 print("✅ Reliable data fetcher initialized!")
 
 # Initialize enhanced components
 print("🧠 Initializing enhanced sentiment analyzer...")
-enhanced_analyzer = EnhancedSentimentAnalyzer()
+with track('EnhancedSentimentAnalyzer()'):
+    enhanced_analyzer = EnhancedSentimentAnalyzer()
 print("✅ Enhanced sentiment analyzer initialized!")
 
+# Pick up lexicon edits without a restart
+get_lexicon_store().start_watcher()
+
+# Lexicon first, ensemble model only for items the lexicon is unsure about
+sentiment_cascade = SentimentCascade(enhanced_analyzer, lambda text: model_router.predict(text)[:2])
+
+# Optional incremental learning from confidently scored traffic. Updates that pass the learner's
+# holdout check are shadowed against the served model, never swapped in directly; promote one
+# by registering it (POST /api/online/register) and activating that version.
+online_learner = None
+if os.getenv('ONLINE_LEARNING', 'false').lower() == 'true':
+    # Imported only when enabled: the SGD model pulls in most of scikit-learn
+    from online_learner import OnlineSentimentLearner
+    
+    def publish_online_model(new_model, info):
+        # Leave a candidate chosen by an operator in place
+        current = model_router.candidate_version
+        if current is None or current.startswith('online-'):
+            model_router.set_candidate(new_model, f"online-v{info['version']}")
+    
+    try:
+        online_learner = OnlineSentimentLearner(preprocess=enhanced_preprocess_tweet, on_publish=publish_online_model)
+        online_learner.start()
+        print("📚 Online learning enabled")
+    except ValueError as e:
+        print(f"⚠️ Online learning disabled: {e}")
+
 print("💬 Initializing SentimentalAI chat assistant...")
-enhanced_chat = EnhancedAIChat()
+with track('EnhancedAIChat()'):
+    enhanced_chat = EnhancedAIChat()
 print("✅ SentimentalAI chat assistant initialized!")
 
+mark_ready()
+print_startup_report()
+
+@app.on_event("startup")
+async def warm_up_components():
+    """Optionally load the spaCy NER pipeline in the background so the first chat is fast"""
+    if os.getenv('WARM_UP_NLP', '').lower() in ('1', 'true', 'yes'):
+        def warm_up():
+            with track('EnhancedAIChat.warm_up()', 'warm-up'):
+                enhanced_chat.warm_up()
+            print("🔥 NLP pipeline warmed up")
+        threading.Thread(target=warm_up, name='nlp-warm-up', daemon=True).start()
+
 def analyze_sentiment_batch_api(model, texts, original_data=None):
     """Analyze sentiment for a batch of texts - API version without Streamlit dependencies."""
     results = []
@@ -136,13 +197,12 @@ def perform_sentiment_analysis_api(data, model):
     negative_percentage = (negative_count / total) * 100 if total > 0 else 0
     neutral_percentage = (neutral_count / total) * 100 if total > 0 else 0
     
-    # Create timeline data
-    timeline = {
-        'time': [f"Hour {i}" for i in range(1, 25)],
-        'positive': [random.randint(10, 50) for _ in range(24)],
-        'negative': [random.randint(5, 30) for _ in range(24)],
-        'neutral': [random.randint(15, 40) for _ in range(24)]
-    }
+    # Create timeline data from the scored items' timestamps
+    now = datetime.now(timezone.utc)
+    timestamps = np.array([to_epoch_seconds(result['created_at'], now.timestamp()) for result in results])
+    sentiment_codes = np.array([SENTIMENT_CODES.get(sentiment, NEUTRAL_CODE) for sentiment in sentiments], dtype=np.int64)
+    timeline = build_timeline(timestamps, sentiment_codes, 'hour', window=24, end=now,
+                              labels=('positive', 'negative', 'neutral'))
     
     # Create sample tweets
     sample_tweets = []
@@ -166,9 +226,9 @@ def perform_sentiment_analysis_api(data, model):
 def generate_openai_response(prompt, analysis_results):
     """Generate a response from OpenAI API based on the prompt and real-time analysis results."""
     try:
-        openai.api_key = os.getenv('OPENAI_API_KEY')
+        llm = get_llm_client()
         
-        if not openai.api_key:
+        if llm is None:
             return "OpenAI API key not configured. Please set OPENAI_API_KEY in your environment."
         
         # Build context from analysis results
@@ -216,19 +276,17 @@ Guidelines:
 
 User question: {prompt}"""
         
-        # Make the OpenAI API call
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
+        # Shared client: pooled connections, timeouts, retries and the concurrency limit
+        return llm.complete(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt}
             ],
+            model="gpt-3.5-turbo",
             max_tokens=300,
             temperature=0.7
         )
         
-        return response.choices[0].message.content.strip()
-        
     except Exception as e:
         print(f"OpenAI API error: {e}")
         # Fallback to basic response if OpenAI fails
@@ -243,6 +301,11 @@ class AnalysisRequest(BaseModel):
     query: str
     max_tweets: Optional[int] = 100
     use_real_data: Optional[bool] = False
+    cascade: Optional[bool] = True
+    cascade_threshold: Optional[float] = None
+    timeline_resolution: Literal['minute', 'hour', 'day'] = 'hour'
+    timeline_window: Optional[int] = Field(24, ge=1, le=2000)
+    timeline_rolling: int = Field(1, ge=1, le=168)
 
 class AnalysisResponse(BaseModel):
     total_tweets: int
@@ -254,6 +317,10 @@ class AnalysisResponse(BaseModel):
     platform_breakdown: dict
     success: bool
     message: str
+    cascade_stats: Optional[dict] = None
+    lexicon_version: Optional[str] = None
+    # Model version -> number of items it scored in this request
+    sentiment_model_versions: Optional[Dict[str, int]] = None
 
 class ChatRequest(BaseModel):
     message: str
@@ -262,6 +329,7 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     success: bool
+    intents: Optional[List[dict]] = None
 
 @app.get("/")
 async def root():
@@ -299,90 +367,104 @@ async def analyze_sentiment(request: AnalysisRequest):
         
         # Perform enhanced sentiment analysis
         print("Starting enhanced sentiment analysis...")
-        enhanced_results = []
+        enhanced_analyses = enhanced_analyzer.analyze_batch(texts)
         
-        for i, text in enumerate(texts):
-            # Get enhanced sentiment analysis
-            enhanced_analysis = enhanced_analyzer.analyze_enhanced_sentiment(text)
-            
-            # Get basic sentiment for compatibility
-            basic_sentiment, confidence = predict_sentiment(model, text)
-            
-            enhanced_results.append({
-                'text': text,
-                'basic_sentiment': basic_sentiment,
-                'enhanced_sentiment': enhanced_analysis['primary_sentiment'],
-                'intensity': enhanced_analysis['intensity'],
-                'confidence': enhanced_analysis['confidence'],
-                'categories': enhanced_analysis['enhanced_categories'],
-                'context': enhanced_analysis['context'],
-                'created_at': raw_data[i]['created_at'] if i < len(raw_data) else datetime.now().replace(tzinfo=timezone.utc),
-                'platform': raw_data[i].get('platform', 'unknown'),
-                'user': raw_data[i].get('user', f'user_{i}')
-            })
+        # Get basic sentiment for compatibility, escalating to the model only when needed.
+        # One served-model snapshot for the whole batch, even if a new version is swapped in meanwhile
+        served = model_server.current()
+        cascade_stats = None
+        if request.cascade:
+            basic_results, cascade_stats = sentiment_cascade.score_batch(
+                texts, enhanced_analyses, request.cascade_threshold,
+                predict_batch=lambda batch: model_router.predict_batch(batch, served)
+            )
+            print(f"Cascade escalated {cascade_stats['escalated_items']}/{cascade_stats['total_items']} items to the model")
+        else:
+            basic_results = [
+                {'sentiment': basic_sentiment, 'confidence': confidence, 'stage': 'model', 'model_version': version}
+                for basic_sentiment, confidence, version in model_router.predict_batch(texts, served)
+            ]
+        # Candidate routing can answer some items, so the batch may have been served by several versions;
+        # with no model loaded there is no version to report
+        model_versions = Counter(result['model_version'] for result in basic_results
+                                 if result['stage'] == 'model' and result['model_version'] is not None)
+        
+        if online_learner is not None and served[0] is not None:
+            # Only model probabilities are on the scale of ONLINE_MIN_CONFIDENCE; lexicon margins are not.
+            # Items answered by a routed candidate (possibly the learner's own model) are left out
+            model_scored = [idx for idx, result in enumerate(basic_results)
+                            if result['stage'] == 'model' and result['model_version'] == served[1]]
+            online_learner.submit(
+                [texts[idx] for idx in model_scored],
+                [basic_results[idx]['sentiment'] for idx in model_scored],
+                [basic_results[idx]['confidence'] for idx in model_scored]
+            )
+        
+        # Hold per-item results as columns for the aggregations below
+        columns = ResultColumns.from_items(
+            raw_data,
+            [analysis['primary_sentiment'] for analysis in enhanced_analyses],
+            [analysis['confidence'] for analysis in enhanced_analyses]
+        )
         
         # Generate enhanced sentiment summary
-        enhanced_summary = enhanced_analyzer.get_sentiment_summary(enhanced_results)
+        enhanced_summary = enhanced_analyzer.get_sentiment_summary(enhanced_analyses)
         
         print("Enhanced sentiment analysis completed")
         
         # Create platform breakdown
-        platform_breakdown = {}
-        for item in raw_data:
-            platform = item['platform']
-            if platform not in platform_breakdown:
-                platform_breakdown[platform] = 0
-            platform_breakdown[platform] += 1
+        platform_breakdown = columns.platform_counts()
         
         # Create enhanced sample tweets
         sample_tweets = []
-        for i, result in enumerate(enhanced_results[:5]):
+        for i in range(min(5, len(texts))):
+            analysis = enhanced_analyses[i]
+            created_at = raw_data[i].get('created_at')
             sample_tweets.append({
-                'text': result['text'][:200] + ('...' if len(result['text']) > 200 else ''),
-                'sentiment': result['enhanced_sentiment'],
-                'intensity': result['intensity'],
-                'categories': result['categories'],
-                'platform': result['platform'],
-                'user': result['user'],
-                'created_at': result['created_at'].isoformat() if hasattr(result['created_at'], 'isoformat') else str(result['created_at'])
+                'text': texts[i][:200] + ('...' if len(texts[i]) > 200 else ''),
+                'sentiment': analysis['primary_sentiment'],
+                'intensity': analysis['intensity'],
+                'categories': analysis['enhanced_categories'],
+                'platform': raw_data[i].get('platform', 'unknown'),
+                'user': raw_data[i].get('user', f'user_{i}'),
+                'created_at': created_at.isoformat() if hasattr(created_at, 'isoformat') else str(created_at),
+                'scoring_stage': basic_results[i]['stage'],
+                'lexicon_version': analysis['lexicon_version']
             })
         
         # Calculate enhanced percentages
-        total_items = len(enhanced_results)
-        sentiment_counts = {
-            'positive': len([r for r in enhanced_results if r['enhanced_sentiment'] == 'positive']),
-            'negative': len([r for r in enhanced_results if r['enhanced_sentiment'] == 'negative']),
-            'neutral': len([r for r in enhanced_results if r['enhanced_sentiment'] == 'neutral']),
-            'critical': len([r for r in enhanced_results if r['enhanced_sentiment'] == 'critical'])
-        }
-        
-        positive_percentage = (sentiment_counts['positive'] / total_items) * 100 if total_items > 0 else 0
-        negative_percentage = (sentiment_counts['negative'] / total_items) * 100 if total_items > 0 else 0
-        neutral_percentage = (sentiment_counts['neutral'] / total_items) * 100 if total_items > 0 else 0
-        critical_percentage = (sentiment_counts['critical'] / total_items) * 100 if total_items > 0 else 0
+        total_items = len(columns)
+        percentages = columns.sentiment_percentages()
+        positive_percentage = percentages['positive_percentage']
+        negative_percentage = percentages['negative_percentage']
+        neutral_percentage = percentages['neutral_percentage']
+        critical_percentage = percentages['critical_percentage']
         
-        # Create enhanced timeline
-        timeline = {
-            'time': [f"Hour {i}" for i in range(1, 25)],
-            'positive': [random.randint(10, 50) for _ in range(24)],
-            'negative': [random.randint(5, 30) for _ in range(24)],
-            'neutral': [random.randint(15, 40) for _ in range(24)],
-            'critical': [random.randint(5, 20) for _ in range(24)]
-        }
+        # Create enhanced timeline from item timestamps
+        timeline = build_timeline(
+            columns.timestamps, columns.sentiment_codes,
+            resolution=request.timeline_resolution,
+            window=request.timeline_window,
+            rolling=request.timeline_rolling,
+            end=datetime.now(timezone.utc)
+        )
         
         print(f"Enhanced analysis complete: {total_items} items")
         print(f"Sentiment breakdown: Positive={positive_percentage:.1f}%, Negative={negative_percentage:.1f}%, Neutral={neutral_percentage:.1f}%, Critical={critical_percentage:.1f}%")
         
         return AnalysisResponse(
             total_tweets=total_items,
-            positive_percentage=round(positive_percentage, 1),
-            negative_percentage=round(negative_percentage, 1),
-            neutral_percentage=round(neutral_percentage, 1),
+            positive_percentage=positive_percentage,
+            negative_percentage=negative_percentage,
+            neutral_percentage=neutral_percentage,
             timeline=timeline,
             sample_tweets=sample_tweets,
             platform_breakdown=platform_breakdown,
             success=True,
-            message=f"Enhanced analysis completed successfully using {len(raw_data)} items from {len(platform_breakdown)} platforms"
+            message=f"Enhanced analysis completed successfully using {len(raw_data)} items from {len(platform_breakdown)} platforms",
+            cascade_stats=cascade_stats,
+            lexicon_version=enhanced_analyses[0]['lexicon_version'] if enhanced_analyses else get_lexicon_store().version,
+            sentiment_model_versions=dict(model_versions)
         )
         
     except Exception as e:
@@ -403,12 +485,124 @@ async def chat_with_ai(request: ChatRequest):
         
         return ChatResponse(
             response=response,
-            success=True
+            success=True,
+            intents=question_matcher.match(request.message)
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Enhanced chat failed: {str(e)}")
 
+@app.post("/api/chat/stream")
+def stream_chat_with_ai(request: ChatRequest):
+    """Stream the AI answer as Server-Sent Events, one `data` event per token."""
+    analysis_results = request.analysis_results or {}
+    tokens = enhanced_chat.stream_contextual_response(
+        request.message,
+        analysis_results,
+        analysis_results.get('sample_tweets', [])
+    )
+    return StreamingResponse(sse_events(tokens), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.get("/api/cascade/stats")
+async def get_cascade_stats():
+    """Get cumulative escalation statistics for the sentiment cascade."""
+    return sentiment_cascade.get_stats()
+
+@app.get("/api/online/stats")
+async def get_online_learning_stats():
+    """Get queue, update and version counters of the online learner."""
+    if online_learner is None:
+        return {"enabled": False}
+    return {"enabled": True, **online_learner.get_stats()}
+
+@app.post("/api/online/register")
+async def register_online_model(x_admin_token: Optional[str] = Header(None)):
+    """Register the last published online model as an inactive version in the model registry."""
+    require_admin_token(x_admin_token)
+    if online_learner is None or online_learner.version == 0 or not online_learner.model_path:
+        raise HTTPException(status_code=404, detail="No online model has been published yet")
+    stats = online_learner.get_stats()
+    version = model_server.registry.register(online_learner.model_path, {
+        'model_name': f"SGD (hashed features, online v{stats['version']})",
+        'featurizer': 'hashing',
+        'val_accuracy': stats['published_holdout_accuracy'],
+        'online': stats,
+        'model_path': online_learner.model_path
+    }, activate=False)
+    return {"version": version}
+
+@app.get("/api/chat/cache")
+async def get_chat_cache_stats():
+    """Get hit rate and size of the AI answer cache."""
+    return enhanced_chat.response_cache.stats()
+
+@app.get("/api/chat/prompt-stats")
+async def get_chat_prompt_stats():
+    """Get prompt token usage of the AI chat."""
+    return enhanced_chat.get_prompt_stats()
+
+@app.get("/api/llm/stats")
+async def get_llm_stats():
+    """Get request, retry and latency counters of the shared LLM client."""
+    llm = get_llm_client()
+    return llm.stats() if llm else {"backend": None}
+
+@app.get("/api/models")
+async def list_model_versions():
+    """Get registered model versions with their metadata, and the serving status."""
+    return {
+        "serving": model_server.status(),
+        "versions": model_server.registry.versions()
+    }
+
+def require_admin_token(token: Optional[str]):
+    admin_token = os.getenv('MODEL_ADMIN_TOKEN')
+    if not admin_token or token != admin_token:
+        raise HTTPException(status_code=403, detail="Model administration requires a valid X-Admin-Token header")
+
+@app.post("/api/models/{version}/activate", status_code=202)
+async def activate_model_version(version: str, x_admin_token: Optional[str] = Header(None)):
+    """Load and warm up a registered model version in the background, then swap it in."""
+    require_admin_token(x_admin_token)
+    try:
+        started = model_server.activate(version)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not started:
+        raise HTTPException(status_code=409, detail="Another model activation is still in progress")
+    return {"activating": version, "serving": model_server.status()}
+
+@app.post("/api/models/{version}/candidate")
+def set_candidate_model(version: str, shadow_rate: Optional[float] = None, traffic_percent: Optional[float] = None,
+                        x_admin_token: Optional[str] = Header(None)):
+    """Shadow a registered model version on sampled requests, optionally routing a share of traffic to it."""
+    require_admin_token(x_admin_token)
+    try:
+        candidate = model_server.registry.load(version)
+        model_server.warm_up(candidate)
+        model_router.set_candidate(candidate, version, shadow_rate, traffic_percent)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=404 if isinstance(e, KeyError) else 400, detail=str(e))
+    return model_router.get_stats()
+
+@app.delete("/api/models/candidate")
+async def clear_candidate_model(x_admin_token: Optional[str] = Header(None)):
+    """Stop shadowing and routing to the candidate model; returns its final statistics."""
+    require_admin_token(x_admin_token)
+    stats = model_router.get_stats()
+    model_router.clear_candidate()
+    return stats
+
+@app.get("/api/models/candidate/stats")
+async def get_candidate_model_stats():
+    """Get agreement and latency of the candidate model against the served one."""
+    return model_router.get_stats()
+
+@app.get("/api/startup")
+async def get_startup_report():
+    """Get import and initialization cost per component and per module, and the time to ready."""
+    return startup_report()
+
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy", "message": "API is running"}
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Context Builder - Token-budgeted prompt context for EnhancedAIChat
+Picks deduplicated, strongly-scored samples across platforms until the prompt token budget is spent
+"""
+
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '1500'))
+SAMPLE_MAX_CHARS = 300
+MAX_CONTEXT_SAMPLES = 20
+
+# Weight of each sentiment when no model confidence is attached to a sample
+SENTIMENT_STRENGTH = {'critical': 1.0, 'negative': 0.9, 'positive': 0.9, 'neutral': 0.3}
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding('cl100k_base')
+except ImportError:
+    _encoding = None
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Exact cl100k token count when tiktoken is installed, otherwise a words-and-punctuation estimate"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return sum(1 + len(piece) // 8 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def _dedup_key(text: str) -> str:
+    """Texts that only differ in case, links, mentions or punctuation count as duplicates"""
+    text = re.sub(r"https?://\S+|@\w+|#", " ", text.lower())
+    return ' '.join(re.findall(r"\w+", text))[:120]
+
+
+def sample_score(item: Dict) -> float:
+    """Informativeness of a sample: sentiment strength (or model confidence) with a bonus for substance"""
+    strength = item.get('confidence')
+    if strength is None:
+        strength = SENTIMENT_STRENGTH.get(item.get('sentiment'), 0.3)
+    elif item.get('sentiment') == 'neutral':
+        strength *= SENTIMENT_STRENGTH['neutral']
+    length_bonus = min(len(item.get('text', '')), SAMPLE_MAX_CHARS) / SAMPLE_MAX_CHARS
+    return float(strength) + 0.25 * length_bonus
+
+
+def select_samples(sample_data: List[Dict], max_samples: int = MAX_CONTEXT_SAMPLES) -> List[Dict]:
+    """Deduplicate samples, then take the best-scored ones round-robin across platforms"""
+    by_platform = defaultdict(list)
+    seen = set()
+    for item in sample_data:
+        key = _dedup_key(item.get('text', ''))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        by_platform[(item.get('platform') or 'unknown').lower()].append(item)
+
+    queues = [sorted(items, key=sample_score, reverse=True) for items in by_platform.values()]
+    # Platforms with the strongest top sample go first in every round
+    queues.sort(key=lambda queue: sample_score(queue[0]), reverse=True)
+
+    selected = []
+    depth = 0
+    while len(selected) < max_samples and any(depth < len(queue) for queue in queues):
+        for queue in queues:
+            if depth < len(queue) and len(selected) < max_samples:
+                selected.append(queue[depth])
+        depth += 1
+    return selected
+
+
+def format_sample(index: int, item: Dict) -> str:
+    text = item.get('text', '')[:SAMPLE_MAX_CHARS]
+    sentiment = item.get('sentiment', 'unknown')
+    platform = item.get('platform') or 'unknown'
+    return f"\n{index}. [{platform.upper()}] {text}... (Sentiment: {sentiment})"
+
+
+class ContextBuilder:
+    def __init__(self, token_budget: int = PROMPT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+
+    def build(self, header: str, sample_data: List[Dict], entities: Optional[Dict] = None,
+              reserved_tokens: int = 0) -> Tuple[str, Dict]:
+        """Fill `header` with samples (and entities) until the budget minus reserved_tokens is used.
+
+        reserved_tokens covers whatever else goes into the prompt (system prompt, template text).
+        Returns the context and a report of what was included.
+        """
+        available = self.token_budget - reserved_tokens
+        context = header
+        used = count_tokens(header)
+
+        entity_line = f"\n\nNAMED ENTITIES MENTIONED MOST OFTEN: {entities}" if entities else ''
+        entity_tokens = count_tokens(entity_line) if entity_line else 0
+
+        candidates = select_samples(sample_data)
+        included = 0
+        if candidates:
+            section = "\n\nSAMPLE DATA INSIGHTS:"
+            section_tokens = count_tokens(section)
+            if used + section_tokens + entity_tokens < available:
+                context += section
+                used += section_tokens
+                for item in candidates:
+                    line = format_sample(included + 1, item)
+                    line_tokens = count_tokens(line)
+                    if used + line_tokens + entity_tokens > available:
+                        break
+                    context += line
+                    used += line_tokens
+                    included += 1
+
+        if entity_line and used + entity_tokens <= available:
+            context += entity_line
+            used += entity_tokens
+
+        return context, {
+            'context_tokens': used,
+            'samples_available': len(sample_data),
+            'samples_included': included,
+            'entities_included': bool(entity_line) and entity_line in context
+        }
+
+
+# Compare the budgeted context against the unbounded one
+if __name__ == "__main__":
+    import random
+
+    random.seed(7)
+    platforms = ['reddit', 'github', 'news', 'hackernews']
+    sentiments = ['positive', 'negative', 'neutral', 'critical']
+    sample_data = [
+        {
+            'text': f"Post {i % 150} about the new release: " + ' '.join(random.choice(['great', 'slow', 'broken', 'fine', 'update', 'team', 'users', 'latency']) for _ in range(random.randint(5, 60))),
+            'sentiment': random.choice(sentiments),
+            'platform': random.choice(platforms)
+        }
+        for i in range(500)
+    ]
+
+    unbounded = "\n\nSAMPLE DATA INSIGHTS:" + ''.join(format_sample(i + 1, item) for i, item in enumerate(sample_data[:20]))
+    print("Testing Context Builder:")
+    print("=" * 50)
+    print(f"Unbounded first-20 context: {count_tokens(unbounded)} tokens")
+    for budget in (400, 800, 1500):
+        context, stats = ContextBuilder(budget).build("ANALYSIS OVERVIEW:", sample_data, {'Apple': 4})
+        included = select_samples(sample_data)[:stats['samples_included']]
+        print(f"budget={budget}: {stats}, platforms={sorted({item['platform'] for item in included})}")
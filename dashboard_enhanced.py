@@ -4,21 +4,20 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import joblib
 import tweepy
 import json
 import re
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import time
 from collections import Counter
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from nltk.tokenize import word_tokenize
 import os
 from dotenv import load_dotenv
 import yaml
 import random
+from result_columns import SENTIMENT_CODES, NEUTRAL_CODE, to_epoch_seconds
+from timeline_engine import build_timeline
+from intent_matcher import dashboard_matcher
+from sentiment_inference import load_model as load_sentiment_model, predict_sentiment
 
 # Load environment variables from .env file
 load_dotenv()
@@ -40,20 +39,6 @@ def load_config():
 # Load configuration
 config = load_config()
 
-# Download NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet')
-
 # Page configuration
 st.set_page_config(
     page_title=config['dashboard']['title'],
@@ -421,57 +406,10 @@ if 'show_ai_chat' not in st.session_state:
 @st.cache_data
 def load_model():
     """Load the trained sentiment model."""
-    try:
-        model = joblib.load('best_enhanced_sentiment_model.pkl')
-        return model
-    except FileNotFoundError:
-        st.error("Model file not found. Please run the training script first.")
-        return None
-
-def enhanced_preprocess_tweet(text):
-    """Enhanced tweet preprocessing with stopwords removal and lemmatization."""
-    if not isinstance(text, str):
-        return ""
-    
-    # Basic cleaning
-    text = re.sub(r"http\S+|www\S+", "", text)  # Remove URLs
-    text = re.sub(r"@[A-Za-z0-9_]+", "", text)    # Remove mentions
-    text = re.sub(r"#[A-Za-z0-9_]+", "", text)    # Remove hashtags
-    text = re.sub(r"[\U00010000-\U0010ffff]", "", text)  # Remove emojis
-    
-    # Keep important punctuation for sentiment
-    text = re.sub(r"[^\w\s.,!?']", "", text)
-    text = text.lower()
-    text = re.sub(r"\s+", " ", text).strip()
-    
-    # Tokenize
-    tokens = word_tokenize(text)
-    
-    # Remove stopwords
-    stop_words = set(stopwords.words('english'))
-    tokens = [word for word in tokens if word not in stop_words]
-    
-    # Lemmatization
-    lemmatizer = WordNetLemmatizer()
-    tokens = [lemmatizer.lemmatize(word) for word in tokens]
-    
-    return ' '.join(tokens)
-
-def predict_sentiment(model, text):
-    """Predict sentiment for a given text."""
+    model = load_sentiment_model()
     if model is None:
-        return None, None
-    
-    cleaned_text = enhanced_preprocess_tweet(text)
-    prediction = model.predict([cleaned_text])[0]
-    probabilities = model.predict_proba([cleaned_text])[0]
-    
-    # Map prediction to sentiment
-    sentiment_map = {0: 'negative', 1: 'neutral', 2: 'positive'}
-    sentiment = sentiment_map[prediction]
-    confidence = max(probabilities)
-    
-    return sentiment, confidence
+        st.error("Model file not found. Please run the training script first.")
+    return model
 
 def fetch_realtime_tweets(query, count=100):
     """Fetch real-time data from multiple sources (Twitter, Reddit, News)."""
@@ -659,29 +597,13 @@ def create_timeline_chart(results):
         # If datetime processing fails, use mock timeline data
         return create_mock_timeline_chart()
     
-    # Create realistic timeline data based on actual sentiment distribution
-    sentiment_counts = Counter(df['sentiment'])
-    total_tweets = len(df)
-    
-    # Generate realistic timeline data
-    timeline_data = []
-    base_time = datetime.now().replace(tzinfo=datetime.now().astimezone().tzinfo) - timedelta(hours=24)  # Last 24 hours
-    
-    # Create hourly data points with realistic sentiment distribution
-    for hour in range(24):
-        time_point = base_time + timedelta(hours=hour)
-        
-        # Calculate realistic sentiment counts for this hour
-        hour_positive = int(sentiment_counts.get('positive', 0) * (0.8 + 0.4 * np.random.random()))
-        hour_negative = int(sentiment_counts.get('negative', 0) * (0.8 + 0.4 * np.random.random()))
-        hour_neutral = int(sentiment_counts.get('neutral', 0) * (0.8 + 0.4 * np.random.random()))
-        
-        timeline_data.append({
-            'time': time_point,
-            'positive': max(0, hour_positive),
-            'negative': max(0, hour_negative),
-            'neutral': max(0, hour_neutral)
-        })
+    # Bucket the scored items by hour over the last 24 hours
+    now = datetime.now(timezone.utc)
+    timestamps = (df['created_at'] - pd.Timestamp(0)).dt.total_seconds().to_numpy()
+    sentiment_codes = df['sentiment'].map(SENTIMENT_CODES).fillna(NEUTRAL_CODE).astype('int64').to_numpy()
+    timeline = build_timeline(timestamps, sentiment_codes, 'hour', window=24, end=now,
+                              labels=('positive', 'negative', 'neutral'))
+    times = pd.to_datetime(timeline['time'])
     
     # Create the timeline chart
     fig = go.Figure()
@@ -689,12 +611,9 @@ def create_timeline_chart(results):
     colors = {'positive': '#28a745', 'negative': '#dc3545', 'neutral': '#6c757d'}
     
     for sentiment in ['positive', 'negative', 'neutral']:
-        times = [d['time'] for d in timeline_data]
-        values = [d[sentiment] for d in timeline_data]
-        
         fig.add_trace(go.Scatter(
             x=times,
-            y=values,
+            y=timeline[sentiment],
             mode='lines+markers',
             name=sentiment.capitalize(),
             line=dict(color=colors[sentiment], width=3),
@@ -851,14 +770,10 @@ def chat_with_ai(question, results, query):
             "trends": f"Current trends show {'increasing negative sentiment' if sentiment_counts.get('negative', 0) > sentiment_counts.get('positive', 0) else 'stable positive sentiment' if sentiment_counts.get('positive', 0) > sentiment_counts.get('negative', 0) else 'mixed sentiment'}. This suggests {'immediate attention needed' if sentiment_counts.get('negative', 0) > sentiment_counts.get('positive', 0) else 'continued monitoring' if sentiment_counts.get('neutral', 0) > sentiment_counts.get('positive', 0) + sentiment_counts.get('negative', 0) else 'positive momentum'}."
         }
         
-        # Simple keyword matching for demo
-        question_lower = question.lower()
-        if "reputation" in question_lower:
-            return responses["reputation"]
-        elif "crisis" in question_lower or "emergency" in question_lower:
-            return responses["crisis"]
-        elif "trend" in question_lower:
-            return responses["trends"]
+        # Same compiled intent matcher as the API chat, with the dashboard's topics
+        intent = dashboard_matcher.classify(question)
+        if intent in responses:
+            return responses[intent]
         else:
             return f"Based on the analysis of {total_tweets} tweets about {query}, I can provide insights on reputation, crisis management, and trends. What specific aspect would you like to know more about?"
     
@@ -1320,13 +1235,12 @@ def perform_sentiment_analysis(data, model):
     negative_percentage = (negative_count / total) * 100 if total > 0 else 0
     neutral_percentage = (neutral_count / total) * 100 if total > 0 else 0
     
-    # Create timeline data
-    timeline = {
-        'time': [f"Hour {i}" for i in range(1, 25)],
-        'positive': [random.randint(10, 50) for _ in range(24)],
-        'negative': [random.randint(5, 30) for _ in range(24)],
-        'neutral': [random.randint(15, 40) for _ in range(24)]
-    }
+    # Create timeline data from the scored items' timestamps
+    now = datetime.now(timezone.utc)
+    timestamps = np.array([to_epoch_seconds(result['created_at'], now.timestamp()) for result in results])
+    sentiment_codes = np.array([SENTIMENT_CODES.get(sentiment, NEUTRAL_CODE) for sentiment in sentiments], dtype=np.int64)
+    timeline = build_timeline(timestamps, sentiment_codes, 'hour', window=24, end=now,
+                              labels=('positive', 'negative', 'neutral'))
     
     # Create sample tweets
     sample_tweets = []
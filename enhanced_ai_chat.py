@@ -3,88 +3,377 @@
 Enhanced AI Chat System with Contextual Understanding
 """
 
-import openai
 import os
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from datetime import datetime
-import spacy
-from collections import Counter
+import threading
+import hashlib
+import json
+import re
+from collections import Counter, OrderedDict
+from textwrap import dedent
+
+from context_builder import ContextBuilder, count_tokens
+from intent_matcher import question_matcher
+from llm_client import get_llm_client
+from response_cache import TTLCache
+
+# Entity extraction tuning
+NER_BATCH_SIZE = int(os.getenv('NER_BATCH_SIZE', '64'))
+NER_N_PROCESS = int(os.getenv('NER_N_PROCESS', '1'))
+NER_MULTIPROCESS_MIN_TEXTS = 500  # below this, worker start-up costs more than it saves
+ENTITY_CACHE_SIZE = int(os.getenv('ENTITY_CACHE_SIZE', '10000'))
+
+# AI answer cache; repeated questions about the same analysis cost no tokens
+AI_RESPONSE_CACHE_SIZE = int(os.getenv('AI_RESPONSE_CACHE_SIZE', '512'))
+AI_RESPONSE_CACHE_TTL = float(os.getenv('AI_RESPONSE_CACHE_TTL', '3600'))
+
+CHAT_MODEL = os.getenv('CHAT_MODEL', 'gpt-4.0')
+CHAT_MAX_TOKENS = 400
+
+# Question-type prompts; context and question are filled in after dedenting, so inserted text is never rewritten
+SPECIFIC_PROMPTS = {
+    'trends': dedent("""
+        Based on the sentiment analysis data, identify and explain the key trends in public sentiment.
+
+        {context}
+
+        User Question: {user_question}
+
+        Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
+
+        Focus on:
+        - Temporal patterns in sentiment
+        - Platform-specific trends
+        - Changes in sentiment intensity
+        - Emerging patterns
+    """),
+
+    'comparison': dedent("""
+        Compare and contrast different aspects of the sentiment analysis results.
+
+        {context}
+
+        User Question: {user_question}
+
+        Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
+
+        Focus on:
+        - Platform comparisons
+        - Sentiment category comparisons
+        - Relative strengths and weaknesses
+        - Key differences and similarities
+    """),
+
+    'causes': dedent("""
+        Analyze the potential causes and reasons behind the observed sentiment patterns.
+
+        {context}
+
+        User Question: {user_question}
+
+        Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
+
+        Focus on:
+        - Root causes of sentiment
+        - Contributing factors
+        - Contextual influences
+        - Historical or recent events
+    """),
+
+    'impact': dedent("""
+        Assess the potential impact and implications of the sentiment analysis results.
+
+        {context}
+
+        User Question: {user_question}
+
+        Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
+
+        Focus on:
+        - Business implications
+        - Social impact
+        - Future consequences
+        - Risk assessment
+    """),
+
+    'recommendations': dedent("""
+        Provide specific, actionable recommendations based on the sentiment analysis.
+
+        {context}
+
+        User Question: {user_question}
+
+        Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
+
+        Focus on:
+        - Immediate actions
+        - Strategic improvements
+        - Risk mitigation
+        - Opportunity identification
+    """),
+
+    'specific_details': dedent("""
+        Provide detailed, specific information about the sentiment analysis results.
+
+        {context}
+
+        User Question: {user_question}
+
+        Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
+
+        Focus on:
+        - Specific data points
+        - Detailed breakdowns
+        - Precise metrics
+        - Concrete examples
+    """),
+
+    'prediction': dedent("""
+        Make informed predictions about future sentiment trends based on current analysis.
+
+        {context}
+
+        User Question: {user_question}
+
+        Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
+
+        Focus on:
+        - Future trends
+        - Predictive indicators
+        - Likely scenarios
+        - Confidence levels
+    """),
+
+    'summary': dedent("""
+        Provide a comprehensive summary of the sentiment analysis results.
+
+        {context}
+
+        User Question: {user_question}
+
+        Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
+
+        Focus on:
+        - Key findings
+        - Main insights
+        - Overall assessment
+        - Critical points
+    """)
+}
+
+DEFAULT_PROMPT = dedent("""
+    Provide a comprehensive analysis based on the sentiment data.
+
+    {context}
+
+    User Question: {user_question}
+
+    Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
+""")
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?!. ")
+
+def analysis_fingerprint(analysis_results: Dict, sample_data: List[Dict]) -> str:
+    """Hash of the aggregate metrics and sample texts an answer is based on"""
+    metrics = {
+        key: analysis_results.get(key)
+        for key in ('total_tweets', 'positive_percentage', 'negative_percentage', 'neutral_percentage', 'platform_breakdown')
+    }
+    samples = [(item.get('text', ''), item.get('sentiment'), item.get('platform')) for item in sample_data]
+    payload = json.dumps({'metrics': metrics, 'samples': samples}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def load_ner_pipeline(model_name: str = "en_core_web_sm"):
+    """Load a spaCy pipeline with everything except NER (and what NER listens to) disabled"""
+    import spacy  # imported here so processes that never chat skip the spaCy import cost
+    
+    nlp = spacy.load(model_name)
+    keep = {'ner'}
+    for name, pipe in nlp.pipeline:
+        if 'ner' in getattr(pipe, 'listening_components', []):
+            keep.add(name)
+    nlp.select_pipes(enable=[name for name in nlp.pipe_names if name in keep])
+    return nlp
+
+# Process-wide NER pipeline, loaded on first use
+_ner_pipeline = None
+_ner_pipeline_lock = threading.Lock()
+
+def get_ner_pipeline():
+    """Return the shared NER pipeline, loading it once in a thread-safe way"""
+    global _ner_pipeline
+    if _ner_pipeline is None:
+        with _ner_pipeline_lock:
+            if _ner_pipeline is None:
+                _ner_pipeline = load_ner_pipeline()
+    return _ner_pipeline
 
-from openai import OpenAI
 class EnhancedAIChat:
-    def __init__(self):
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        if self.openai_api_key:
-            openai.api_key = self.openai_api_key
-        self.nlp = spacy.load("en_core_web_sm")
+    def __init__(self, ner_n_process: int = NER_N_PROCESS):
+        self.ner_n_process = ner_n_process
+        self.llm = get_llm_client()
+        
+        # Per-text entity cache, shared across chat turns
+        self._entity_cache = OrderedDict()
+        self._entity_cache_lock = threading.Lock()
+        
+        self.response_cache = TTLCache(AI_RESPONSE_CACHE_SIZE, AI_RESPONSE_CACHE_TTL)
+        
+        self.context_builder = ContextBuilder()
+        self._prompt_stats = {'prompts': 0, 'total_prompt_tokens': 0, 'max_prompt_tokens': 0, 'last': None}
+        self._prompt_stats_lock = threading.Lock()
+    
+    @property
+    def nlp(self):
+        """spaCy NER pipeline, loaded lazily on the first entity extraction"""
+        return get_ner_pipeline()
+    
+    def warm_up(self):
+        """Load the NER pipeline ahead of the first chat request"""
+        self.nlp("Warm-up text from Sentimental AI.")
     
     def generate_contextual_response(self, user_question: str, analysis_results: Dict, sample_data: List[Dict]) -> str:
         """Generate a contextual response based on the specific user question"""
         
-        if not self.openai_api_key:
+        if self.llm is None:
             return self._fallback_response(user_question, analysis_results)
         
-        # Analyze the question type
-        question_type = self._analyze_question_type(user_question)
+        cache_key, messages = self._prepare_messages(user_question, analysis_results, sample_data)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            answer = self.llm.complete(messages(), model=CHAT_MODEL, max_tokens=CHAT_MAX_TOKENS, temperature=0.7)
+            self.response_cache.set(cache_key, answer)
+            return answer
+            
+        except Exception as e:
+            print(f"LLM error: {e}")
+            return self._fallback_response(user_question, analysis_results)
+    
+    def stream_contextual_response(self, user_question: str, analysis_results: Dict, sample_data: List[Dict]) -> Iterator[str]:
+        """Yield the answer token by token as the LLM produces it; the full answer is cached at the end"""
         
-        # Build context based on question type
-        context = self._build_context_for_question(question_type, analysis_results, sample_data)
+        if self.llm is None:
+            yield self._fallback_response(user_question, analysis_results)
+            return
         
-        # Create specific prompt based on question type
-        prompt = self._create_specific_prompt(question_type, user_question, context)
+        cache_key, messages = self._prepare_messages(user_question, analysis_results, sample_data)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
         
+        tokens = []
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4.0",
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt(question_type)},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=400,
-                temperature=0.7
-            )
+            for token in self.llm.stream(messages(), model=CHAT_MODEL, max_tokens=CHAT_MAX_TOKENS, temperature=0.7):
+                tokens.append(token)
+                yield token
+        except Exception as e:
+            print(f"LLM error: {e}")
+            if not tokens:
+                yield self._fallback_response(user_question, analysis_results)
+            # A partially streamed answer is never cached
+            return
+        
+        if tokens:
+            self.response_cache.set(cache_key, ''.join(tokens).strip())
+    
+    def _prepare_messages(self, user_question: str, analysis_results: Dict, sample_data: List[Dict]):
+        """Cache key for the question, and a callable that builds the chat messages on a cache miss"""
+        
+        # Analyze the question type
+        question_type = self._analyze_question_type(user_question)
+        
+        cache_key = (normalize_question(user_question), question_type, analysis_fingerprint(analysis_results, sample_data))
+        
+        def messages() -> List[Dict]:
+            system_prompt = self._get_system_prompt(question_type)
             
-            return response.choices[0].message.content.strip()
+            # Everything around the context counts against the same token budget
+            template_tokens = count_tokens(system_prompt) + count_tokens(self._create_specific_prompt(question_type, user_question, ''))
             
-        except Exception as e:
-            print(f"OpenAI API error: {e}")
-            return self._fallback_response(user_question, analysis_results)
+            # Build context based on question type
+            context, context_stats = self._build_context_for_question(question_type, analysis_results, sample_data, template_tokens)
+            
+            # Create specific prompt based on question type
+            prompt = self._create_specific_prompt(question_type, user_question, context)
+            
+            self._record_prompt(count_tokens(system_prompt) + count_tokens(prompt), context_stats)
+            return [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ]
+        
+        return cache_key, messages
+    
+    def _record_prompt(self, prompt_tokens: int, context_stats: Dict):
+        last = dict(context_stats, prompt_tokens=prompt_tokens, token_budget=self.context_builder.token_budget)
+        with self._prompt_stats_lock:
+            self._prompt_stats['prompts'] += 1
+            self._prompt_stats['total_prompt_tokens'] += prompt_tokens
+            self._prompt_stats['max_prompt_tokens'] = max(self._prompt_stats['max_prompt_tokens'], prompt_tokens)
+            self._prompt_stats['last'] = last
+        print(f"🧾 Prompt: {prompt_tokens} tokens, {context_stats['samples_included']}/{context_stats['samples_available']} samples")
+    
+    def get_prompt_stats(self) -> Dict:
+        """Prompt token usage across LLM requests made by this chat instance"""
+        with self._prompt_stats_lock:
+            stats = dict(self._prompt_stats)
+        stats['avg_prompt_tokens'] = round(stats['total_prompt_tokens'] / stats['prompts'], 1) if stats['prompts'] else 0.0
+        return stats
 
-    def extract_named_entities(self, sample_data):
+    def extract_named_entities(self, sample_data, n_process: Optional[int] = None):
+        """Count the most frequent named entities across sample items"""
+        texts = [item.get("text", "") for item in sample_data]
+        entities_by_text = self._entities_for_texts(texts, self.ner_n_process if n_process is None else n_process)
+        
         entity_counter = Counter()
-        for item in sample_data:
-            doc = self.nlp(item.get("text", ""))
-            for ent in doc.ents:
-                entity_counter[ent.text] += 1
+        for text in texts:
+            entity_counter.update(entities_by_text[text])
         top_entities = dict(entity_counter.most_common(5))
         if not top_entities:
             return {"Note": "No named entities found in sample."}
         return top_entities
     
-    def _analyze_question_type(self, question: str) -> str:
-        """Analyze what type of question the user is asking"""
-        question_lower = question.lower()
+    def _entities_for_texts(self, texts: List[str], n_process: int) -> Dict[str, tuple]:
+        """Look up entities per unique text, running NER in batches only for cache misses"""
+        entities_by_text = {}
+        missing = []
+        with self._entity_cache_lock:
+            for text in dict.fromkeys(texts):
+                if text in self._entity_cache:
+                    self._entity_cache.move_to_end(text)
+                    entities_by_text[text] = self._entity_cache[text]
+                else:
+                    missing.append(text)
         
-        # Question type patterns
-        patterns = {
-            'trends': ['trend', 'trending', 'pattern', 'change', 'over time', 'evolution'],
-            'comparison': ['compare', 'versus', 'vs', 'difference', 'better', 'worse', 'similar'],
-            'causes': ['why', 'cause', 'reason', 'because', 'due to', 'result of'],
-            'impact': ['impact', 'effect', 'influence', 'consequence', 'outcome'],
-            'recommendations': ['recommend', 'suggestion', 'advice', 'should', 'improve', 'fix'],
-            'specific_details': ['what', 'how', 'when', 'where', 'who', 'specific'],
-            'prediction': ['predict', 'forecast', 'future', 'will', 'going to', 'likely'],
-            'summary': ['summary', 'overview', 'summary', 'brief', 'main points']
-        }
+        if missing:
+            if len(missing) < NER_MULTIPROCESS_MIN_TEXTS:
+                n_process = 1
+            docs = self.nlp.pipe(missing, batch_size=NER_BATCH_SIZE, n_process=n_process)
+            for text, doc in zip(missing, docs):
+                entities_by_text[text] = tuple(ent.text for ent in doc.ents)
+            
+            with self._entity_cache_lock:
+                for text in missing:
+                    self._entity_cache[text] = entities_by_text[text]
+                while len(self._entity_cache) > ENTITY_CACHE_SIZE:
+                    self._entity_cache.popitem(last=False)
         
-        for question_type, keywords in patterns.items():
-            if any(keyword in question_lower for keyword in keywords):
-                return question_type
-        
-        return 'general'
+        return entities_by_text
+    
+    def _analyze_question_type(self, question: str) -> str:
+        """Analyze what type of question the user is asking"""
+        return question_matcher.classify(question)
     
-    def _build_context_for_question(self, question_type: str, analysis_results: Dict, sample_data: List[Dict]) -> str:
-        """Build specific context based on question type"""
+    def _build_context_for_question(self, question_type: str, analysis_results: Dict, sample_data: List[Dict],
+                                    reserved_tokens: int = 0):
+        """Build specific context based on question type, within the prompt token budget"""
         
         # Extract basic metrics
         total_items = analysis_results.get('total_tweets', 0)
@@ -118,163 +407,16 @@ class EnhancedAIChat:
         elif question_type == 'specific_details':
             context += "\nDETAIL FOCUS: Focus on specific aspects and concrete examples from the data."
         
-        # Add sample data context - this is the most important part
-        if sample_data:
-            context += "\n\nSAMPLE DATA INSIGHTS:"
-            for i, item in enumerate(sample_data[:20]):  # Show more sample data
-                text = item.get('text', '')[:300]  # Show more text
-                sentiment = item.get('sentiment', 'unknown')
-                platform = item.get('platform', 'unknown')
-                context += f"\n{i+1}. [{platform.upper()}] {text}... (Sentiment: {sentiment})"
-        
-        entities = self.extract_named_entities(sample_data)
-        if entities:
-            context += f"\n\nNAMED ENTITIES MENTIONED MOST OFTEN: {entities}"
-        
-        return context
+        # Add sample data context - this is the most important part; the builder keeps
+        # the strongest, most diverse samples that fit in the budget
+        entities = self.extract_named_entities(sample_data) if sample_data else None
+        return self.context_builder.build(context, sample_data, entities, reserved_tokens)
     
     def _create_specific_prompt(self, question_type: str, user_question: str, context: str) -> str:
         """Create a specific prompt based on question type"""
         
-        prompts = {
-            'trends': f"""
-            Based on the sentiment analysis data, identify and explain the key trends in public sentiment.
-            
-            {context}
-            
-            User Question: {user_question}
-
-            Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
-            
-            Focus on:
-            - Temporal patterns in sentiment
-            - Platform-specific trends
-            - Changes in sentiment intensity
-            - Emerging patterns
-            """,
-            
-            'comparison': f"""
-            Compare and contrast different aspects of the sentiment analysis results.
-            
-            {context}
-            
-            User Question: {user_question}
-
-            Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
-            
-            Focus on:
-            - Platform comparisons
-            - Sentiment category comparisons
-            - Relative strengths and weaknesses
-            - Key differences and similarities
-            """,
-            
-            'causes': f"""
-            Analyze the potential causes and reasons behind the observed sentiment patterns.
-            
-            {context}
-            
-            User Question: {user_question}
-
-            Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
-            
-            Focus on:
-            - Root causes of sentiment
-            - Contributing factors
-            - Contextual influences
-            - Historical or recent events
-            """,
-            
-            'impact': f"""
-            Assess the potential impact and implications of the sentiment analysis results.
-            
-            {context}
-            
-            User Question: {user_question}
-
-            Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
-            
-            Focus on:
-            - Business implications
-            - Social impact
-            - Future consequences
-            - Risk assessment
-            """,
-            
-            'recommendations': f"""
-            Provide specific, actionable recommendations based on the sentiment analysis.
-            
-            {context}
-            
-            User Question: {user_question}
-
-            Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
-            
-            Focus on:
-            - Immediate actions
-            - Strategic improvements
-            - Risk mitigation
-            - Opportunity identification
-            """,
-            
-            'specific_details': f"""
-            Provide detailed, specific information about the sentiment analysis results.
-            
-            {context}
-            
-            User Question: {user_question}
-
-            Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
-            
-            Focus on:
-            - Specific data points
-            - Detailed breakdowns
-            - Precise metrics
-            - Concrete examples
-            """,
-            
-            'prediction': f"""
-            Make informed predictions about future sentiment trends based on current analysis.
-            
-            {context}
-            
-            User Question: {user_question}
-
-            Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
-            
-            Focus on:
-            - Future trends
-            - Predictive indicators
-            - Likely scenarios
-            - Confidence levels
-            """,
-            
-            'summary': f"""
-            Provide a comprehensive summary of the sentiment analysis results.
-            
-            {context}
-            
-            User Question: {user_question}
-
-            Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
-            
-            Focus on:
-            - Key findings
-            - Main insights
-            - Overall assessment
-            - Critical points
-            """
-        }
-        
-        return prompts.get(question_type, f"""
-        Provide a comprehensive analysis based on the sentiment data.
-        
-        {context}
-        
-        User Question: {user_question}
-
-        Only use the provided context and sample data to answer. Do not rely on external knowledge or assumptions.
-        """)
+        template = SPECIFIC_PROMPTS.get(question_type, DEFAULT_PROMPT)
+        return template.format(context=context, user_question=user_question).strip()
     
     def _get_system_prompt(self, question_type: str) -> str:
         """Get system prompt based on question type"""
@@ -4,64 +4,81 @@ Enhanced Sentiment Analyzer with Better Categories and Context
 """
 
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from collections import Counter
+from lexicon_scorer import LexiconScorer
+from lexicon_store import LexiconSnapshot, LexiconStore, get_lexicon_store
+
+def compile_analyzer_scorer(lexicon_data: Dict) -> LexiconScorer:
+    """Compile sentiment and context vocabularies into one token-level scorer"""
+    sentiment_categories = lexicon_data['sentiment_categories']
+    context_indicators = lexicon_data['context_indicators']
+
+    lexicon = {}
+    for main_category, subcategories in sentiment_categories.items():
+        for subcategory, words in subcategories.items():
+            lexicon[f"{main_category}.{subcategory}"] = words
+    for context_type, indicators in context_indicators.items():
+        lexicon[f"context.{context_type}"] = indicators
+
+    # Negated praise reads as disappointment, negated complaints as mild support
+    negation_map = {}
+    for subcategory in sentiment_categories['positive']:
+        negation_map[f"positive.{subcategory}"] = 'negative.disappointed'
+    for subcategory in sentiment_categories['negative']:
+        negation_map[f"negative.{subcategory}"] = 'positive.supportive'
+
+    context_labels = [f"context.{context_type}" for context_type in context_indicators]
+    return LexiconScorer(lexicon, negation_map=negation_map, fixed_labels=context_labels)
 
 class EnhancedSentimentAnalyzer:
-    def __init__(self):
-        # Enhanced sentiment categories with subcategories
-        self.sentiment_categories = {
-            'positive': {
-                'enthusiastic': ['amazing', 'incredible', 'fantastic', 'brilliant', 'excellent', 'outstanding', 'perfect', 'love', 'adore', 'wow', 'stunning', 'revolutionary', 'game-changing'],
-                'supportive': ['good', 'great', 'nice', 'helpful', 'useful', 'beneficial', 'positive', 'promising', 'encouraging', 'hopeful', 'optimistic'],
-                'satisfied': ['happy', 'pleased', 'content', 'satisfied', 'comfortable', 'relieved', 'grateful', 'thankful']
-            },
-            'negative': {
-                'angry': ['terrible', 'awful', 'horrible', 'disgusting', 'hate', 'loathe', 'furious', 'outraged', 'enraged', 'infuriated'],
-                'disappointed': ['disappointing', 'let down', 'frustrated', 'annoyed', 'upset', 'sad', 'unhappy', 'dissatisfied'],
-                'concerned': ['worried', 'concerned', 'anxious', 'nervous', 'scared', 'fearful', 'suspicious', 'doubtful', 'skeptical']
-            },
-            'neutral': {
-                'informative': ['fact', 'data', 'information', 'report', 'study', 'research', 'analysis', 'evidence', 'statistics'],
-                'observational': ['seems', 'appears', 'looks like', 'might', 'could', 'possibly', 'maybe', 'perhaps'],
-                'balanced': ['mixed', 'both', 'neither', 'either', 'depends', 'varies', 'different', 'various']
-            },
-            'critical': {
-                'constructive': ['improve', 'better', 'enhance', 'optimize', 'refine', 'suggest', 'recommend', 'advice'],
-                'analytical': ['analyze', 'examine', 'investigate', 'review', 'assess', 'evaluate', 'consider'],
-                'questioning': ['why', 'how', 'what if', 'doubt', 'question', 'uncertain', 'unclear']
-            }
-        }
-        
-        # Context indicators for better understanding
-        self.context_indicators = {
-            'business': ['company', 'business', 'corporate', 'enterprise', 'startup', 'CEO', 'executive', 'management', 'strategy', 'revenue', 'profit', 'market'],
-            'technology': ['tech', 'software', 'app', 'platform', 'system', 'code', 'development', 'programming', 'AI', 'machine learning', 'algorithm'],
-            'social': ['community', 'people', 'users', 'customers', 'audience', 'public', 'society', 'social media', 'viral'],
-            'political': ['government', 'policy', 'election', 'political', 'democracy', 'voting', 'campaign', 'politician'],
-            'environmental': ['climate', 'environment', 'sustainability', 'green', 'eco-friendly', 'pollution', 'carbon', 'renewable']
-        }
+    def __init__(self, lexicon_store: Optional[LexiconStore] = None):
+        # Sentiment categories and context indicators live in config/lexicons.json
+        self.lexicon_store = lexicon_store or get_lexicon_store()
+        self.lexicon_store.register_compiler('enhanced_analyzer', compile_analyzer_scorer)
+
+    @property
+    def sentiment_categories(self) -> Dict:
+        """Enhanced sentiment categories with subcategories"""
+        return self.lexicon_store.current().data['sentiment_categories']
+
+    @property
+    def context_indicators(self) -> Dict:
+        """Context indicators for better understanding"""
+        return self.lexicon_store.current().data['context_indicators']
+
+    @property
+    def scorer(self) -> LexiconScorer:
+        return self.lexicon_store.current().compiled['enhanced_analyzer']
 
     def analyze_enhanced_sentiment(self, text: str) -> Dict:
         """Analyze text with enhanced sentiment categories and context"""
-        text_lower = text.lower()
+        return self._analyze_with_lexicon(self.lexicon_store.current(), text)
+    
+    def analyze_batch(self, texts: List[str]) -> List[Dict]:
+        """Analyze many texts against the same lexicon version"""
+        lexicon = self.lexicon_store.current()
+        return [self._analyze_with_lexicon(lexicon, text) for text in texts]
+    
+    def _analyze_with_lexicon(self, lexicon: LexiconSnapshot, text: str) -> Dict:
+        # Weighted sentiment and context scores from a single token sweep
+        label_scores, word_count = lexicon.compiled['enhanced_analyzer'].score(text)
         
-        # Count sentiment words in each category
         sentiment_scores = {}
-        for main_category, subcategories in self.sentiment_categories.items():
-            sentiment_scores[main_category] = {}
-            for subcategory, words in subcategories.items():
-                count = sum(1 for word in words if word in text_lower)
-                sentiment_scores[main_category][subcategory] = count
+        for main_category, subcategories in lexicon.data['sentiment_categories'].items():
+            sentiment_scores[main_category] = {
+                subcategory: round(label_scores[f"{main_category}.{subcategory}"], 3)
+                for subcategory in subcategories
+            }
         
         # Determine primary sentiment
         primary_sentiment = self._get_primary_sentiment(sentiment_scores)
         
         # Analyze context
-        context = self._analyze_context(text_lower)
+        context = self._analyze_context(label_scores, lexicon.data['context_indicators'])
         
         # Calculate confidence and intensity
-        confidence, intensity = self._calculate_confidence_intensity(sentiment_scores, text)
+        confidence, intensity = self._calculate_confidence_intensity(sentiment_scores, word_count)
         
         return {
             'primary_sentiment': primary_sentiment,
@@ -69,7 +86,8 @@ class EnhancedSentimentAnalyzer:
             'context': context,
             'confidence': confidence,
             'intensity': intensity,
-            'enhanced_categories': self._get_enhanced_categories(sentiment_scores, context)
+            'enhanced_categories': self._get_enhanced_categories(sentiment_scores, context),
+            'lexicon_version': lexicon.version
         }
     
     def _get_primary_sentiment(self, sentiment_scores: Dict) -> str:
@@ -83,25 +101,24 @@ class EnhancedSentimentAnalyzer:
         
         return max(total_scores, key=total_scores.get)
     
-    def _analyze_context(self, text: str) -> Dict:
+    def _analyze_context(self, label_scores: Dict, context_indicators: Dict) -> Dict:
         """Analyze the context of the text"""
         context_scores = {}
-        for context_type, indicators in self.context_indicators.items():
-            context_scores[context_type] = sum(1 for indicator in indicators if indicator in text)
+        for context_type in context_indicators:
+            context_scores[context_type] = int(label_scores[f"context.{context_type}"])
         
         return context_scores
     
-    def _calculate_confidence_intensity(self, sentiment_scores: Dict, text: str) -> Tuple[float, str]:
+    def _calculate_confidence_intensity(self, sentiment_scores: Dict, word_count: int) -> Tuple[float, str]:
         """Calculate confidence and intensity of sentiment"""
-        # Count total sentiment words
+        # Weighted total of sentiment words
         total_sentiment_words = sum(
             sum(subcategories.values()) 
             for subcategories in sentiment_scores.values()
         )
         
         # Calculate confidence based on sentiment word density
-        words = text.split()
-        confidence = min(1.0, total_sentiment_words / max(len(words), 1))
+        confidence = min(1.0, total_sentiment_words / max(word_count, 1))
         
         # Determine intensity
         if total_sentiment_words == 0:
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Intent Matcher - Compiled question-type classifier for the AI chat
+Keyword phrases are compiled once into a token trie and matched in a single pass over the
+question's tokens, on word boundaries; every intent that fires is ranked by score and priority
+"""
+
+import re
+from typing import Dict, List
+
+# Generic words ('what', 'will', ...) only decide when nothing more specific matches
+WEAK_WEIGHT = 0.4
+
+# Per-node memo of token -> next trie nodes; cleared when it grows past this many tokens
+TRANSITION_CACHE_SIZE = 20000
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Chat question types used by EnhancedAIChat; higher priority wins ties.
+# A trailing '*' matches any word starting with the prefix ('trend*' -> trends, trending)
+QUESTION_INTENTS = {
+    'trends': {
+        'priority': 8,
+        'patterns': ['trend*', 'pattern*', 'over time', 'evolution', 'evolv*'],
+        'weak_patterns': ['change*', 'changing']
+    },
+    'comparison': {
+        'priority': 7,
+        'patterns': ['compar*', 'versus', 'vs', 'difference*', 'differ*', 'similar*', 'contrast*'],
+        'weak_patterns': ['better', 'worse']
+    },
+    'causes': {
+        'priority': 6,
+        'patterns': ['why', 'cause*', 'reason*', 'because', 'due to', 'result of', 'driv*'],
+        'weak_patterns': []
+    },
+    'impact': {
+        'priority': 5,
+        'patterns': ['impact*', 'effect*', 'influenc*', 'consequence*', 'outcome*', 'implication*'],
+        'weak_patterns': []
+    },
+    'recommendations': {
+        'priority': 4,
+        'patterns': ['recommend*', 'suggest*', 'advice', 'advise', 'improve*', 'fix*'],
+        'weak_patterns': ['should']
+    },
+    'prediction': {
+        'priority': 3,
+        'patterns': ['predict*', 'forecast*', 'future', 'going to', 'likely', 'next week', 'next month'],
+        'weak_patterns': ['will']
+    },
+    'summary': {
+        'priority': 2,
+        'patterns': ['summary', 'summar*', 'overview', 'brief*', 'main points', 'tl dr', 'tldr'],
+        'weak_patterns': []
+    },
+    'specific_details': {
+        'priority': 1,
+        'patterns': ['specific*', 'example*', 'detail*'],
+        'weak_patterns': ['what', 'how', 'when', 'where', 'who', 'which']
+    }
+}
+
+# Canned-answer topics of the Streamlit dashboard chat
+DASHBOARD_INTENTS = {
+    'crisis': {
+        'priority': 3,
+        'patterns': ['crisis', 'crises', 'emergenc*', 'backlash', 'pr disaster'],
+        'weak_patterns': ['risk*']
+    },
+    'reputation': {
+        'priority': 2,
+        'patterns': ['reputation*', 'brand', 'image', 'perception*', 'perceiv*'],
+        'weak_patterns': []
+    },
+    'trends': {
+        'priority': 1,
+        'patterns': ['trend*', 'over time', 'momentum'],
+        'weak_patterns': ['change*', 'changing']
+    }
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class _Node:
+    __slots__ = ('children', 'prefixes', 'hits', 'transitions')
+
+    def __init__(self):
+        self.children = {}
+        self.prefixes = []
+        self.hits = []
+        self.transitions = {}
+
+
+class IntentMatcher:
+    def __init__(self, intents: Dict[str, Dict], default: str = 'general'):
+        self.default = default
+        self.priorities = {name: spec['priority'] for name, spec in intents.items()}
+        self._root = _Node()
+        for name, spec in intents.items():
+            for pattern in spec['patterns']:
+                self._add(pattern, name, float(len(pattern.split())))
+            for pattern in spec.get('weak_patterns', []):
+                self._add(pattern, name, WEAK_WEIGHT)
+
+    def _add(self, pattern: str, intent: str, weight: float):
+        node = self._root
+        for word in pattern.lower().split():
+            if word.endswith('*'):
+                prefix = word[:-1]
+                child = next((c for p, c in node.prefixes if p == prefix), None)
+                if child is None:
+                    child = _Node()
+                    node.prefixes.append((prefix, child))
+            else:
+                child = node.children.get(word)
+                if child is None:
+                    child = node.children[word] = _Node()
+            node = child
+        node.hits.append((intent, weight, pattern))
+
+    def _step(self, node: _Node, token: str) -> tuple:
+        """Trie nodes reachable from node on token, memoized per token"""
+        nodes = node.transitions.get(token)
+        if nodes is None:
+            nodes = []
+            child = node.children.get(token)
+            if child is not None:
+                nodes.append(child)
+            for prefix, child in node.prefixes:
+                if token.startswith(prefix):
+                    nodes.append(child)
+            nodes = tuple(nodes)
+            if len(node.transitions) >= TRANSITION_CACHE_SIZE:
+                node.transitions.clear()
+            node.transitions[token] = nodes
+        return nodes
+
+    def _scan(self, question: str):
+        """One pass over the tokens, advancing every partial phrase and starting new ones at each token"""
+        scores = {}
+        matches = {}
+        root_transitions = self._root.transitions
+        active = ()
+        for token in _TOKEN_PATTERN.findall(question.lower()):
+            reached = root_transitions.get(token)
+            if reached is None:
+                reached = self._step(self._root, token)
+            for node in active:
+                reached += self._step(node, token)
+            if not reached:
+                active = ()
+                continue
+            for node in reached:
+                for intent, weight, pattern in node.hits:
+                    found = matches.setdefault(intent, [])
+                    if pattern not in found:
+                        scores[intent] = scores.get(intent, 0.0) + weight
+                        found.append(pattern)
+            active = tuple(node for node in reached if node.children or node.prefixes)
+        return scores, matches
+
+    def match(self, question: str) -> List[Dict]:
+        """All intents found in the question, best first: [{'intent', 'score', 'confidence', 'matches'}]"""
+        scores, matches = self._scan(question)
+        total = sum(scores.values())
+        ranked = sorted(scores, key=lambda intent: (scores[intent], self.priorities[intent]), reverse=True)
+        return [
+            {
+                'intent': intent,
+                'score': round(scores[intent], 3),
+                'confidence': round(scores[intent] / total, 3),
+                'matches': matches[intent]
+            }
+            for intent in ranked
+        ]
+
+    def classify(self, question: str) -> str:
+        """Best intent, or the default when no pattern matches"""
+        scores, _ = self._scan(question)
+        if not scores:
+            return self.default
+        return max(scores, key=lambda intent: (scores[intent], self.priorities[intent]))
+
+
+question_matcher = IntentMatcher(QUESTION_INTENTS)
+dashboard_matcher = IntentMatcher(DASHBOARD_INTENTS, default='overview')
+
+
+# Check the labelled examples and time the matcher against the old linear keyword scan
+if __name__ == "__main__":
+    import json
+    import os
+    import time
+
+    examples_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'intent_examples.json')
+    with open(examples_path, 'r', encoding='utf-8') as f:
+        examples = json.load(f)
+
+    legacy_patterns = {
+        'trends': ['trend', 'trending', 'pattern', 'change', 'over time', 'evolution'],
+        'comparison': ['compare', 'versus', 'vs', 'difference', 'better', 'worse', 'similar'],
+        'causes': ['why', 'cause', 'reason', 'because', 'due to', 'result of'],
+        'impact': ['impact', 'effect', 'influence', 'consequence', 'outcome'],
+        'recommendations': ['recommend', 'suggestion', 'advice', 'should', 'improve', 'fix'],
+        'specific_details': ['what', 'how', 'when', 'where', 'who', 'specific'],
+        'prediction': ['predict', 'forecast', 'future', 'will', 'going to', 'likely'],
+        'summary': ['summary', 'overview', 'summary', 'brief', 'main points']
+    }
+
+    def legacy_classify(question: str) -> str:
+        question_lower = question.lower()
+        for question_type, keywords in legacy_patterns.items():
+            if any(keyword in question_lower for keyword in keywords):
+                return question_type
+        return 'general'
+
+    print("Testing Intent Matcher:")
+    print("=" * 50)
+    for name, matcher, labelled, legacy in [
+        ('question', question_matcher, examples['question'], legacy_classify),
+        ('dashboard', dashboard_matcher, examples['dashboard'], None)
+    ]:
+        failures = [(q, label, matcher.classify(q)) for q, label in labelled if matcher.classify(q) != label]
+        line = f"{name}: {len(labelled) - len(failures)}/{len(labelled)} correct"
+        if legacy:
+            legacy_correct = sum(legacy(q) == label for q, label in labelled)
+            line += f" (legacy scan: {legacy_correct}/{len(labelled)})"
+        print(line)
+        for question, label, predicted in failures:
+            print(f"   ✗ {question!r}: expected {label}, got {predicted}")
+
+    questions = [q for q, _ in examples['question']] * 200
+    for label, classify in [('legacy scan', legacy_classify), ('compiled matcher', question_matcher.classify)]:
+        start = time.perf_counter()
+        for question in questions:
+            classify(question)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>16}: {elapsed / len(questions) * 1e6:.1f}µs per question")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Lexicon Scorer - Token-level keyword scoring with negation and intensifier handling
+One linear sweep per text: negation scopes and intensifier weights are tracked while matching
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Words and contractions that open a negation scope
+NEGATORS = {
+    'not', 'no', 'never', 'nothing', 'nobody', 'none', 'neither', 'nor', 'without',
+    'hardly', 'barely', 'cannot', 'cant', 'dont', 'doesnt', 'didnt', 'isnt', 'wasnt',
+    'arent', 'werent', 'wont', 'wouldnt', 'shouldnt', 'couldnt', 'aint'
+}
+
+# Multipliers applied to the next lexicon term
+INTENSIFIERS = {
+    'very': 1.5, 'extremely': 2.0, 'really': 1.3, 'absolutely': 1.8, 'highly': 1.5,
+    'incredibly': 1.8, 'super': 1.5, 'totally': 1.5, 'completely': 1.5, 'so': 1.3,
+    'truly': 1.4, 'deeply': 1.5, 'most': 1.3, 'quite': 1.2,
+    'slightly': 0.5, 'somewhat': 0.6, 'mildly': 0.6, 'kinda': 0.7, 'fairly': 0.8
+}
+
+# Number of tokens a negator or intensifier stays active for
+NEGATION_WINDOW = 3
+INTENSIFIER_WINDOW = 2
+
+# Weight kept by a negated term once its polarity is flipped ("not good" is weaker than "bad")
+NEGATION_SCALE = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*|[.!?;:,]")
+CLAUSE_BREAKS = {'.', '!', '?', ';', ':', ','}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word and clause-break tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class LexiconScorer:
+    def __init__(self, lexicon: Dict[str, Iterable[str]], negation_map: Optional[Dict[str, str]] = None,
+                 fixed_labels: Iterable[str] = ()):
+        """Compile a {label: [terms]} lexicon into token lookup tables.
+
+        negation_map gives the label a term counts towards when negated; labels in
+        fixed_labels are counted as plain hits and ignore negators and intensifiers.
+        """
+        self.labels = list(lexicon)
+        self.negation_map = negation_map or {}
+        self.fixed_labels = set(fixed_labels)
+        # Checked here so a lexicon edit that drops a negation target is rejected at compile time
+        # instead of failing on the first negated term
+        missing = sorted(set(self.negation_map.values()) - set(self.labels))
+        if missing:
+            raise ValueError(f"Negation targets not in the lexicon: {', '.join(missing)}")
+
+        # token -> labels for single-token terms, first token -> [(tokens, label)] for phrases
+        self.terms: Dict[str, List[str]] = {}
+        self.phrases: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+        for label, words in lexicon.items():
+            for word in words:
+                tokens = tuple(self._normalize(token) for token in tokenize(word))
+                if not tokens:
+                    continue
+                if len(tokens) == 1:
+                    self.terms.setdefault(tokens[0], []).append(label)
+                else:
+                    self.phrases.setdefault(tokens[0], []).append((tokens, label))
+
+        # Longest phrases first so "looks like" wins over any shorter overlap
+        for candidates in self.phrases.values():
+            candidates.sort(key=lambda candidate: len(candidate[0]), reverse=True)
+
+    @staticmethod
+    def _normalize(token: str) -> str:
+        # "don't" and "dont" should behave the same
+        return token.replace("'", '') if token.endswith("n't") else token
+
+    def score(self, text: str) -> Tuple[Dict[str, float], int]:
+        """Return weighted scores per label and the number of word tokens"""
+        tokens = [self._normalize(token) for token in tokenize(text)]
+        scores = dict.fromkeys(self.labels, 0.0)
+        terms = self.terms
+        phrases = self.phrases
+
+        negation_left = 0
+        boost = 1.0
+        boost_left = 0
+        word_count = 0
+
+        i = 0
+        n = len(tokens)
+        while i < n:
+            token = tokens[i]
+            if token in CLAUSE_BREAKS:
+                negation_left = 0
+                boost_left = 0
+                i += 1
+                continue
+            word_count += 1
+
+            matched_labels = None
+            span = 1
+            if token in phrases:
+                for phrase_tokens, label in phrases[token]:
+                    length = len(phrase_tokens)
+                    if tuple(tokens[i:i + length]) == phrase_tokens:
+                        matched_labels = [label]
+                        span = length
+                        break
+            if matched_labels is None:
+                matched_labels = terms.get(token)
+
+            if matched_labels:
+                weight = boost if boost_left > 0 else 1.0
+                for label in matched_labels:
+                    if label in self.fixed_labels:
+                        scores[label] += 1.0
+                    elif negation_left > 0 and label in self.negation_map:
+                        scores[self.negation_map[label]] += weight * NEGATION_SCALE
+                    else:
+                        scores[label] += weight
+                boost_left = 0
+                word_count += span - 1
+                negation_left = max(0, negation_left - span)
+                i += span
+                continue
+
+            if token in NEGATORS:
+                negation_left = NEGATION_WINDOW
+            elif token in INTENSIFIERS:
+                boost = boost * INTENSIFIERS[token] if boost_left > 0 else INTENSIFIERS[token]
+                boost_left = INTENSIFIER_WINDOW
+                negation_left = max(0, negation_left - 1)
+            else:
+                negation_left = max(0, negation_left - 1)
+                boost_left = max(0, boost_left - 1)
+            i += 1
+
+        return scores, word_count
+
+    def score_batch(self, texts: Iterable[str]) -> List[Tuple[Dict[str, float], int]]:
+        """Score many texts with the same compiled tables"""
+        return [self.score(text) for text in texts]
+
+
+# Benchmark against the substring matcher used before
+if __name__ == "__main__":
+    import random
+    import time
+    from enhanced_sentiment_analyzer import EnhancedSentimentAnalyzer
+
+    analyzer = EnhancedSentimentAnalyzer()
+
+    def substring_matcher(text):
+        text_lower = text.lower()
+        scores = {}
+        for main_category, subcategories in analyzer.sentiment_categories.items():
+            for subcategory, words in subcategories.items():
+                scores[f"{main_category}.{subcategory}"] = sum(1 for word in words if word in text_lower)
+        for context_type, indicators in analyzer.context_indicators.items():
+            scores[f"context.{context_type}"] = sum(1 for indicator in indicators if indicator in text_lower)
+        return scores
+
+    test_texts = [
+        "This is not good at all.",
+        "The new release is very good, extremely fast and really helpful!",
+        "I don't hate it, but I'm not happy either.",
+        "Never been so disappointed with a company before.",
+        "Not bad, the machine learning team did a great job."
+    ]
+
+    print("Testing Lexicon Scorer:")
+    print("=" * 50)
+    for text in test_texts:
+        scores = analyzer.analyze_enhanced_sentiment(text)['sentiment_breakdown']
+        polar = {category: round(sum(subcategories.values()), 2) for category, subcategories in scores.items()}
+        print(f"{text}\n   {polar}")
+
+    vocabulary = [word for subcategories in analyzer.sentiment_categories.values()
+                  for words in subcategories.values() for word in words]
+    filler = "the a product team market people update release today new users said about with".split()
+    random.seed(42)
+    corpus = []
+    for _ in range(2000):
+        words = random.choices(filler, k=random.randint(10, 40)) + random.choices(vocabulary, k=3) + ['not', 'very']
+        random.shuffle(words)
+        corpus.append(' '.join(words))
+
+    start = time.perf_counter()
+    for text in corpus:
+        substring_matcher(text)
+    baseline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analyzer.scorer.score_batch(corpus)
+    token_sweep = time.perf_counter() - start
+
+    ratio = token_sweep / baseline
+    print(f"\nSubstring matcher: {baseline * 1000:.1f}ms for {len(corpus)} texts")
+    print(f"Token sweep:       {token_sweep * 1000:.1f}ms for {len(corpus)} texts")
+    print(f"Cost ratio:        {ratio:.2f}x (budget 1.5x)")
+    if ratio > 1.5:
+        raise SystemExit("Token-level scorer exceeded 1.5x the substring matcher cost")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Lexicon Store - Versioned, hot-reloadable sentiment vocabularies
+Lexicons are read from config/lexicons.json, compiled once per version and swapped atomically
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_LEXICON_PATH = os.getenv(
+    'LEXICON_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'lexicons.json')
+)
+
+# Seconds between file checks in the background watcher
+LEXICON_RELOAD_INTERVAL = float(os.getenv('LEXICON_RELOAD_INTERVAL', '5'))
+
+
+class LexiconSnapshot:
+    """Immutable view of one lexicon version and the matchers compiled from it"""
+
+    def __init__(self, version: str, data: Dict, compiled: Dict[str, Any]):
+        self.version = version
+        self.data = data
+        self.compiled = compiled
+
+
+class LexiconStore:
+    def __init__(self, path: str = DEFAULT_LEXICON_PATH):
+        self.path = path
+        self._compilers: Dict[str, Callable[[Dict], Any]] = {}
+        self._lock = threading.Lock()
+        self._file_state = None
+        self._watcher = None
+        self._snapshot = self._build_snapshot(self._read_file())
+
+    @staticmethod
+    def compute_version(data: Dict) -> str:
+        """Content hash of the lexicon, independent of formatting and key order"""
+        canonical = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+
+    def _read_file(self) -> Dict:
+        stat = os.stat(self.path)
+        # Remember the state before parsing so a broken file is only retried once it changes again
+        self._file_state = (stat.st_mtime_ns, stat.st_size)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _build_snapshot(self, data: Dict) -> LexiconSnapshot:
+        compiled = {name: compiler(data) for name, compiler in self._compilers.items()}
+        return LexiconSnapshot(self.compute_version(data), data, compiled)
+
+    def register_compiler(self, name: str, compiler: Callable[[Dict], Any]):
+        """Register a function that compiles lexicon data into a matcher, rebuilt on every new version"""
+        with self._lock:
+            self._compilers[name] = compiler
+            snapshot = self._snapshot
+            compiled = dict(snapshot.compiled)
+            compiled[name] = compiler(snapshot.data)
+            self._snapshot = LexiconSnapshot(snapshot.version, snapshot.data, compiled)
+
+    def current(self) -> LexiconSnapshot:
+        """Return the active snapshot; callers should use one snapshot for a whole batch"""
+        return self._snapshot
+
+    @property
+    def version(self) -> str:
+        return self._snapshot.version
+
+    def maybe_reload(self) -> bool:
+        """Reload and recompile if the file changed. Returns True when a new version was swapped in."""
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            print(f"⚠️ Lexicon file unavailable, keeping version {self.version}: {e}")
+            return False
+        if (stat.st_mtime_ns, stat.st_size) == self._file_state:
+            return False
+
+        with self._lock:
+            try:
+                data = self._read_file()
+                if self.compute_version(data) == self._snapshot.version:
+                    return False
+                snapshot = self._build_snapshot(data)
+            except Exception as e:
+                # A half-written or invalid file must not take down scoring
+                print(f"⚠️ Lexicon reload failed, keeping version {self.version}: {e}")
+                return False
+            previous = self._snapshot.version
+            self._snapshot = snapshot
+
+        print(f"🔄 Lexicon reloaded: {previous} -> {snapshot.version}")
+        return True
+
+    def start_watcher(self, interval: float = LEXICON_RELOAD_INTERVAL):
+        """Poll the lexicon file in a daemon thread and hot-swap new versions"""
+        if self._watcher is not None:
+            return
+
+        stop_event = threading.Event()
+
+        def watch():
+            while not stop_event.wait(interval):
+                self.maybe_reload()
+
+        self._watcher = (threading.Thread(target=watch, name='lexicon-watcher', daemon=True), stop_event)
+        self._watcher[0].start()
+
+    def stop_watcher(self):
+        if self._watcher is not None:
+            thread, stop_event = self._watcher
+            stop_event.set()
+            thread.join()
+            self._watcher = None
+
+
+_default_store: Optional[LexiconStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_lexicon_store() -> LexiconStore:
+    """Process-wide store shared by the analyzer and the data fetcher"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = LexiconStore()
+    return _default_store
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+LLM Client - One chat completion client for the whole process
+Pooled HTTP connections, timeouts, bounded concurrency and retries in front of a pluggable backend:
+OpenAI for production, a deterministic stub with latency injection for offline and load tests (LLM_BACKEND=stub)
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+DEFAULT_MAX_TOKENS = 400
+DEFAULT_TEMPERATURE = 0.7
+
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))
+LLM_CONNECT_TIMEOUT_SECONDS = 5.0
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_RETRY_BACKOFF_SECONDS = 0.5
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', '10'))
+
+
+class LLMBusyError(RuntimeError):
+    """Raised when no request slot frees up within LLM_QUEUE_TIMEOUT_SECONDS"""
+
+
+class StubTransientError(RuntimeError):
+    """Injected failure from the stub backend, retried like a network error"""
+
+
+class OpenAIChatBackend:
+    name = 'openai'
+
+    def __init__(self, api_key: str):
+        import httpx
+        import openai
+
+        # One keep-alive pool for every request; retries are done by LLMClient, not the SDK
+        self.http_client = httpx.Client(
+            timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(max_connections=LLM_MAX_CONCURRENCY, max_keepalive_connections=LLM_MAX_CONCURRENCY)
+        )
+        self.client = openai.OpenAI(api_key=api_key, http_client=self.http_client, max_retries=0)
+        self.retryable_errors = (
+            openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError, openai.InternalServerError
+        )
+
+    def is_retryable(self, error: Exception) -> bool:
+        return isinstance(error, self.retryable_errors)
+
+    def complete(self, messages: List[Dict], model: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 temperature: float = DEFAULT_TEMPERATURE) -> str:
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content.strip()
+
+    def stream(self, messages: List[Dict], model: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+               temperature: float = DEFAULT_TEMPERATURE) -> Iterator[str]:
+        """Yield completion tokens as the API produces them"""
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class StubChatBackend:
+    """Deterministic offline backend: the same messages always produce the same answer.
+
+    Latency is injected to mimic a hosted model: first_token_latency before the first token
+    (scaled by prompt size and a per-prompt jitter), then token_delay per token. failure_rate
+    injects retryable errors from a seeded generator, so load tests are reproducible.
+    """
+    name = 'stub'
+
+    def __init__(self, first_token_latency: float = 0.0, token_delay: float = 0.0,
+                 failure_rate: float = 0.0, seed: int = 42):
+        self.first_token_latency = first_token_latency
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def is_retryable(self, error: Exception) -> bool:
+        return isinstance(error, StubTransientError)
+
+    def _answer(self, messages: List[Dict], model: str, max_tokens: int) -> str:
+        question = messages[-1]['content'] if messages else ''
+        marker = question.find('User Question:')
+        if marker >= 0:
+            question = question[marker + len('User Question:'):].split('\n', 1)[0]
+        words = question.split()
+        answer = (f"Offline answer from {model} about: {' '.join(words[:12])}. "
+                  f"The prompt had {sum(len(m['content']) for m in messages)} characters "
+                  f"across {len(messages)} messages.")
+        return ' '.join(answer.split()[:max_tokens])
+
+    def _wait_for_first_token(self, messages: List[Dict]):
+        with self._rng_lock:
+            failed = self._rng.random() < self.failure_rate
+        if self.first_token_latency:
+            prompt_chars = sum(len(m['content']) for m in messages)
+            digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode('utf-8')).digest()
+            jitter = 0.8 + 0.4 * digest[0] / 255
+            # Longer prompts take longer to prefill, roughly +10% per 1000 characters
+            time.sleep(self.first_token_latency * jitter * (1 + prompt_chars / 10000))
+        if failed:
+            raise StubTransientError("Injected stub backend failure")
+
+    def complete(self, messages: List[Dict], model: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 temperature: float = DEFAULT_TEMPERATURE) -> str:
+        self._wait_for_first_token(messages)
+        answer = self._answer(messages, model, max_tokens)
+        if self.token_delay:
+            time.sleep(self.token_delay * len(answer.split()))
+        return answer
+
+    def stream(self, messages: List[Dict], model: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+               temperature: float = DEFAULT_TEMPERATURE) -> Iterator[str]:
+        self._wait_for_first_token(messages)
+        for i, word in enumerate(self._answer(messages, model, max_tokens).split(' ')):
+            if self.token_delay and i:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else ' ' + word
+
+
+class LLMClient:
+    """Bounded-concurrency, retrying front end shared by every chat code path"""
+
+    def __init__(self, backend, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES, queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+        # Complete and stream calls are timed separately: only a stream has a first token to time
+        self._stats = {'requests': 0, 'failures': 0, 'retries': 0, 'rejected': 0, 'in_flight': 0,
+                       'completions': 0, 'completion_seconds': 0.0,
+                       'streams': 0, 'stream_seconds': 0.0, 'first_tokens': 0, 'first_token_seconds': 0.0}
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    def _count(self, key: str, amount: float = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count('rejected')
+            raise LLMBusyError(f"All {self.max_concurrency} LLM request slots busy for {self.queue_timeout}s")
+        self._count('in_flight')
+
+    def _release(self):
+        self._count('in_flight', -1)
+        self._slots.release()
+
+    def _backoff(self, attempt: int, error: Exception):
+        self._count('retries')
+        delay = LLM_RETRY_BACKOFF_SECONDS * 2 ** attempt
+        print(f"⚠️ LLM request failed ({error}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+    def complete(self, messages: List[Dict], model: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 temperature: float = DEFAULT_TEMPERATURE) -> str:
+        self._acquire()
+        start = time.perf_counter()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    answer = self.backend.complete(messages, model, max_tokens, temperature)
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries or not self.backend.is_retryable(e):
+                        self._count('failures')
+                        raise
+                    self._backoff(attempt, e)
+            self._count('completions')
+            self._count('completion_seconds', time.perf_counter() - start)
+            return answer
+        finally:
+            self._count('requests')
+            self._release()
+
+    def stream(self, messages: List[Dict], model: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+               temperature: float = DEFAULT_TEMPERATURE) -> Iterator[str]:
+        """Yield tokens; a failure is retried only if no token has been yielded yet"""
+        self._acquire()
+        start = time.perf_counter()
+        try:
+            for attempt in range(self.max_retries + 1):
+                started = False
+                try:
+                    for token in self.backend.stream(messages, model, max_tokens, temperature):
+                        if not started:
+                            started = True
+                            self._count('first_tokens')
+                            self._count('first_token_seconds', time.perf_counter() - start)
+                        yield token
+                    break
+                except Exception as e:
+                    if started or attempt == self.max_retries or not self.backend.is_retryable(e):
+                        self._count('failures')
+                        raise
+                    self._backoff(attempt, e)
+            self._count('streams')
+            self._count('stream_seconds', time.perf_counter() - start)
+        finally:
+            self._count('requests')
+            self._release()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        completion_seconds = stats.pop('completion_seconds')
+        stream_seconds = stats.pop('stream_seconds')
+        first_token_seconds = stats.pop('first_token_seconds')
+        stats.update({
+            'backend': self.name,
+            'max_concurrency': self.max_concurrency,
+            'avg_completion_seconds': round(completion_seconds / stats['completions'], 4) if stats['completions'] else 0.0,
+            'avg_stream_seconds': round(stream_seconds / stats['streams'], 4) if stats['streams'] else 0.0,
+            'avg_first_token_seconds': round(first_token_seconds / stats['first_tokens'], 4) if stats['first_tokens'] else 0.0
+        })
+        return stats
+
+
+def create_llm_backend(api_key: Optional[str] = None):
+    """Pick a backend from LLM_BACKEND (openai/stub); returns None when no backend is usable"""
+    backend = os.getenv('LLM_BACKEND', 'openai').lower()
+    if backend == 'stub':
+        return StubChatBackend(
+            first_token_latency=float(os.getenv('LLM_STUB_LATENCY', '0')),
+            token_delay=float(os.getenv('LLM_STUB_TOKEN_DELAY', '0')),
+            failure_rate=float(os.getenv('LLM_STUB_FAILURE_RATE', '0'))
+        )
+    if not api_key:
+        return None
+    return OpenAIChatBackend(api_key)
+
+
+# Process-wide client, so the connection pool and concurrency limit cover every caller
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client() -> Optional[LLMClient]:
+    """Return the shared LLM client, or None when no backend is configured"""
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                backend = create_llm_backend(os.getenv('OPENAI_API_KEY'))
+                if backend is None:
+                    return None
+                _llm_client = LLMClient(backend)
+    return _llm_client
+
+
+# Headers that keep proxies (nginx) from buffering a token stream
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def sse_events(tokens: Iterator[str]) -> Iterator[str]:
+    """Format tokens as Server-Sent Events, ending with a `done` event (or `error` if the stream breaks)"""
+    try:
+        for token in tokens:
+            yield f"data: {json.dumps({'token': token})}\n\n"
+    except Exception as e:
+        print(f"Chat stream error: {e}")
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
+
+
+# Load-test the client against the stub backend
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    n_requests = 64
+    messages = [
+        [{"role": "system", "content": "You are Sentimental AI."},
+         {"role": "user", "content": f"User Question: what changed in batch {i}?"}]
+        for i in range(n_requests)
+    ]
+
+    print("Testing LLM Client:")
+    print("=" * 50)
+    for concurrency in (1, 8, 32):
+        backend = StubChatBackend(first_token_latency=0.2, token_delay=0.005, failure_rate=0.1)
+        client = LLMClient(backend, max_concurrency=concurrency, queue_timeout=60)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            answers = list(pool.map(lambda m: ''.join(client.stream(m, 'stub-model')), messages))
+        elapsed = time.perf_counter() - start
+        stats = client.stats()
+        print(f"concurrency={concurrency:>2}: {n_requests / elapsed:6.1f} req/s, "
+              f"ttft {stats['avg_first_token_seconds'] * 1000:.0f}ms, retries {stats['retries']}, "
+              f"failures {stats['failures']}, {len(set(answers))} distinct answers")
@@ -1,14 +1,28 @@
+from startup_profiler import install_import_hook, mark_ready, track, report as startup_report, print_report as print_startup_report
+install_import_hook()
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 import uvicorn
 import os
-from reliable_data_fetcher import ReliableDataFetcher
-from enhanced_ai_chat import EnhancedAIChat
+import threading
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+with track('reliable_data_fetcher', 'import'):
+    from reliable_data_fetcher import ReliableDataFetcher
+with track('enhanced_ai_chat', 'import'):
+    from enhanced_ai_chat import EnhancedAIChat
+from lexicon_store import get_lexicon_store
+from llm_client import get_llm_client, sse_events, SSE_HEADERS
+from intent_matcher import question_matcher
+from result_columns import ResultColumns
+from response_cache import TTLCache
 import json
 from datetime import datetime, timezone
-from collections import defaultdict
 import math
 
 app = FastAPI(title="Sentimental AI API", version="1.0.0")
@@ -23,13 +37,28 @@ app.add_middleware(
 )
 
 # Initialize components
-data_fetcher = ReliableDataFetcher()
-ai_chat = EnhancedAIChat()
+with track('ReliableDataFetcher()'):
+    data_fetcher = ReliableDataFetcher()
+with track('EnhancedAIChat()'):
+    ai_chat = EnhancedAIChat()
+mark_ready()
+print_startup_report()
+
+# AI answers are generated off the analyze critical path; callers get the
+# fallback summary if the answer misses its budget and can fetch it later
+AI_ANSWER_BUDGET_SECONDS = float(os.getenv('AI_ANSWER_BUDGET_SECONDS', '0'))
+AI_ANSWER_MAX_WAIT_SECONDS = 30.0
+ai_answer_executor = ThreadPoolExecutor(max_workers=int(os.getenv('AI_ANSWER_WORKERS', '4')), thread_name_prefix='ai-answer')
+pending_ai_answers = TTLCache(max_size=1024, ttl_seconds=float(os.getenv('AI_ANSWER_RETENTION_SECONDS', '600')))
+
+# Pick up lexicon edits without a restart
+get_lexicon_store().start_watcher()
 
 class AnalysisRequest(BaseModel):
     query: str
     max_tweets: int = 100
     use_real_data: bool = True
+    ai_answer_budget: Optional[float] = None  # seconds to wait for the AI answer, defaults to AI_ANSWER_BUDGET_SECONDS
 
 class ChatRequest(BaseModel):
     message: str
@@ -39,6 +68,37 @@ class ChatRequest(BaseModel):
 async def root():
     return {"message": "Sentimental AI API is running!"}
 
+@app.on_event("startup")
+async def warm_up_components():
+    """Optionally load the spaCy NER pipeline in the background so the first chat is fast"""
+    if os.getenv('WARM_UP_NLP', '').lower() in ('1', 'true', 'yes'):
+        def warm_up():
+            with track('EnhancedAIChat.warm_up()', 'warm-up'):
+                ai_chat.warm_up()
+            print("🔥 NLP pipeline warmed up")
+        threading.Thread(target=warm_up, name='nlp-warm-up', daemon=True).start()
+
+@app.get("/api/chat/cache")
+async def get_chat_cache_stats():
+    """Get hit rate and size of the AI answer cache."""
+    return ai_chat.response_cache.stats()
+
+@app.get("/api/chat/prompt-stats")
+async def get_chat_prompt_stats():
+    """Get prompt token usage of the AI chat."""
+    return ai_chat.get_prompt_stats()
+
+@app.get("/api/llm/stats")
+async def get_llm_stats():
+    """Get request, retry and latency counters of the shared LLM client."""
+    llm = get_llm_client()
+    return llm.stats() if llm else {"backend": None}
+
+@app.get("/api/startup")
+async def get_startup_report():
+    """Get import and initialization cost per component and per module, and the time to ready."""
+    return startup_report()
+
 @app.post("/api/analyze")
 async def analyze_sentiment(request: AnalysisRequest):
     try:
@@ -61,74 +121,33 @@ async def analyze_sentiment(request: AnalysisRequest):
         if not data_items:
             raise HTTPException(status_code=404, detail="No data found for the query")
         
-        # Perform sentiment analysis and assign sentiment to each item
+        # Perform sentiment analysis, keeping per-item results in columns
         print("Starting sentiment analysis...")
-        analysis_results = data_fetcher.analyze_sentiment(data_items)
+        sentiments, lexicon_version = data_fetcher.classify_items(data_items)
+        columns = ResultColumns.from_items(data_items, sentiments)
+        source_sentiment_counts = columns.platform_sentiment_counts()
+        percentages = columns.sentiment_percentages()
+        analysis_results = {
+            "total_tweets": len(data_items),
+            "positive_percentage": percentages["positive_percentage"],
+            "negative_percentage": percentages["negative_percentage"],
+            "neutral_percentage": percentages["neutral_percentage"],
+            "platform_breakdown": source_sentiment_counts,
+            "lexicon_version": lexicon_version
+        }
         print("Sentiment analysis completed")
-        # Assign sentiment to each item (ensure each item has 'sentiment' key)
-        if hasattr(data_fetcher, 'assign_sentiment_to_items'):
-            data_fetcher.assign_sentiment_to_items(data_items)
-        else:
-            # Fallback: assign using the same logic as analyze_sentiment if available
-            for item in data_items:
-                item['sentiment'] = data_fetcher.simple_sentiment(item.get('text', '')) if hasattr(data_fetcher, 'simple_sentiment') else 'neutral'
         
         # Timeline: group by hour (UTC) for real time-based sentiment
-        timeline_buckets = defaultdict(list)
-        now = datetime.now(timezone.utc)
-        for item in data_items:
-            created_at = item.get('created_at')
-            if isinstance(created_at, str):
-                try:
-                    created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                except Exception:
-                    created_at = now
-            elif not isinstance(created_at, datetime):
-                created_at = now
-            # Bucket by hour difference from now (0 = this hour, 1 = 1h ago, ...)
-            hour_diff = int((now - created_at).total_seconds() // 3600)
-            timeline_buckets[hour_diff].append(item)
-        # Sort buckets by recency (0 = most recent)
-        sorted_hours = sorted(timeline_buckets.keys())[:4]
-        timeline = {"time": [], "positive": [], "negative": [], "neutral": []}
-        for hour in sorted_hours:
-            bucket = timeline_buckets[hour]
-            if bucket:
-                pos = sum(1 for x in bucket if x.get('sentiment') == 'positive') / len(bucket) * 100
-                neg = sum(1 for x in bucket if x.get('sentiment') == 'negative') / len(bucket) * 100
-                neu = sum(1 for x in bucket if x.get('sentiment') == 'neutral') / len(bucket) * 100
-            else:
-                pos = analysis_results.get("positive_percentage", 0)
-                neg = analysis_results.get("negative_percentage", 0)
-                neu = analysis_results.get("neutral_percentage", 0)
-            label = f"{hour}h ago" if hour > 0 else "now"
-            timeline["time"].append(label)
-            timeline["positive"].append(round(pos, 1))
-            timeline["negative"].append(round(neg, 1))
-            timeline["neutral"].append(round(neu, 1))
+        timeline = columns.hour_buckets(datetime.now(timezone.utc))
         # If all data is from the same hour, show a single bucket
         if len(timeline["time"]) == 1:
             timeline["time"] = ["now"]
-        # Calculate sentiment counts per source
-        source_sentiment_counts = {}
-        for item in data_items:
-            source = (item.get('platform') or item.get('source') or 'unknown').lower()
-            sentiment = item.get('sentiment', 'neutral')
-            if source not in source_sentiment_counts:
-                source_sentiment_counts[source] = {'positive': 0, 'negative': 0, 'neutral': 0}
-            if sentiment in source_sentiment_counts[source]:
-                source_sentiment_counts[source][sentiment] += 1
-            else:
-                source_sentiment_counts[source]['neutral'] += 1  # fallback
         # Prepare response with more sample items
         print("DEBUG TIMELINE:", json.dumps(timeline, indent=2, default=str))
         print("DEBUG SOURCE SENTIMENT COUNTS:", json.dumps(source_sentiment_counts, indent=2))
         
-        # Fix: Convert source_sentiment_counts to platform_breakdown with total counts
-        platform_breakdown_cleaned = {
-            source: sum(counts.values())  # Only keep total number per source
-            for source, counts in source_sentiment_counts.items()
-        }
+        # Convert back to per-item dicts only for the response
+        data_items = columns.to_records()
 
         response = {
             "total_tweets": len(data_items),
@@ -137,20 +156,31 @@ async def analyze_sentiment(request: AnalysisRequest):
             "neutral_percentage": analysis_results.get("neutral_percentage", 0),
             "timeline": timeline,
             "sample_tweets": data_items,  # send all items for frontend diversity
-            "platform_breakdown": platform_breakdown_cleaned,
+            "platform_breakdown": columns.platform_counts(),
             "source_sentiment_counts": source_sentiment_counts,
+            "lexicon_version": analysis_results.get("lexicon_version"),
             "success": True,
             "message": "Analysis complete"
         }
         
-        # Inject AI-generated contextual response
-        ai_answer = ai_chat.generate_contextual_response(
+        # Generate the AI contextual response concurrently, waiting at most the budget
+        ai_future = ai_answer_executor.submit(
+            ai_chat.generate_contextual_response,
             request.query,
             analysis_results,
             data_items
         )
+        answer_id = uuid.uuid4().hex
+        pending_ai_answers.set(answer_id, ai_future)
+        
+        budget = AI_ANSWER_BUDGET_SECONDS if request.ai_answer_budget is None else request.ai_answer_budget
+        ai_answer, ai_status = await _await_ai_answer(ai_future, budget)
+        if ai_answer is None:
+            ai_answer = ai_chat._fallback_response(request.query, analysis_results)
         
         response["ai_answer"] = ai_answer
+        response["ai_answer_status"] = ai_status
+        response["ai_answer_id"] = answer_id
 
         print(f"Analysis complete: {len(data_items)} items, {analysis_results.get('positive_percentage', 0)}% positive")
         return response
@@ -159,6 +189,34 @@ async def analyze_sentiment(request: AnalysisRequest):
         print(f"Analysis error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _await_ai_answer(future, timeout: float):
+    """Wait up to timeout seconds for an AI answer; returns (answer or None, status)"""
+    if not future.done() and timeout > 0:
+        try:
+            # shield so a timeout never cancels the queued generation
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        except Exception:
+            pass  # reported from future.result() below
+    if not future.done():
+        return None, "pending"
+    try:
+        return future.result(), "complete"
+    except Exception as e:
+        print(f"AI answer error: {e}")
+        return None, "failed"
+
+@app.get("/api/analyze/ai-answer/{answer_id}")
+async def get_ai_answer(answer_id: str, wait: float = 0.0):
+    """Fetch an AI answer that was still pending when /api/analyze returned"""
+    future = pending_ai_answers.get(answer_id)
+    if future is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired AI answer id")
+    
+    ai_answer, ai_status = await _await_ai_answer(future, min(max(wait, 0.0), AI_ANSWER_MAX_WAIT_SECONDS))
+    return {"ai_answer_id": answer_id, "ai_answer_status": ai_status, "ai_answer": ai_answer}
+
 @app.post("/api/chat")
 async def chat_with_ai(request: ChatRequest):
     try:
@@ -172,12 +230,19 @@ async def chat_with_ai(request: ChatRequest):
             sample_data
         )
         
-        return {"response": response}
+        return {"response": response, "intents": question_matcher.match(request.message)}
         
     except Exception as e:
         print(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/stream")
+def stream_chat_with_ai(request: ChatRequest):
+    """Relay the AI answer as Server-Sent Events, one `data` event per token"""
+    sample_data = request.analysis_results.get("sample_tweets", [])
+    tokens = ai_chat.stream_contextual_response(request.message, request.analysis_results, sample_data)
+    return StreamingResponse(sse_events(tokens), media_type="text/event-stream", headers=SSE_HEADERS)
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port) 
\ No newline at end of file
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Model Compression - Pruned, quantized serving artifact for linear sentiment models and ensembles
+Near-zero weights are pruned, features no class uses are dropped from the vocabulary, and the
+remaining weights are stored as int8 (or float16) with per-class scales. In an ensemble every
+linear member is compressed this way and tree members are kept as they are.
+"""
+
+import copy
+import os
+import pickle
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.frozen import FrozenEstimator
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.linear_model._base import LinearClassifierMixin
+from sklearn.pipeline import Pipeline
+
+# Weights smaller than this fraction of their class's largest weight are pruned
+PRUNE_RATIO = float(os.getenv('COMPRESSION_PRUNE_RATIO', '0.02'))
+WEIGHT_DTYPE = os.getenv('COMPRESSION_WEIGHT_DTYPE', 'int8')
+# Share of predictions that must match the original model
+MIN_AGREEMENT = float(os.getenv('COMPRESSION_MIN_AGREEMENT', '0.99'))
+
+COMPRESSED_MODEL_PATH = 'best_enhanced_sentiment_model.compressed.pkl'
+
+
+def _proba_mode(clf) -> Optional[str]:
+    """How the classifier turns decision scores into probabilities, if it has predict_proba"""
+    if isinstance(clf, LogisticRegression):
+        ovr = clf.solver == 'liblinear' or getattr(clf, 'multi_class', None) == 'ovr'
+        return 'ovr' if ovr and len(clf.classes_) > 2 else 'softmax'
+    if isinstance(clf, SGDClassifier) and clf.loss == 'log_loss':
+        return 'ovr' if len(clf.classes_) > 2 else 'softmax'
+    return None
+
+
+def is_linear_classifier(estimator) -> bool:
+    return isinstance(estimator, LinearClassifierMixin) and hasattr(estimator, 'coef_')
+
+
+class CompressedLinearModel:
+    """Linear classifier with the predict/predict_proba interface of the model it replaces.
+
+    With a featurizer it takes text (replacing a whole pipeline); without one it takes the
+    feature matrix (replacing an ensemble member behind a shared vectorizer).
+    """
+
+    def __init__(self, featurizer, feature_index: Optional[np.ndarray], weights: np.ndarray,
+                 scales: Optional[np.ndarray], intercept: np.ndarray, classes: np.ndarray, proba_mode: Optional[str]):
+        self.featurizer = featurizer
+        self.feature_index = feature_index
+        self.weights = weights
+        self.scales = scales
+        self.intercept = intercept
+        self.classes_ = classes
+        self.proba_mode = proba_mode
+        self._matmul_weights = None
+
+    def __getstate__(self):
+        # The float32 matmul copy is rebuilt on first use, so the artifact holds only the compact weights
+        state = dict(self.__dict__)
+        state['_matmul_weights'] = None
+        return state
+
+    @classmethod
+    def from_linear(cls, clf, featurizer=None, prune_ratio: float = PRUNE_RATIO,
+                    weight_dtype: str = WEIGHT_DTYPE) -> 'CompressedLinearModel':
+        """Compress a fitted linear classifier, optionally with the featurizer in front of it"""
+        if not is_linear_classifier(clf):
+            raise ValueError(f"{type(clf).__name__} is not a linear classifier and cannot be compressed")
+
+        coef = np.asarray(clf.coef_, dtype=np.float64)
+        intercept = np.asarray(clf.intercept_, dtype=np.float64)
+        if coef.shape[0] == 1:
+            # Binary models keep one row of weights; a zero row for the first class gives the
+            # same argmax, and its softmax is the sigmoid of the original score
+            coef = np.vstack([np.zeros_like(coef), coef])
+            intercept = np.array([0.0, intercept[0]])
+
+        # Prune per class, relative to that class's largest weight
+        limits = prune_ratio * np.abs(coef).max(axis=1, keepdims=True)
+        coef = np.where(np.abs(coef) >= limits, coef, 0.0)
+        used = np.flatnonzero(np.any(coef != 0, axis=0))
+        coef = coef[:, used]
+
+        if isinstance(featurizer, TfidfVectorizer):
+            # Keep only the used vocabulary; the slim vectorizer emits exactly the kept columns
+            featurizer = _shrink_tfidf_vocabulary(featurizer, used)
+            feature_index = None
+        else:
+            # Hashed or shared features have no vocabulary of their own; select the used columns
+            feature_index = used.astype(np.int32)
+
+        if weight_dtype == 'int8':
+            scales = np.abs(coef).max(axis=1) / 127
+            scales[scales == 0] = 1.0
+            weights = np.round(coef / scales[:, None]).astype(np.int8)
+            scales = scales.astype(np.float32)
+        elif weight_dtype == 'float16':
+            weights, scales = coef.astype(np.float16), None
+        else:
+            raise ValueError(f"Unknown weight dtype '{weight_dtype}', expected 'int8' or 'float16'")
+
+        return cls(featurizer, feature_index, weights, scales, intercept.astype(np.float32),
+                   np.asarray(clf.classes_), _proba_mode(clf))
+
+    @classmethod
+    def from_pipeline(cls, model, prune_ratio: float = PRUNE_RATIO,
+                      weight_dtype: str = WEIGHT_DTYPE) -> 'CompressedLinearModel':
+        """Compress a fitted Pipeline([('tfidf', featurizer), ('clf', linear classifier)])"""
+        steps = getattr(model, 'named_steps', {})
+        if steps.get('tfidf') is None or steps.get('clf') is None:
+            raise ValueError("Only pipelines of a featurizer and a linear classifier can be compressed")
+        return cls.from_linear(steps['clf'], steps['tfidf'], prune_ratio, weight_dtype)
+
+    def decision_function(self, X) -> np.ndarray:
+        features = self.featurizer.transform(X) if self.featurizer is not None else X
+        if self.feature_index is not None:
+            features = features[:, self.feature_index]
+        # Sparse products need float weights; the float32 copy is made once per loaded model, and the
+        # per-class scales are applied to the scores rather than to the weights
+        if getattr(self, '_matmul_weights', None) is None:
+            self._matmul_weights = np.ascontiguousarray(self.weights.T, dtype=np.float32)
+        scores = np.asarray(features @ self._matmul_weights)
+        if self.scales is not None:
+            scores = scores * self.scales
+        return scores + self.intercept
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.decision_function(X).argmax(axis=1)]
+
+    def predict_proba(self, X) -> np.ndarray:
+        scores = self.decision_function(X)
+        if self.proba_mode == 'softmax':
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        elif self.proba_mode == 'ovr':
+            scores = 1 / (1 + np.exp(-scores))
+        else:
+            raise AttributeError("The original classifier had no predict_proba")
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def describe(self) -> Dict:
+        return {
+            'features_kept': int(self.weights.shape[1]),
+            'weight_dtype': str(self.weights.dtype),
+            'weight_bytes': int(self.weights.nbytes),
+            'artifact_bytes': len(pickle.dumps(self))
+        }
+
+
+def _shrink_tfidf_vocabulary(vectorizer: TfidfVectorizer, used: np.ndarray) -> TfidfVectorizer:
+    """Fitted TfidfVectorizer restricted to the used feature columns, without the pruned-term list.
+
+    The L2 norm is then taken over kept features only, which is why compression is validated
+    against the original predictions.
+    """
+    terms = vectorizer.get_feature_names_out()[used]
+    # A fixed vocabulary skips document-frequency pruning, so fitting only sets up the shapes;
+    # the original IDF weights are then restored for the kept terms
+    slim = TfidfVectorizer(**dict(vectorizer.get_params(), vocabulary=list(terms)))
+    slim.fit(terms)
+    slim.idf_ = vectorizer.idf_[used]
+    return slim
+
+
+def compress_ensemble(model, prune_ratio: float = PRUNE_RATIO,
+                      weight_dtype: str = WEIGHT_DTYPE) -> Tuple[object, List[str]]:
+    """Copy of a fitted VotingClassifier/StackingClassifier (or a pipeline ending in one) with every
+    linear member compressed; other members are kept as they are. Returns the copy and the compressed names."""
+    compressed = copy.deepcopy(model)
+    combiner = compressed.named_steps['clf'] if isinstance(compressed, Pipeline) else compressed
+    if not hasattr(combiner, 'estimators_'):
+        raise ValueError(f"{type(combiner).__name__} is not a fitted ensemble")
+
+    names = [name for name, estimator in combiner.estimators if estimator != 'drop']
+    compressed_names = []
+    for idx, (name, member) in enumerate(zip(names, combiner.estimators_)):
+        inner = member.estimator if isinstance(member, FrozenEstimator) else member
+        if isinstance(inner, Pipeline) and is_linear_classifier(inner.named_steps.get('clf')):
+            replacement = CompressedLinearModel.from_pipeline(inner, prune_ratio, weight_dtype)
+        elif is_linear_classifier(inner):
+            replacement = CompressedLinearModel.from_linear(inner, None, prune_ratio, weight_dtype)
+        else:
+            continue
+        combiner.estimators_[idx] = replacement
+        if hasattr(combiner, 'named_estimators_'):
+            combiner.named_estimators_[name] = replacement
+        # Frozen members are shared with the constructor list; replace them there too so the
+        # original weights are not pickled alongside the compressed ones
+        combiner.estimators = [(n, replacement if n == name else e) for n, e in combiner.estimators]
+        compressed_names.append(name)
+    return compressed, compressed_names
+
+
+def validate_compression(original, compressed, texts: Sequence[str],
+                         min_agreement: float = MIN_AGREEMENT) -> Dict:
+    """Prediction agreement and probability drift of the compressed model against the original"""
+    texts = list(texts)
+    agreement = float((original.predict(texts) == compressed.predict(texts)).mean())
+    report = {'texts': len(texts), 'agreement': round(agreement, 5), 'min_agreement': min_agreement,
+              'passed': agreement >= min_agreement}
+    if hasattr(original, 'predict_proba'):
+        try:
+            drift = np.abs(original.predict_proba(texts) - compressed.predict_proba(texts))
+        except AttributeError:
+            return report
+        report['max_proba_drift'] = round(float(drift.max()), 5)
+        report['mean_proba_drift'] = round(float(drift.mean()), 5)
+    return report
+
+
+def compress_model(model, validation_texts: Sequence[str], prune_ratio: float = PRUNE_RATIO,
+                   weight_dtype: str = WEIGHT_DTYPE, min_agreement: float = MIN_AGREEMENT):
+    """Compress a linear pipeline or the linear members of an ensemble, and validate the result.
+
+    Raises ValueError if nothing in the model is linear or the compressed model disagrees too often.
+    """
+    combiner = model.named_steps.get('clf') if isinstance(model, Pipeline) else model
+    if hasattr(combiner, 'estimators_'):
+        compressed, members = compress_ensemble(model, prune_ratio, weight_dtype)
+        if not members:
+            raise ValueError("The ensemble has no linear members to compress")
+    else:
+        compressed = CompressedLinearModel.from_pipeline(model, prune_ratio, weight_dtype)
+        members = ['clf']
+
+    validation = validate_compression(model, compressed, validation_texts, min_agreement)
+    validation.update(compressed_members=members, weight_dtype=weight_dtype, prune_ratio=prune_ratio,
+                      original_bytes=len(pickle.dumps(model)), compressed_bytes=len(pickle.dumps(compressed)))
+    if not validation['passed']:
+        raise ValueError(f"Compressed model agrees on {validation['agreement']:.2%} of predictions, "
+                         f"below the required {min_agreement:.2%}; lower COMPRESSION_PRUNE_RATIO")
+    return compressed, validation
+
+
+# Compress the saved model, or demo linear and ensemble models, and compare the artifacts
+if __name__ == "__main__":
+    import sys
+    import joblib
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else 'best_enhanced_sentiment_model.pkl'
+    print("Testing Model Compression:")
+    print("=" * 50)
+
+    if os.path.exists(model_path):
+        from train_models_enhanced import load_and_preprocess_data
+        _, val_df, _ = load_and_preprocess_data()
+        texts = val_df['cleaned_text'].tolist()
+        models = {model_path: joblib.load(model_path)}
+        output_path = COMPRESSED_MODEL_PATH
+    else:
+        from sklearn.ensemble import ExtraTreesClassifier, VotingClassifier
+
+        print(f"{model_path} not found, compressing demo models")
+        rng = np.random.default_rng(0)
+        vocabulary = np.array([f"w{i}" for i in range(3000)])
+        labels = rng.integers(0, 3, 20000)
+        # Each class draws a few words from its own third of the vocabulary
+        texts = [' '.join(rng.choice(vocabulary, 10).tolist() + rng.choice(vocabulary[label::3], 3).tolist())
+                 for label in labels]
+        vectorizer = TfidfVectorizer(max_features=15000, ngram_range=(1, 2), min_df=2, max_df=0.95)
+        features = vectorizer.fit_transform(texts[:15000])
+        linear = LogisticRegression(max_iter=1000).fit(features, labels[:15000])
+        trees = ExtraTreesClassifier(n_estimators=20, max_depth=20, random_state=0).fit(features, labels[:15000])
+        # Same layout as train_models_enhanced: frozen members behind one shared vectorizer
+        voting = VotingClassifier([('lr', FrozenEstimator(linear)), ('trees', FrozenEstimator(trees))], voting='soft')
+        models = {
+            'linear pipeline': Pipeline([('tfidf', vectorizer), ('clf', linear)]),
+            'voting ensemble': Pipeline([('tfidf', vectorizer), ('clf', voting.fit(features[:1000], labels[:1000]))])
+        }
+        texts = texts[15000:]
+        output_path = os.path.join('/tmp', COMPRESSED_MODEL_PATH)
+
+    for name, model in models.items():
+        for dtype in ('float16', 'int8'):
+            compressed, validation = compress_model(model, texts, weight_dtype=dtype)
+            print(f"{name} {dtype}: members {validation['compressed_members']}, "
+                  f"agreement {validation['agreement']}, max proba drift {validation.get('max_proba_drift')}, "
+                  f"{validation['original_bytes'] / 1e6:.2f}MB -> {validation['compressed_bytes'] / 1e6:.2f}MB")
+        for label, candidate in (('original', model), ('compressed', compressed)):
+            payload = pickle.dumps(candidate)
+            start = time.perf_counter()
+            pickle.loads(payload)
+            print(f"{label:>12}: {len(payload) / 1e6:.2f}MB, loads in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    joblib.dump(compressed, output_path)
+    print(f"Saved compressed model as '{output_path}'")
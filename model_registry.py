@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Model Registry - Versioned sentiment model artifacts and hot swapping in the API
+Each version is a directory holding the pickled model and its metadata; an ACTIVE pointer file names
+the served version. New versions are loaded and warmed up in the background, then swapped in atomically.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import joblib
+
+from sentiment_inference import MODEL_PATH
+
+MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', 'model_registry')
+# Served when the registry is still empty, as before the registry existed
+LEGACY_MODEL_PATH = MODEL_PATH
+# Seconds between checks of the ACTIVE pointer, so every worker follows an activation
+MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', '10'))
+
+ACTIVE_POINTER = 'ACTIVE'
+ARTIFACT_NAME = 'model.pkl'
+METADATA_NAME = 'metadata.json'
+
+# Cleaned texts scored before a new model takes traffic, so its first requests are not cold
+WARM_UP_TEXTS = [
+    'love new update works great',
+    'app keeps crashing terrible support',
+    'release scheduled next week',
+    'not bad could better',
+    'worst experience ever never buying again',
+    'pretty happy service today'
+]
+WARM_UP_ROUNDS = 3
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, content: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    def __init__(self, root: str = MODEL_REGISTRY_DIR):
+        self.root = root
+
+    def _version_dir(self, version: str) -> str:
+        # Versions are plain directory names; reject anything that could leave the registry
+        if not version or os.path.basename(version) != version or version.startswith('.'):
+            raise ValueError(f"Invalid model version '{version}'")
+        return os.path.join(self.root, version)
+
+    def register(self, artifact_path: str, metadata: Optional[Dict] = None, activate: Optional[bool] = None) -> str:
+        """Copy a saved model into a new version directory and return the version.
+
+        activate=None activates the version only when no version is active yet.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        sha256 = file_sha256(artifact_path)
+        version = base = f"{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}-{sha256[:8]}"
+        suffix = 1
+        while os.path.exists(self._version_dir(version)):
+            # The same artifact registered twice within a second
+            suffix += 1
+            version = f"{base}-{suffix}"
+        metadata = dict(metadata or {}, version=version, artifact_sha256=sha256,
+                        artifact_bytes=os.path.getsize(artifact_path),
+                        registered_at=datetime.now(timezone.utc).isoformat())
+
+        # Fill a hidden directory, then rename it, so a half-written version is never listed
+        staging = os.path.join(self.root, f".staging-{version}")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        shutil.copyfile(artifact_path, os.path.join(staging, ARTIFACT_NAME))
+        with open(os.path.join(staging, METADATA_NAME), 'w', encoding='utf-8') as f:
+            # Training metrics often hold numpy scalars
+            json.dump(metadata, f, indent=2, default=lambda value: value.item() if hasattr(value, 'item') else str(value))
+        os.replace(staging, self._version_dir(version))
+        print(f"📦 Registered model version {version}")
+
+        if activate or (activate is None and self.active_version() is None):
+            self.set_active(version)
+        return version
+
+    def versions(self) -> List[Dict]:
+        """Metadata of every registered version, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        names = [name for name in os.listdir(self.root)
+                 if not name.startswith('.') and os.path.isdir(os.path.join(self.root, name))]
+        return sorted((self.metadata(name) for name in names), key=lambda entry: entry['registered_at'])
+
+    def metadata(self, version: str) -> Dict:
+        path = os.path.join(self._version_dir(version), METADATA_NAME)
+        if not os.path.exists(path):
+            raise KeyError(f"Unknown model version '{version}'")
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def artifact_path(self, version: str) -> str:
+        path = os.path.join(self._version_dir(version), ARTIFACT_NAME)
+        if not os.path.exists(path):
+            raise KeyError(f"Unknown model version '{version}'")
+        return path
+
+    def load(self, version: str):
+        return joblib.load(self.artifact_path(version))
+
+    def active_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, ACTIVE_POINTER), 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def set_active(self, version: str):
+        self.artifact_path(version)  # fail before moving the pointer to a missing version
+        _write_atomic(os.path.join(self.root, ACTIVE_POINTER), version)
+        print(f"📦 Active model version is now {version}")
+
+
+class ModelServer:
+    """Holds the served model; readers take one reference per request, so a swap never interrupts them"""
+
+    def __init__(self, registry: Optional[ModelRegistry] = None, fallback_path: str = LEGACY_MODEL_PATH):
+        self.registry = registry or ModelRegistry()
+        self.fallback_path = fallback_path
+        self._served = (None, None)
+        # Last ACTIVE pointer acted on; models swapped in directly (online learning) do not move it
+        self._followed = None
+        # Last version that failed to load; the watcher skips it until the pointer moves elsewhere
+        self._failed = None
+        self._activation_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self._status = {'state': 'empty', 'loading_version': None, 'last_error': None,
+                        'swapped_at': None, 'load_seconds': None, 'warm_up_ms': None}
+
+    @property
+    def model(self):
+        return self._served[0]
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._served[1]
+
+    def current(self):
+        """(model, version) pair read together, for callers that report which version scored them"""
+        return self._served
+
+    def load_active(self):
+        """Blocking load of the active version (or the legacy model file) at startup"""
+        version = self._followed = self.registry.active_version()
+        if version is not None:
+            self._load_and_swap(version, update_pointer=False)
+        elif os.path.exists(self.fallback_path):
+            self.swap(joblib.load(self.fallback_path), 'legacy')
+        else:
+            print(f"⚠️ No registered model and no '{self.fallback_path}'; run the training script first")
+        return self.model
+
+    @staticmethod
+    def warm_up(model) -> float:
+        """Score the warm-up texts a few times; returns the last round's latency in milliseconds"""
+        elapsed = 0.0
+        for _ in range(WARM_UP_ROUNDS):
+            start = time.perf_counter()
+            model.predict(WARM_UP_TEXTS)
+            if hasattr(model, 'predict_proba'):
+                model.predict_proba(WARM_UP_TEXTS)
+            elapsed = (time.perf_counter() - start) * 1000
+        return round(elapsed, 2)
+
+    def swap(self, model, version: str):
+        """Replace the served model with a single reference assignment"""
+        self._served = (model, version)
+        self._status.update(state='ready', swapped_at=datetime.now(timezone.utc).isoformat())
+        print(f"✅ Serving model version {version}")
+
+    def _load_and_swap(self, version: str, update_pointer: bool = True) -> bool:
+        self._status.update(state='loading' if self.model is None else 'ready', loading_version=version)
+        try:
+            start = time.perf_counter()
+            model = self.registry.load(version)
+            load_seconds = round(time.perf_counter() - start, 3)
+            warm_up_ms = self.warm_up(model)
+        except Exception as e:
+            # Keep serving the current model; the pointer only moves after a successful load
+            self._failed = version
+            self._status.update(state='ready' if self.model is not None else 'failed',
+                                loading_version=None, last_error=f"{version}: {e}")
+            print(f"⚠️ Could not activate model version {version}: {e}")
+            return False
+        self.swap(model, version)
+        self._followed = version
+        self._failed = None
+        self._status.update(loading_version=None, last_error=None, load_seconds=load_seconds, warm_up_ms=warm_up_ms)
+        if update_pointer:
+            self.registry.set_active(version)
+        return True
+
+    def activate(self, version: str, background: bool = True) -> bool:
+        """Load, warm up and swap in a version. Returns False if another activation is still running."""
+        self.registry.artifact_path(version)  # raise KeyError for unknown versions right away
+        if not self._activation_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self._load_and_swap(version)
+            finally:
+                self._activation_lock.release()
+
+        if background:
+            threading.Thread(target=run, daemon=True, name=f'model-activate-{version}').start()
+        else:
+            run()
+        return True
+
+    def maybe_reload(self) -> bool:
+        """Follow an ACTIVE pointer moved by another worker or process.
+
+        A version that failed to load is not retried on every check; an explicit activate() still retries it.
+        """
+        version = self.registry.active_version()
+        if version in (None, self._followed, self._failed, self._status['loading_version']):
+            return False
+        return self.activate(version, background=False)
+
+    def start_watcher(self, interval: float = MODEL_RELOAD_INTERVAL):
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.maybe_reload()
+                except Exception as e:
+                    print(f"⚠️ Model pointer check failed: {e}")
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=watch, daemon=True, name='model-watcher')
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def status(self) -> Dict:
+        return dict(self._status, version=self.version, active_version=self.registry.active_version())
+
+
+# Register two demo models, activate the second while scoring continuously, and check nothing failed
+if __name__ == "__main__":
+    import tempfile
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    texts = WARM_UP_TEXTS * 20
+    labels = [2, 0, 1, 1, 0, 2] * 20
+
+    print("Testing Model Registry:")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as root:
+        registry = ModelRegistry(os.path.join(root, 'registry'))
+        for C in (0.1, 10.0):
+            path = os.path.join(root, 'model.pkl')
+            joblib.dump(Pipeline([('tfidf', TfidfVectorizer()), ('clf', LogisticRegression(C=C))]).fit(texts, labels), path)
+            registry.register(path, {'model_name': f'LogisticRegression(C={C})'})
+        first, second = [entry['version'] for entry in registry.versions()]
+
+        server = ModelServer(registry)
+        server.load_active()
+        served, errors = {}, 0
+        stop = threading.Event()
+
+        def traffic():
+            global errors
+            while not stop.is_set():
+                model, version = server.current()
+                try:
+                    model.predict(WARM_UP_TEXTS[:1])
+                    served[version] = served.get(version, 0) + 1
+                except Exception:
+                    errors += 1
+
+        worker = threading.Thread(target=traffic)
+        worker.start()
+        time.sleep(0.2)
+        server.activate(second)
+        time.sleep(0.5)
+        stop.set()
+        worker.join()
+
+        print(f"versions: {first} -> {second}")
+        print(f"requests served per version: {served}, errors: {errors}")
+        print(f"status: {server.status()}")
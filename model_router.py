@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Model Router - Shadow scoring and A/B routing between the served model and a candidate version
+A sampled share of requests is re-scored by the candidate on a background thread, recording agreement
+and latency without touching the response; optionally a fixed share of traffic is answered by the candidate.
+"""
+
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', '0.1'))
+# Share of requests answered by the candidate, in percent; 0 keeps it in shadow only
+CANDIDATE_TRAFFIC_PERCENT = float(os.getenv('CANDIDATE_TRAFFIC_PERCENT', '0'))
+# Shadow work waiting beyond this is dropped rather than slowing the request path
+SHADOW_QUEUE_SIZE = int(os.getenv('SHADOW_QUEUE_SIZE', '1000'))
+# Queued shadow texts scored together in one candidate call, as the request path scores its batches
+SHADOW_BATCH_SIZE = int(os.getenv('SHADOW_BATCH_SIZE', '64'))
+LATENCY_WINDOW = 5000
+
+SENTIMENTS = ('negative', 'neutral', 'positive')
+
+
+class LatencyRecorder:
+    """Latencies of the most recent calls, one sample per call tagged with the number of items it scored.
+
+    Percentiles are per call; per_item_ms (total time over total items) compares models scored in
+    batches of different sizes.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.calls = 0
+
+    def record(self, milliseconds: float, items: int = 1):
+        self._samples.append((milliseconds, items))
+        self.count += items
+        self.calls += 1
+
+    def summary(self) -> Dict:
+        if not self._samples:
+            return {'count': self.count, 'calls': self.calls}
+        samples = np.array(self._samples, dtype=np.float64)
+        milliseconds, items = samples[:, 0], samples[:, 1]
+        p50, p95, p99 = np.percentile(milliseconds, [50, 95, 99])
+        return {'count': self.count, 'calls': self.calls, 'p50_ms': round(float(p50), 3),
+                'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3),
+                'max_ms': round(float(milliseconds.max()), 3),
+                'per_item_ms': round(float(milliseconds.sum() / items.sum()), 4),
+                'mean_batch_size': round(float(items.mean()), 1)}
+
+
+class ModelRouter:
+    def __init__(self, model_server, predict: Callable, shadow_rate: float = SHADOW_SAMPLE_RATE,
+                 traffic_percent: float = CANDIDATE_TRAFFIC_PERCENT, predict_many: Optional[Callable] = None):
+        """predict(model, text) -> (sentiment, confidence), applied to the served model and the candidate alike.
+
+        predict_many(model, texts) -> [(sentiment, confidence), ...], if given, lets predict_batch score
+        each model's share of a batch in one call.
+        """
+        self.model_server = model_server
+        self.predict_fn = predict
+        self.predict_many_fn = predict_many
+        self._candidate = None  # (model, version, shadow_rate, traffic_percent), replaced as a whole
+        self._defaults = (shadow_rate, traffic_percent)
+        self._shadow_queue = queue.Queue(maxsize=SHADOW_QUEUE_SIZE)
+        self._stats_lock = threading.Lock()
+        self._rng = np.random.default_rng()
+        self._reset_stats()
+        self._worker = threading.Thread(target=self._run_shadow, daemon=True, name='shadow-scoring')
+        self._worker.start()
+
+    def _reset_stats(self):
+        with self._stats_lock:
+            self._latency = {'primary': LatencyRecorder(), 'candidate_shadow': LatencyRecorder(),
+                             'candidate_routed': LatencyRecorder()}
+            self._counts = {'primary': 0, 'candidate': 0, 'shadow_queued': 0, 'shadow_dropped': 0,
+                            'shadow_compared': 0, 'shadow_agreed': 0, 'shadow_errors': 0}
+            # primary sentiment -> candidate sentiment -> count, over shadowed requests
+            self._confusion = {primary: {candidate: 0 for candidate in SENTIMENTS} for primary in SENTIMENTS}
+
+    def set_candidate(self, model, version: str, shadow_rate: Optional[float] = None,
+                      traffic_percent: Optional[float] = None):
+        """Start shadowing (and optionally routing to) a candidate; statistics restart from zero"""
+        shadow_rate = self._defaults[0] if shadow_rate is None else shadow_rate
+        traffic_percent = self._defaults[1] if traffic_percent is None else traffic_percent
+        if not 0 <= shadow_rate <= 1 or not 0 <= traffic_percent <= 100:
+            raise ValueError("shadow_rate must be within [0, 1] and traffic_percent within [0, 100]")
+        self._reset_stats()
+        self._candidate = (model, version, shadow_rate, traffic_percent)
+        print(f"🔀 Candidate model {version}: shadow {shadow_rate:.0%}, routed {traffic_percent:g}%")
+
+    @property
+    def candidate_version(self) -> Optional[str]:
+        candidate = self._candidate
+        return candidate[1] if candidate else None
+
+    def clear_candidate(self):
+        self._candidate = None
+
+    @staticmethod
+    def _routes_to_candidate(text: str, traffic_percent: float) -> bool:
+        # Hash-based, so the same text always gets the same model during an experiment
+        return traffic_percent > 0 and zlib.crc32(text.encode('utf-8')) % 10000 < traffic_percent * 100
+
+    def _timed_predict(self, model, text: str, recorder: LatencyRecorder):
+        start = time.perf_counter()
+        result = self.predict_fn(model, text)
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            recorder.record(elapsed)
+        return result
+
+    def _timed_predict_many(self, model, texts: List[str], recorder: LatencyRecorder) -> List[Tuple]:
+        """One predict_many call recorded as one sample, or per-text calls without predict_many"""
+        if self.predict_many_fn is None:
+            return [self._timed_predict(model, text, recorder) for text in texts]
+        start = time.perf_counter()
+        results = self.predict_many_fn(model, texts)
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            recorder.record(elapsed, len(texts))
+        return results
+
+    def predict(self, text: str, primary: Optional[Tuple] = None) -> Tuple[str, float, str]:
+        """(sentiment, confidence, model version) for one text.
+
+        primary is a (model, version) snapshot from the model server; batches pass one so a
+        concurrent swap cannot split them across versions.
+        """
+        model, version = primary or self.model_server.current()
+        candidate = self._candidate
+        if candidate is not None and self._routes_to_candidate(text, candidate[3]):
+            sentiment, confidence = self._timed_predict(candidate[0], text, self._latency['candidate_routed'])
+            with self._stats_lock:
+                self._counts['candidate'] += 1
+            return sentiment, confidence, candidate[1]
+
+        sentiment, confidence = self._timed_predict(model, text, self._latency['primary'])
+        with self._stats_lock:
+            self._counts['primary'] += 1
+        self._maybe_shadow(candidate, text, sentiment)
+        return sentiment, confidence, version
+
+    def _maybe_shadow(self, candidate, text: str, primary_sentiment: str):
+        if candidate is None or self._rng.random() >= candidate[2]:
+            return
+        try:
+            self._shadow_queue.put_nowait((candidate, text, primary_sentiment))
+            with self._stats_lock:
+                self._counts['shadow_queued'] += 1
+        except queue.Full:
+            with self._stats_lock:
+                self._counts['shadow_dropped'] += 1
+
+    def predict_batch(self, texts: Sequence[str], primary: Optional[Tuple] = None) -> List[Tuple[str, float, str]]:
+        """predict() for each text against one served-model snapshot, taken here unless passed in.
+
+        With predict_many, the texts routed to each model are scored in one call per model.
+        """
+        primary = primary or self.model_server.current()
+        if self.predict_many_fn is None:
+            return [self.predict(text, primary) for text in texts]
+
+        model, version = primary
+        candidate = self._candidate
+        routed = [candidate is not None and self._routes_to_candidate(text, candidate[3]) for text in texts]
+        groups = [('primary', model, version, [idx for idx, to_candidate in enumerate(routed) if not to_candidate])]
+        if candidate is not None:
+            groups.append(('candidate', candidate[0], candidate[1], [idx for idx, to_candidate in enumerate(routed) if to_candidate]))
+
+        results = [None] * len(texts)
+        for name, target, target_version, indices in groups:
+            if not indices:
+                continue
+            recorder = self._latency['primary' if name == 'primary' else 'candidate_routed']
+            predictions = self._timed_predict_many(target, [texts[idx] for idx in indices], recorder)
+            with self._stats_lock:
+                self._counts[name] += len(indices)
+            for idx, (sentiment, confidence) in zip(indices, predictions):
+                results[idx] = (sentiment, confidence, target_version)
+                if name == 'primary':
+                    self._maybe_shadow(candidate, texts[idx], sentiment)
+        return results
+
+    def _run_shadow(self):
+        while True:
+            work = [self._shadow_queue.get()]
+            while len(work) < SHADOW_BATCH_SIZE:
+                try:
+                    work.append(self._shadow_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._score_shadow(work)
+            finally:
+                for _ in work:
+                    self._shadow_queue.task_done()
+
+    def _score_shadow(self, work: List[Tuple]):
+        # Work queued for a candidate that was replaced meanwhile is dropped
+        candidate = self._candidate
+        work = [(text, primary_sentiment) for queued, text, primary_sentiment in work if queued is candidate]
+        if not work:
+            return
+        try:
+            predictions = self._timed_predict_many(candidate[0], [text for text, _ in work],
+                                                   self._latency['candidate_shadow'])
+        except Exception as e:
+            with self._stats_lock:
+                self._counts['shadow_errors'] += len(work)
+            print(f"⚠️ Shadow scoring failed for candidate {candidate[1]}: {e}")
+            return
+        with self._stats_lock:
+            for (_, primary_sentiment), (sentiment, _) in zip(work, predictions):
+                self._counts['shadow_compared'] += 1
+                self._counts['shadow_agreed'] += int(sentiment == primary_sentiment)
+                if primary_sentiment in self._confusion and sentiment in self._confusion:
+                    self._confusion[primary_sentiment][sentiment] += 1
+
+    def wait_for_shadow(self, timeout: float = 5.0):
+        """Block until queued shadow work is scored (for tests and benchmarks)"""
+        deadline = time.perf_counter() + timeout
+        while self._shadow_queue.unfinished_tasks and time.perf_counter() < deadline:
+            time.sleep(0.01)
+
+    def get_stats(self) -> Dict:
+        candidate = self._candidate
+        with self._stats_lock:
+            counts = dict(self._counts)
+            latency = {name: recorder.summary() for name, recorder in self._latency.items()}
+            confusion = {primary: dict(row) for primary, row in self._confusion.items()}
+        compared = counts['shadow_compared']
+        return {
+            'primary_version': self.model_server.version,
+            'candidate_version': candidate[1] if candidate else None,
+            'shadow_rate': candidate[2] if candidate else None,
+            'traffic_percent': candidate[3] if candidate else None,
+            'requests': {'primary': counts['primary'], 'candidate': counts['candidate']},
+            'shadow': {
+                'queued': counts['shadow_queued'],
+                'dropped': counts['shadow_dropped'],
+                'compared': compared,
+                'errors': counts['shadow_errors'],
+                'agreement_rate': round(counts['shadow_agreed'] / compared, 4) if compared else None,
+                'confusion': confusion
+            },
+            'latency': latency
+        }
+
+
+# Shadow a slower candidate that disagrees on some inputs and check the request path is unaffected
+if __name__ == "__main__":
+    class _Served:
+        def __init__(self, model, version):
+            self.model, self.version = model, version
+
+        def current(self):
+            return self.model, self.version
+
+    def primary_model(text):
+        return 'positive' if 'good' in text else 'negative'
+
+    def candidate_model(text):
+        time.sleep(0.002)
+        return 'neutral' if 'okay' in text else primary_model(text)
+
+    def predict(model, text):
+        return model(text), 0.9
+
+    def predict_many(model, batch):
+        return [predict(model, text) for text in batch]
+
+    rng = np.random.default_rng(0)
+    texts = [' '.join(rng.choice(['good', 'bad', 'okay', 'service', 'today'], 4)) for _ in range(5000)]
+
+    print("Testing Model Router:")
+    print("=" * 50)
+    for mode, many in (('per item', None), ('batched', predict_many)):
+        router = ModelRouter(_Served(primary_model, 'v1'), predict, predict_many=many)
+        for shadow_rate, traffic_percent in ((0.0, 0), (0.2, 0), (0.2, 10)):
+            router.set_candidate(candidate_model, 'v2', shadow_rate, traffic_percent)
+            start = time.perf_counter()
+            router.predict_batch(texts)
+            elapsed = (time.perf_counter() - start) / len(texts) * 1e6
+            router.wait_for_shadow()
+            stats = router.get_stats()
+            print(f"{mode}, shadow {shadow_rate:.0%}, routed {traffic_percent}%: {elapsed:.1f}µs per request, "
+                  f"requests {stats['requests']}, agreement {stats['shadow']['agreement_rate']} "
+                  f"over {stats['shadow']['compared']} (dropped {stats['shadow']['dropped']})")
+        print(f"latency: {stats['latency']}")
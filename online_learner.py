@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Online Sentiment Learner - Incremental model updates from newly scored traffic
+Starting from a trained hashed-feature SGD model, confidently scored items are queued and a background
+worker continues training on them in mini-batches. An update is only published when it scores at least
+as well as the last published version on items held out from training.
+"""
+
+import copy
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from text_features import make_hashing_vectorizer
+
+ONLINE_MIN_CONFIDENCE = float(os.getenv('ONLINE_MIN_CONFIDENCE', '0.8'))
+ONLINE_BATCH_SIZE = int(os.getenv('ONLINE_BATCH_SIZE', '256'))
+ONLINE_QUEUE_SIZE = int(os.getenv('ONLINE_QUEUE_SIZE', '20000'))
+ONLINE_UPDATE_INTERVAL = float(os.getenv('ONLINE_UPDATE_INTERVAL', '30'))
+# A publish is only attempted after this many items were trained since the last attempt
+ONLINE_MIN_TRAINED = int(os.getenv('ONLINE_MIN_TRAINED', '2000'))
+ONLINE_MODEL_PATH = os.getenv('ONLINE_MODEL_PATH', 'online_sentiment_model.pkl')
+# Trained hashed model the learner starts from when it has no published model yet (train_streaming.py output)
+ONLINE_SEED_MODEL_PATH = os.getenv('ONLINE_SEED_MODEL_PATH', 'streaming_sentiment_model.pkl')
+# Items whose text hashes into this percentage are held out to judge updates, never trained on
+ONLINE_HOLDOUT_PERCENT = int(os.getenv('ONLINE_HOLDOUT_PERCENT', '10'))
+ONLINE_HOLDOUT_SIZE = int(os.getenv('ONLINE_HOLDOUT_SIZE', '2000'))
+ONLINE_MIN_HOLDOUT = int(os.getenv('ONLINE_MIN_HOLDOUT', '200'))
+
+# Model classes, as in the tweet_eval labels used by every trained model
+LABEL_CODES = {'negative': 0, 'neutral': 1, 'positive': 2, 'critical': 0}
+CLASSES = np.array([0, 1, 2])
+
+
+def make_online_model() -> Pipeline:
+    """Text-in pipeline of a stateless hashing featurizer and a partial_fit-capable linear model"""
+    return Pipeline([
+        ('tfidf', make_hashing_vectorizer(norm='l2')),
+        ('clf', SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42))
+    ])
+
+
+def is_held_out(text: str) -> bool:
+    return zlib.crc32(text.encode('utf-8')) % 100 < ONLINE_HOLDOUT_PERCENT
+
+
+class OnlineSentimentLearner:
+    def __init__(self, model: Optional[Pipeline] = None, preprocess: Optional[Callable[[str], str]] = None,
+                 on_publish: Optional[Callable[[Pipeline, Dict], None]] = None,
+                 min_confidence: float = ONLINE_MIN_CONFIDENCE, batch_size: int = ONLINE_BATCH_SIZE,
+                 model_path: Optional[str] = ONLINE_MODEL_PATH, seed_model_path: Optional[str] = ONLINE_SEED_MODEL_PATH):
+        """model is the trained hashed model to continue from (default: the last published one at model_path,
+        else the seed at seed_model_path). preprocess must match the cleaning applied before prediction;
+        on_publish receives each version that passed the holdout check."""
+        for path, label in ((model_path, 'published online model'), (seed_model_path, 'seed model')):
+            if model is None and path and os.path.exists(path):
+                model = joblib.load(path)
+                print(f"📚 Starting online learning from the {label} at {path}")
+        clf = getattr(model, 'named_steps', {}).get('clf')
+        if clf is None or not hasattr(clf, 'partial_fit'):
+            raise ValueError("Online learning needs a trained hashed-feature model with partial_fit; "
+                             "run train_streaming.py first")
+        self.model = model
+        self.published_model = model
+        self.trained_items = 0
+        self.version = 0
+        self.preprocess = preprocess
+        self.on_publish = on_publish
+        self.min_confidence = min_confidence
+        self.batch_size = batch_size
+        self.model_path = model_path
+
+        self._queue = deque(maxlen=ONLINE_QUEUE_SIZE)
+        self._pending_holdout = deque(maxlen=ONLINE_HOLDOUT_SIZE)
+        self._queue_lock = threading.Lock()
+        self._holdout_texts = deque(maxlen=ONLINE_HOLDOUT_SIZE)
+        self._holdout_labels = deque(maxlen=ONLINE_HOLDOUT_SIZE)
+        self._trained_at_last_check = 0
+        self._update_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker = None
+        self._stats = {'submitted': 0, 'accepted': 0, 'held_out': 0, 'dropped': 0, 'batches': 0,
+                       'published': 0, 'rejected': 0, 'last_batch_accuracy': None, 'last_update_seconds': None,
+                       'holdout_accuracy': None, 'published_holdout_accuracy': None}
+
+    def submit(self, texts: Sequence[str], sentiments: Sequence[Optional[str]],
+               confidences: Optional[Sequence[Optional[float]]] = None) -> int:
+        """Queue items for training. Explicit labels pass confidences=None; scored items
+        are only kept when their confidence reaches min_confidence. Never blocks."""
+        accepted = held_out = dropped = 0
+        with self._queue_lock:
+            for idx, (text, sentiment) in enumerate(zip(texts, sentiments)):
+                label = LABEL_CODES.get(sentiment)
+                confidence = None if confidences is None else confidences[idx]
+                if label is None or not text:
+                    continue
+                if confidences is not None and (confidence is None or confidence < self.min_confidence):
+                    continue
+                if is_held_out(text):
+                    self._pending_holdout.append((text, label))
+                    held_out += 1
+                    continue
+                if len(self._queue) == self._queue.maxlen:
+                    dropped += 1
+                self._queue.append((text, label))
+                accepted += 1
+            queued = len(self._queue)
+        with self._stats_lock:
+            self._stats['submitted'] += len(texts)
+            self._stats['accepted'] += accepted
+            self._stats['held_out'] += held_out
+            self._stats['dropped'] += dropped
+        if queued >= self.batch_size:
+            self._wake.set()
+        return accepted
+
+    def _drain(self, limit: int):
+        with self._queue_lock:
+            batch = [self._queue.popleft() for _ in range(min(limit, len(self._queue)))]
+            holdout = list(self._pending_holdout)
+            self._pending_holdout.clear()
+        return batch, holdout
+
+    def update(self, force: bool = False) -> bool:
+        """Train on one mini-batch from the queue, publishing when enough was learned; returns True if a batch was used"""
+        with self._update_lock:
+            with self._queue_lock:
+                ready = len(self._queue) >= self.batch_size or (force and self._queue)
+            if not ready:
+                return False
+            batch, holdout = self._drain(self.batch_size)
+            start = time.perf_counter()
+
+            for text, label in holdout:
+                self._holdout_texts.append(self.preprocess(text) if self.preprocess else text)
+                self._holdout_labels.append(label)
+            texts = [self.preprocess(text) if self.preprocess else text for text, _ in batch]
+            labels = np.array([label for _, label in batch])
+
+            # Test-then-train: accuracy on items the model has not seen yet
+            batch_accuracy = float((self.model.predict(texts) == labels).mean())
+            # Train a copy, so a published model is never modified while it serves requests
+            candidate = copy.deepcopy(self.model)
+            features = candidate.named_steps['tfidf'].transform(texts)
+            candidate.named_steps['clf'].partial_fit(features, labels, classes=CLASSES)
+
+            self.model = candidate
+            self.trained_items += len(batch)
+            with self._stats_lock:
+                self._stats['batches'] += 1
+                self._stats['last_batch_accuracy'] = batch_accuracy
+                self._stats['last_update_seconds'] = round(time.perf_counter() - start, 4)
+
+            if self.trained_items - self._trained_at_last_check >= ONLINE_MIN_TRAINED:
+                self._maybe_publish(candidate)
+            return True
+
+    def _holdout_accuracy(self, model) -> float:
+        return float((model.predict(list(self._holdout_texts)) == np.array(self._holdout_labels)).mean())
+
+    def _maybe_publish(self, model: Pipeline):
+        """Publish only if the update scores at least as well as the last published version on the holdout"""
+        if len(self._holdout_texts) < ONLINE_MIN_HOLDOUT:
+            return
+        self._trained_at_last_check = self.trained_items
+        accuracy = self._holdout_accuracy(model)
+        baseline = self._holdout_accuracy(self.published_model)
+        with self._stats_lock:
+            self._stats['holdout_accuracy'] = accuracy
+            self._stats['published_holdout_accuracy'] = baseline
+        if accuracy < baseline:
+            with self._stats_lock:
+                self._stats['rejected'] += 1
+            print(f"📚 Online update not published: holdout accuracy {accuracy:.4f} < {baseline:.4f}")
+            return
+        self._publish(model, accuracy)
+
+    def _publish(self, model: Pipeline, holdout_accuracy: float):
+        self.version += 1
+        self.published_model = model
+        with self._stats_lock:
+            self._stats['published'] += 1
+            self._stats['published_holdout_accuracy'] = holdout_accuracy
+            last_batch_accuracy = self._stats['last_batch_accuracy']
+        info = {'version': self.version, 'trained_items': self.trained_items,
+                'holdout_accuracy': holdout_accuracy, 'holdout_items': len(self._holdout_texts),
+                'last_batch_accuracy': last_batch_accuracy}
+        if self.model_path:
+            tmp_path = f"{self.model_path}.tmp"
+            joblib.dump(model, tmp_path)
+            os.replace(tmp_path, self.model_path)
+        if self.on_publish:
+            self.on_publish(model, info)
+        print(f"📚 Published online model v{self.version} ({self.trained_items} items trained, "
+              f"holdout accuracy {holdout_accuracy:.4f})")
+
+    def _run(self, interval: float):
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            try:
+                while self.update():
+                    pass
+            except Exception as e:
+                print(f"⚠️ Online model update failed: {e}")
+
+    def start(self, interval: float = ONLINE_UPDATE_INTERVAL):
+        """Start the background update worker"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, args=(interval,), daemon=True, name='online-learner')
+        self._worker.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+
+    def get_stats(self) -> Dict:
+        with self._queue_lock:
+            queued = len(self._queue)
+        with self._stats_lock:
+            stats = dict(self._stats, queued=queued)
+        stats.update({'version': self.version, 'trained_items': self.trained_items,
+                      'holdout_items': len(self._holdout_texts),
+                      'min_confidence': self.min_confidence, 'batch_size': self.batch_size})
+        return stats
+
+
+# Simulate a stream of scored traffic and watch the model improve
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    positive = ['great', 'love', 'awesome', 'fast', 'happy']
+    negative = ['broken', 'hate', 'awful', 'slow', 'crash']
+    neutral = ['update', 'today', 'release', 'phone', 'team']
+    pools = {'negative': negative, 'neutral': neutral, 'positive': positive}
+
+    def make_batch(n: int):
+        sentiments = rng.choice(list(pools), n)
+        texts = [' '.join(rng.choice(neutral, 4).tolist() + rng.choice(pools[s], 2).tolist()) for s in sentiments]
+        return texts, sentiments.tolist(), rng.uniform(0.5, 1.0, n).tolist()
+
+    # A weak seed, as if train_streaming.py had seen little data
+    seed_texts, seed_sentiments, _ = make_batch(300)
+    seed = make_online_model().fit(seed_texts, [LABEL_CODES[s] for s in seed_sentiments])
+
+    published = []
+    learner = OnlineSentimentLearner(seed, model_path=None, on_publish=lambda model, info: published.append(info))
+    print("Testing Online Sentiment Learner:")
+    print("=" * 50)
+    for step in range(20):
+        learner.submit(*make_batch(500))
+        while learner.update():
+            pass
+    stats = learner.get_stats()
+    print(f"accepted {stats['accepted']}/{stats['submitted']} ({stats['held_out']} held out), "
+          f"{stats['batches']} batches, v{stats['version']} ({stats['rejected']} updates rejected), "
+          f"holdout accuracy {stats['published_holdout_accuracy']:.3f}, "
+          f"{stats['last_update_seconds'] * 1000:.1f}ms per update")
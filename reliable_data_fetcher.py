@@ -11,10 +11,20 @@ import time
 import random
 from bs4 import BeautifulSoup
 import json
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from lexicon_scorer import LexiconScorer
+from lexicon_store import LexiconStore, get_lexicon_store
+
+def compile_keyword_scorer(lexicon_data: Dict) -> LexiconScorer:
+    """Keyword scorer with negation and intensifier handling"""
+    keywords = lexicon_data['keywords']
+    return LexiconScorer(
+        {'positive': keywords['positive'], 'negative': keywords['negative']},
+        negation_map={'positive': 'negative', 'negative': 'positive'}
+    )
 
 class ReliableDataFetcher:
-    def __init__(self):
+    def __init__(self, lexicon_store: Optional[LexiconStore] = None):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
@@ -44,6 +54,10 @@ class ReliableDataFetcher:
             'reddit_search': 'https://www.reddit.com/search.json'
         }
 
+        # Sentiment keywords live in config/lexicons.json and are hot-reloaded
+        self.lexicon_store = lexicon_store or get_lexicon_store()
+        self.lexicon_store.register_compiler('keywords', compile_keyword_scorer)
+
     def fetch_rss_news(self, query: str, max_items: int = 50) -> List[Dict]:
         """Fetch news from multiple RSS feeds"""
         print(f"📰 Fetching RSS news for: {query}")
@@ -358,41 +372,45 @@ class ReliableDataFetcher:
         
         return mock_data
 
+    def classify_items(self, data_items: List[Dict]) -> Tuple[List[str], str]:
+        """Label each item positive/negative/neutral; returns the labels and the lexicon version used"""
+        lexicon = self.lexicon_store.current()
+        keyword_scores = lexicon.compiled['keywords'].score_batch(item['text'] for item in data_items)
+        
+        sentiments = []
+        for scores, _ in keyword_scores:
+            # Negation-aware weighted keyword scores
+            positive_score = scores['positive']
+            negative_score = scores['negative']
+            
+            if positive_score > negative_score:
+                sentiments.append('positive')
+            elif negative_score > positive_score:
+                sentiments.append('negative')
+            else:
+                sentiments.append('neutral')
+        
+        return sentiments, lexicon.version
+
     def analyze_sentiment(self, data_items: List[Dict]) -> Dict:
-        """Simple sentiment analysis based on keywords"""
+        """Simple sentiment analysis based on weighted keywords"""
         print(f"🔍 Analyzing sentiment for {len(data_items)} items...")
         
-        positive_keywords = ['good', 'great', 'excellent', 'amazing', 'wonderful', 'positive', 'success', 'win', 'love', 'like', 'best', 'awesome', 'fantastic']
-        negative_keywords = ['bad', 'terrible', 'awful', 'negative', 'fail', 'hate', 'worst', 'dislike', 'problem', 'issue', 'error', 'broken']
-        
-        positive_count = 0
-        negative_count = 0
-        neutral_count = 0
+        sentiments, lexicon_version = self.classify_items(data_items)
         
         platform_breakdown = {}
         
-        for item in data_items:
-            text = item['text'].lower()
+        for item, sentiment in zip(data_items, sentiments):
             platform = item.get('platform', 'unknown')
             
             # Count by platform
             if platform not in platform_breakdown:
                 platform_breakdown[platform] = {'positive': 0, 'negative': 0, 'neutral': 0}
-            
-            # Simple sentiment analysis
-            positive_score = sum(1 for word in positive_keywords if word in text)
-            negative_score = sum(1 for word in negative_keywords if word in text)
-            
-            if positive_score > negative_score:
-                positive_count += 1
-                platform_breakdown[platform]['positive'] += 1
-            elif negative_score > positive_score:
-                negative_count += 1
-                platform_breakdown[platform]['negative'] += 1
-            else:
-                neutral_count += 1
-                platform_breakdown[platform]['neutral'] += 1
+            platform_breakdown[platform][sentiment] += 1
         
+        positive_count = sentiments.count('positive')
+        negative_count = sentiments.count('negative')
+        neutral_count = sentiments.count('neutral')
         total = len(data_items)
         
         return {
@@ -400,7 +418,8 @@ class ReliableDataFetcher:
             'negative_percentage': round((negative_count / total) * 100, 1) if total > 0 else 0,
             'neutral_percentage': round((neutral_count / total) * 100, 1) if total > 0 else 0,
             'platform_breakdown': platform_breakdown,
-            'timeline': {'positive': positive_count, 'negative': negative_count, 'neutral': neutral_count}
+            'timeline': {'positive': positive_count, 'negative': negative_count, 'neutral': neutral_count},
+            'lexicon_version': lexicon_version
         }
 
 # Test the new fetcher
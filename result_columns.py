@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Columnar Analysis Results
+Sentiment codes, confidences, timestamps and platform codes held as NumPy arrays,
+with vectorized group-bys; per-item dicts are only built at the response boundary
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+SENTIMENT_LABELS = ('positive', 'negative', 'neutral', 'critical')
+SENTIMENT_CODES = {label: code for code, label in enumerate(SENTIMENT_LABELS)}
+NEUTRAL_CODE = SENTIMENT_CODES['neutral']
+
+
+def to_epoch_seconds(created_at, default: float) -> float:
+    """Convert a datetime or ISO string to UTC epoch seconds, falling back to default"""
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        except ValueError:
+            return default
+    if isinstance(created_at, datetime):
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at.timestamp()
+    return default
+
+
+def item_platform(item: Dict) -> str:
+    return (item.get('platform') or item.get('source') or 'unknown').lower()
+
+
+class ResultColumns:
+    def __init__(self, items: Sequence[Dict], sentiment_codes: np.ndarray, confidences: np.ndarray,
+                 timestamps: np.ndarray, platform_codes: np.ndarray, platforms: List[str]):
+        self.items = items
+        self.sentiment_codes = sentiment_codes
+        self.confidences = confidences
+        self.timestamps = timestamps
+        self.platform_codes = platform_codes
+        self.platforms = platforms
+
+    @classmethod
+    def from_items(cls, items: Sequence[Dict], sentiments: Sequence[Optional[str]],
+                   confidences: Optional[Sequence[Optional[float]]] = None,
+                   now: Optional[datetime] = None) -> 'ResultColumns':
+        """Build columns from fetched items and their scored sentiments (unknown labels count as neutral)"""
+        default_ts = (now or datetime.now(timezone.utc)).timestamp()
+
+        sentiment_codes = np.fromiter(
+            (SENTIMENT_CODES.get(sentiment, NEUTRAL_CODE) for sentiment in sentiments),
+            dtype=np.int8, count=len(sentiments)
+        )
+        if confidences is None:
+            confidence_column = np.full(len(items), np.nan, dtype=np.float32)
+        else:
+            confidence_column = np.array(
+                [np.nan if confidence is None else confidence for confidence in confidences], dtype=np.float32
+            )
+        timestamps = np.fromiter(
+            (to_epoch_seconds(item.get('created_at'), default_ts) for item in items),
+            dtype=np.float64, count=len(items)
+        )
+
+        platforms: List[str] = []
+        platform_index: Dict[str, int] = {}
+        platform_codes = np.empty(len(items), dtype=np.int16)
+        for idx, item in enumerate(items):
+            platform = item_platform(item)
+            code = platform_index.get(platform)
+            if code is None:
+                code = platform_index[platform] = len(platforms)
+                platforms.append(platform)
+            platform_codes[idx] = code
+
+        return cls(items, sentiment_codes, confidence_column, timestamps, platform_codes, platforms)
+
+    def __len__(self) -> int:
+        return len(self.sentiment_codes)
+
+    def sentiment_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.sentiment_codes, minlength=len(SENTIMENT_LABELS))
+        return {label: int(counts[code]) for code, label in enumerate(SENTIMENT_LABELS)}
+
+    def sentiment_percentages(self, decimals: int = 1) -> Dict[str, float]:
+        """Percentages keyed like the API responses, e.g. 'positive_percentage'"""
+        total = len(self)
+        counts = np.bincount(self.sentiment_codes, minlength=len(SENTIMENT_LABELS))
+        percentages = counts / total * 100 if total else np.zeros(len(SENTIMENT_LABELS))
+        return {
+            f"{label}_percentage": round(float(percentages[code]), decimals)
+            for code, label in enumerate(SENTIMENT_LABELS)
+        }
+
+    def platform_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.platform_codes, minlength=len(self.platforms))
+        return {platform: int(counts[code]) for code, platform in enumerate(self.platforms)}
+
+    def platform_sentiment_counts(self, labels: Sequence[str] = ('positive', 'negative', 'neutral')) -> Dict[str, Dict[str, int]]:
+        """Per-platform sentiment counts from one bincount over (platform, sentiment) pairs"""
+        n_labels = len(SENTIMENT_LABELS)
+        pair_codes = self.platform_codes.astype(np.int64) * n_labels + self.sentiment_codes
+        grid = np.bincount(pair_codes, minlength=len(self.platforms) * n_labels).reshape(-1, n_labels)
+        return {
+            platform: {label: int(grid[code, SENTIMENT_CODES[label]]) for label in labels}
+            for code, platform in enumerate(self.platforms)
+        }
+
+    def hour_buckets(self, now: Optional[datetime] = None, max_buckets: int = 4) -> Dict[str, List]:
+        """Sentiment percentages per hours-ago bucket, most recent first"""
+        now_ts = (now or datetime.now(timezone.utc)).timestamp()
+        hours_ago = ((now_ts - self.timestamps) // 3600).astype(np.int64)
+        buckets, bucket_index = np.unique(hours_ago, return_inverse=True)
+        n_labels = len(SENTIMENT_LABELS)
+        grid = np.bincount(
+            bucket_index * n_labels + self.sentiment_codes, minlength=len(buckets) * n_labels
+        ).reshape(-1, n_labels)[:max_buckets]
+        totals = grid.sum(axis=1, keepdims=True)
+        percentages = np.round(grid / np.maximum(totals, 1) * 100, 1)
+
+        timeline = {"time": [], "positive": [], "negative": [], "neutral": []}
+        for row, hour in enumerate(buckets[:max_buckets]):
+            timeline["time"].append(f"{hour}h ago" if hour > 0 else "now")
+            for label in ('positive', 'negative', 'neutral'):
+                timeline[label].append(float(percentages[row, SENTIMENT_CODES[label]]))
+        return timeline
+
+    def to_records(self, indices: Optional[Sequence[int]] = None) -> List[Dict]:
+        """Materialize JSON-ready item dicts with their sentiment and confidence"""
+        if indices is None:
+            indices = range(len(self))
+        records = []
+        for idx in indices:
+            record = dict(self.items[idx])
+            record['sentiment'] = SENTIMENT_LABELS[self.sentiment_codes[idx]]
+            confidence = self.confidences[idx]
+            if not np.isnan(confidence):
+                record['confidence'] = round(float(confidence), 4)
+            records.append(record)
+        return records
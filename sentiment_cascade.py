@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Confidence-Gated Sentiment Cascade
+Scores everything with the fast lexicon and only escalates uncertain items to the ensemble model
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Threshold chosen by calibrate() (python sentiment_cascade.py), written here and read at startup
+CASCADE_CALIBRATION_PATH = os.getenv(
+    'CASCADE_CALIBRATION_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'cascade_calibration.json')
+)
+# Used until a calibration exists; a single unboosted keyword hit scores exactly 0.5 and so escalates
+UNCALIBRATED_THRESHOLD = 0.5
+# Thresholds tried by calibrate(); at 1.0 every item is escalated
+CALIBRATION_THRESHOLDS = (0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 1.0)
+
+# Maximum accuracy drop (absolute) the cascade may show against the full model
+DEFAULT_ACCURACY_MARGIN = float(os.getenv('CASCADE_ACCURACY_MARGIN', '0.02'))
+
+
+def load_confidence_threshold(path: str = CASCADE_CALIBRATION_PATH) -> float:
+    """CASCADE_CONFIDENCE_THRESHOLD if set, else the calibrated threshold, else UNCALIBRATED_THRESHOLD"""
+    if os.getenv('CASCADE_CONFIDENCE_THRESHOLD'):
+        return float(os.getenv('CASCADE_CONFIDENCE_THRESHOLD'))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return float(json.load(f)['confidence_threshold'])
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"⚠️ Could not read cascade calibration '{path}': {e}")
+        return UNCALIBRATED_THRESHOLD
+
+
+# Lexicon confidence at or below which an item is escalated to the model
+DEFAULT_CONFIDENCE_THRESHOLD = load_confidence_threshold()
+
+POLAR_SENTIMENTS = ('positive', 'negative')
+
+
+class SentimentCascade:
+    def __init__(self, analyzer, predict_fn: Callable[[str], Tuple[Optional[str], Optional[float]]],
+                 confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD):
+        self.analyzer = analyzer
+        self.predict_fn = predict_fn
+        self.confidence_threshold = confidence_threshold
+
+        # Cumulative statistics across all scored batches
+        self._lock = threading.Lock()
+        self._totals = {'items': 0, 'escalated': 0, 'lexicon_seconds': 0.0, 'model_seconds': 0.0}
+
+    def lexicon_decision(self, analysis: Dict) -> Tuple[Optional[str], float]:
+        """Return the lexicon verdict and its confidence, or (None, confidence) if it is not decisive"""
+        breakdown = analysis.get('sentiment_breakdown', {})
+        positive = sum(breakdown.get('positive', {}).values())
+        negative = sum(breakdown.get('negative', {}).values())
+
+        # Margin between the two poles, damped when very few terms matched
+        confidence = abs(positive - negative) / (positive + negative + 1)
+
+        primary = analysis.get('primary_sentiment')
+        if primary not in POLAR_SENTIMENTS:
+            return None, confidence
+        return primary, confidence
+
+    def score_batch(self, texts: List[str], lexicon_results: Optional[List[Dict]] = None,
+                    confidence_threshold: Optional[float] = None,
+                    predict_batch: Optional[Callable[[List[str]], List[Tuple]]] = None) -> Tuple[List[Dict], Dict]:
+        """Score texts through the cascade.
+
+        lexicon_results may be passed in when the caller has already run the analyzer,
+        so the first stage is not computed twice. predict_batch, if given, scores all escalated
+        texts in one call and returns (sentiment, confidence, model_version) for each; callers
+        use it to pin one served-model snapshot for the batch and report which version scored what.
+        """
+        threshold = self.confidence_threshold if confidence_threshold is None else confidence_threshold
+
+        start = time.perf_counter()
+        if lexicon_results is None:
+            lexicon_results = [self.analyzer.analyze_enhanced_sentiment(text) for text in texts]
+        lexicon_seconds = time.perf_counter() - start
+
+        scored = []
+        escalated = []
+        for idx, analysis in enumerate(lexicon_results):
+            sentiment, confidence = self.lexicon_decision(analysis)
+            # Strictly above: one plain keyword hit sits exactly at 0.5 and is not enough on its own
+            if sentiment is not None and confidence > threshold:
+                scored.append({'sentiment': sentiment, 'confidence': confidence, 'stage': 'lexicon'})
+            else:
+                scored.append(None)
+                escalated.append(idx)
+
+        start = time.perf_counter()
+        if predict_batch is not None:
+            predictions = predict_batch([texts[idx] for idx in escalated]) if escalated else []
+        else:
+            predictions = [(*self.predict_fn(texts[idx]), None) for idx in escalated]
+        for idx, (sentiment, confidence, version) in zip(escalated, predictions):
+            scored[idx] = {'sentiment': sentiment, 'confidence': confidence, 'stage': 'model', 'model_version': version}
+        model_seconds = time.perf_counter() - start
+
+        stats = {
+            'total_items': len(texts),
+            'escalated_items': len(escalated),
+            'escalation_rate': round(len(escalated) / len(texts), 4) if texts else 0.0,
+            'confidence_threshold': threshold,
+            'lexicon_ms': round(lexicon_seconds * 1000, 2),
+            'model_ms': round(model_seconds * 1000, 2)
+        }
+
+        with self._lock:
+            self._totals['items'] += len(texts)
+            self._totals['escalated'] += len(escalated)
+            self._totals['lexicon_seconds'] += lexicon_seconds
+            self._totals['model_seconds'] += model_seconds
+
+        return scored, stats
+
+    def get_stats(self) -> Dict:
+        """Cumulative escalation statistics since startup"""
+        with self._lock:
+            totals = dict(self._totals)
+        return {
+            'total_items': totals['items'],
+            'escalated_items': totals['escalated'],
+            'escalation_rate': round(totals['escalated'] / totals['items'], 4) if totals['items'] else 0.0,
+            'confidence_threshold': self.confidence_threshold,
+            'lexicon_seconds': round(totals['lexicon_seconds'], 3),
+            'model_seconds': round(totals['model_seconds'], 3)
+        }
+
+    def calibrate(self, texts: List[str], labels: List[str], margin: float = DEFAULT_ACCURACY_MARGIN,
+                  thresholds: Sequence[float] = CALIBRATION_THRESHOLDS) -> Dict:
+        """Compare cascade accuracy against running the full model on every item, per threshold.
+
+        The recommended threshold is the lowest (fewest escalations) whose accuracy drop is within margin.
+        """
+        full_predictions = [self.predict_fn(text)[0] for text in texts]
+        decisions = [self.lexicon_decision(self.analyzer.analyze_enhanced_sentiment(text)) for text in texts]
+
+        total = len(labels)
+        full_correct = sum(1 for p, y in zip(full_predictions, labels) if p == y)
+        full_accuracy = full_correct / total if total else 0.0
+
+        candidates = []
+        for threshold in sorted(thresholds):
+            # Same rule as score_batch, reusing the full-model prediction for escalated items
+            kept = [sentiment is not None and confidence > threshold for sentiment, confidence in decisions]
+            predictions = [decision[0] if keep else full for decision, keep, full in zip(decisions, kept, full_predictions)]
+            accuracy = sum(1 for p, y in zip(predictions, labels) if p == y) / total if total else 0.0
+            candidates.append({
+                'confidence_threshold': threshold,
+                'cascade_accuracy': round(accuracy, 4),
+                'accuracy_drop': round(full_accuracy - accuracy, 4),
+                'escalation_rate': round(1 - sum(kept) / total, 4) if total else 0.0
+            })
+
+        within = [candidate for candidate in candidates if candidate['accuracy_drop'] <= margin]
+        # Escalating everything matches the full model, so that is the fallback
+        best = within[0] if within else {'confidence_threshold': 1.0, 'cascade_accuracy': round(full_accuracy, 4),
+                                         'accuracy_drop': 0.0, 'escalation_rate': 1.0}
+        return dict(best, full_model_accuracy=round(full_accuracy, 4), margin=margin,
+                    within_margin=bool(within), thresholds=candidates)
+
+
+def save_calibration(report: Dict, path: str = CASCADE_CALIBRATION_PATH):
+    """Persist the recommended threshold so servers start with it"""
+    calibration = {key: report[key] for key in ('confidence_threshold', 'cascade_accuracy', 'full_model_accuracy',
+                                                'accuracy_drop', 'escalation_rate', 'margin')}
+    calibration['calibrated_at'] = datetime.now(timezone.utc).isoformat()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(calibration, f, indent=2)
+
+
+# Calibrate the threshold on the tweet_eval validation split (tuned there, so the test split stays unseen)
+if __name__ == "__main__":
+    from datasets import load_dataset
+    from sentiment_inference import load_model, predict_sentiment
+    from enhanced_sentiment_analyzer import EnhancedSentimentAnalyzer
+
+    model = load_model()
+    cascade = SentimentCascade(EnhancedSentimentAnalyzer(), lambda text: predict_sentiment(model, text))
+
+    validation_split = load_dataset("tweet_eval", "sentiment")["validation"]
+    label_map = {0: 'negative', 1: 'neutral', 2: 'positive'}
+    texts = list(validation_split['text'])
+    labels = [label_map[label] for label in validation_split['label']]
+
+    print("Calibrating sentiment cascade on tweet_eval:")
+    print("=" * 50)
+
+    report = cascade.calibrate(texts, labels)
+    for candidate in report.pop('thresholds'):
+        print(f"   threshold {candidate['confidence_threshold']:.2f}: accuracy {candidate['cascade_accuracy']:.4f} "
+              f"(drop {candidate['accuracy_drop']:+.4f}), escalation {candidate['escalation_rate']:.1%}")
+    for key, value in report.items():
+        print(f"   {key}: {value}")
+
+    save_calibration(report)
+    print(f"Calibrated threshold {report['confidence_threshold']} saved to '{CASCADE_CALIBRATION_PATH}'")
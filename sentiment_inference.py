@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Sentiment Inference - Model loading, preprocessing and prediction without any UI dependencies
+Shared by the API server and the Streamlit dashboard; NLTK is only imported when the first text is cleaned
+"""
+
+import os
+import re
+from typing import List, Optional, Sequence, Tuple
+
+import joblib
+
+MODEL_PATH = 'best_enhanced_sentiment_model.pkl'
+
+SENTIMENT_LABELS = {0: 'negative', 1: 'neutral', 2: 'positive'}
+
+_URL_PATTERN = re.compile(r"http\S+|www\S+")
+_MENTION_PATTERN = re.compile(r"@[A-Za-z0-9_]+")
+_HASHTAG_PATTERN = re.compile(r"#[A-Za-z0-9_]+")
+_EMOJI_PATTERN = re.compile(r"[\U00010000-\U0010ffff]")
+_PUNCTUATION_PATTERN = re.compile(r"[^\w\s.,!?']")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+_text_tools = None
+
+
+def _get_text_tools():
+    """Tokenizer, stopword set and lemmatizer, built once per process on first use"""
+    global _text_tools
+    if _text_tools is None:
+        import nltk
+        from nltk.corpus import stopwords
+        from nltk.stem import WordNetLemmatizer
+        from nltk.tokenize import word_tokenize
+
+        for resource, name in (('tokenizers/punkt', 'punkt'), ('corpora/stopwords', 'stopwords'),
+                               ('corpora/wordnet', 'wordnet')):
+            try:
+                nltk.data.find(resource)
+            except LookupError:
+                nltk.download(name)
+        _text_tools = (word_tokenize, set(stopwords.words('english')), WordNetLemmatizer())
+    return _text_tools
+
+
+def load_model(path: str = MODEL_PATH):
+    """Load the trained sentiment model, or return None if it has not been trained yet"""
+    if not os.path.exists(path):
+        print(f"⚠️ Model file '{path}' not found. Please run the training script first.")
+        return None
+    return joblib.load(path)
+
+
+def enhanced_preprocess_tweet(text: str) -> str:
+    """Enhanced tweet preprocessing with stopwords removal and lemmatization."""
+    if not isinstance(text, str):
+        return ""
+
+    # Basic cleaning
+    text = _URL_PATTERN.sub("", text)  # Remove URLs
+    text = _MENTION_PATTERN.sub("", text)  # Remove mentions
+    text = _HASHTAG_PATTERN.sub("", text)  # Remove hashtags
+    text = _EMOJI_PATTERN.sub("", text)  # Remove emojis
+
+    # Keep important punctuation for sentiment
+    text = _PUNCTUATION_PATTERN.sub("", text)
+    text = text.lower()
+    text = _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+    word_tokenize, stop_words, lemmatizer = _get_text_tools()
+    tokens = [word for word in word_tokenize(text) if word not in stop_words]
+    return ' '.join(lemmatizer.lemmatize(word) for word in tokens)
+
+
+def predict_sentiment(model, text: str) -> Tuple[Optional[str], Optional[float]]:
+    """Predict sentiment for a given text."""
+    if model is None:
+        return None, None
+
+    cleaned_text = enhanced_preprocess_tweet(text)
+    prediction = model.predict([cleaned_text])[0]
+    probabilities = model.predict_proba([cleaned_text])[0]
+    return SENTIMENT_LABELS[prediction], max(probabilities)
+
+
+def predict_sentiments(model, texts: Sequence[str]) -> List[Tuple[Optional[str], Optional[float]]]:
+    """Batch version of predict_sentiment: one model call for all texts."""
+    if model is None:
+        return [(None, None)] * len(texts)
+    if not texts:
+        return []
+
+    cleaned_texts = [enhanced_preprocess_tweet(text) for text in texts]
+    predictions = model.predict(cleaned_texts)
+    confidences = model.predict_proba(cleaned_texts).max(axis=1)
+    return [(SENTIMENT_LABELS[prediction], confidence) for prediction, confidence in zip(predictions, confidences)]
+
+
+# Compare import time and memory of this module against importing the dashboard for the same functions
+if __name__ == "__main__":
+    import json
+    import subprocess
+    import sys
+
+    probe = (
+        "import json, resource, time\n"
+        "start = time.perf_counter()\n"
+        "from {module} import load_model, predict_sentiment, enhanced_preprocess_tweet\n"
+        "elapsed = time.perf_counter() - start\n"
+        "import sys\n"
+        "print(json.dumps({{'seconds': elapsed, 'modules': len(sys.modules),"
+        " 'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))\n"
+    )
+
+    print("Testing Sentiment Inference imports:")
+    print("=" * 50)
+    here = os.path.dirname(os.path.abspath(__file__))
+    for module in ('sentiment_inference', 'dashboard_enhanced'):
+        runs = []
+        for _ in range(3):
+            result = subprocess.run([sys.executable, '-c', probe.format(module=module)], cwd=here,
+                                    capture_output=True, text=True)
+            if result.returncode != 0:
+                error = result.stderr.strip().splitlines()
+                print(f"{module:>20}: import failed ({error[-1] if error else 'no output'})")
+                break
+            runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+        if runs:
+            best = min(runs, key=lambda run: run['seconds'])
+            print(f"{module:>20}: {best['seconds'] * 1000:7.1f}ms, {best['modules']} modules loaded, "
+                  f"peak RSS {best['peak_rss_mb']:.0f}MB")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Startup Profiler - Records how long each import and component initialization takes at server start
+An optional import hook times every module loaded during startup, and the command line checks
+both servers against the budgets in config/startup_budgets.json, exiting non-zero on a regression.
+
+Usage: python startup_profiler.py [api_server] [main]
+"""
+
+import builtins
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Time every module import until the server is ready (set to false to skip the import hook)
+PROFILE_IMPORTS = os.getenv('STARTUP_PROFILE_IMPORTS', 'true').lower() == 'true'
+# Slowest modules (by own import time) included in the report
+MODULE_REPORT_LIMIT = int(os.getenv('STARTUP_MODULE_REPORT_LIMIT', '25'))
+STARTUP_BUDGETS_PATH = os.getenv(
+    'STARTUP_BUDGETS_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'startup_budgets.json')
+)
+
+_records: List[Dict] = []
+_records_lock = threading.Lock()
+_process_start = time.perf_counter()
+
+_module_times: Dict[str, Dict] = {}
+_import_stack = threading.local()
+# Captured once and never cleared, so a thread still inside _timed_import after uninstall keeps working
+_BUILTIN_IMPORT = builtins.__import__
+_hook_installed = False
+_ready_seconds: Optional[float] = None
+
+
+@contextmanager
+def track(component: str, kind: str = 'init'):
+    """Time a block of startup work, e.g. `with track('EnhancedAIChat()'):`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _records_lock:
+            _records.append({'component': component, 'kind': kind, 'seconds': round(elapsed, 4)})
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level == 0:
+        module_name = name
+    else:
+        try:
+            module_name = importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__'))
+        except (ImportError, ValueError):
+            module_name = name
+    if module_name in sys.modules:
+        return _BUILTIN_IMPORT(name, globals, locals, fromlist, level)
+
+    # Each frame accumulates the time spent in the imports it triggers, to separate its own time
+    stack = getattr(_import_stack, 'frames', None)
+    if stack is None:
+        stack = _import_stack.frames = []
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _BUILTIN_IMPORT(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with _records_lock:
+            _module_times.setdefault(module_name, {
+                'module': module_name,
+                'seconds': round(elapsed, 4),
+                'self_seconds': round(elapsed - nested, 4),
+                'top_level': not stack
+            })
+
+
+def install_import_hook():
+    """Time every module imported from now on; install before the server's first import"""
+    global _hook_installed
+    if PROFILE_IMPORTS and not _hook_installed:
+        _hook_installed = True
+        builtins.__import__ = _timed_import
+
+
+def uninstall_import_hook():
+    global _hook_installed
+    if _hook_installed:
+        _hook_installed = False
+        builtins.__import__ = _BUILTIN_IMPORT
+
+
+def mark_ready():
+    """Record the time to ready and stop timing imports, so serving pays no hook overhead"""
+    global _ready_seconds
+    _ready_seconds = round(time.perf_counter() - _process_start, 4)
+    uninstall_import_hook()
+
+
+def report(module_limit: Optional[int] = MODULE_REPORT_LIMIT) -> Dict:
+    """Startup costs grouped by kind, plus total time since this module was imported.
+
+    Modules are listed slowest first by their own import time; module_limit=None lists all of them.
+    """
+    with _records_lock:
+        records = list(_records)
+        modules = list(_module_times.values())
+    return {
+        'imports': [r for r in records if r['kind'] == 'import'],
+        'components': [r for r in records if r['kind'] != 'import'],
+        'import_seconds': round(sum(r['seconds'] for r in records if r['kind'] == 'import'), 4),
+        'init_seconds': round(sum(r['seconds'] for r in records if r['kind'] != 'import'), 4),
+        'modules': sorted(modules, key=lambda m: m['self_seconds'], reverse=True)[:module_limit],
+        'module_count': len(modules),
+        'module_import_seconds': round(sum(m['seconds'] for m in modules if m['top_level']), 4),
+        'ready_seconds': _ready_seconds,
+        'elapsed_seconds': round(time.perf_counter() - _process_start, 4)
+    }
+
+
+def print_report():
+    startup = report()
+    print("⏱️ Startup time report:")
+    for record in startup['imports'] + startup['components']:
+        print(f"   {record['kind']:<7} {record['component']:<40} {record['seconds'] * 1000:8.1f}ms")
+    for module in startup['modules'][:10]:
+        print(f"   module  {module['module']:<40} {module['self_seconds'] * 1000:8.1f}ms "
+              f"({module['seconds'] * 1000:.1f}ms with its imports)")
+    print(f"   imports {startup['import_seconds']:.2f}s, init {startup['init_seconds']:.2f}s, "
+          f"total {startup['elapsed_seconds']:.2f}s")
+
+
+def check_budget(startup: Dict, budget: Dict) -> List[str]:
+    """Budget violations of one startup report; an empty list means it is within budget"""
+    violations = []
+    for key in ('ready_seconds', 'module_import_seconds', 'init_seconds'):
+        limit = budget.get(key)
+        if limit is not None and startup.get(key) is not None and startup[key] > limit:
+            violations.append(f"{key} {startup[key]:.2f}s > {limit}s")
+    components = {r['component']: r['seconds'] for r in startup['imports'] + startup['components']}
+    for component, limit in budget.get('components', {}).items():
+        if components.get(component, 0.0) > limit:
+            violations.append(f"{component} {components[component]:.2f}s > {limit}s")
+    module_seconds = {m['module']: m['seconds'] for m in startup['modules']}
+    for module, limit in budget.get('modules', {}).items():
+        if module_seconds.get(module, 0.0) > limit:
+            violations.append(f"import {module} {module_seconds[module]:.2f}s > {limit}s")
+    return violations
+
+
+def profile_server(module: str) -> Dict:
+    """Import a server module in a fresh interpreter and return its startup report"""
+    import subprocess
+    import tempfile
+
+    with tempfile.NamedTemporaryFile('r', suffix='.json') as output:
+        probe = (
+            "import importlib, json, startup_profiler as p\n"
+            "p.install_import_hook()\n"
+            f"importlib.import_module({module!r})\n"
+            "p.mark_ready()\n"
+            f"json.dump(p.report(module_limit=None), open({output.name!r}, 'w'))\n"
+        )
+        result = subprocess.run([sys.executable, '-c', probe], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+        return json.load(output)
+
+
+# Profile each server's startup in a fresh process and fail when it exceeds its budget
+if __name__ == "__main__":
+    with open(STARTUP_BUDGETS_PATH, 'r', encoding='utf-8') as f:
+        budgets = json.load(f)
+    targets = sys.argv[1:] or list(budgets)
+
+    print("Testing Startup Budgets:")
+    print("=" * 50)
+    failed = False
+    for target in targets:
+        try:
+            startup = profile_server(target)
+        except RuntimeError as e:
+            print(f"❌ {target}: {e}")
+            failed = True
+            continue
+        violations = check_budget(startup, budgets.get(target, {}))
+        slowest = ', '.join(f"{m['module']} {m['self_seconds'] * 1000:.0f}ms" for m in startup['modules'][:5])
+        print(f"{'❌' if violations else '✅'} {target}: ready in {startup['ready_seconds']:.2f}s "
+              f"({startup['module_count']} modules imported in {startup['module_import_seconds']:.2f}s, "
+              f"init {startup['init_seconds']:.2f}s)")
+        print(f"   slowest modules: {slowest}")
+        for violation in violations:
+            print(f"   over budget: {violation}")
+        failed = failed or bool(violations)
+    sys.exit(1 if failed else 0)
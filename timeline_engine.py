@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Timeline Engine - Time-bucketed sentiment counts from item timestamps
+Buckets are computed with a single vectorized histogram, so tens of thousands of items take milliseconds
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from result_columns import SENTIMENT_LABELS
+
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Upper bound on buckets when no window is given and the data spans a long range
+MAX_BUCKETS = 2000
+
+TIME_FORMATS = {'minute': '%Y-%m-%d %H:%M', 'hour': '%Y-%m-%d %H:00', 'day': '%Y-%m-%d'}
+
+
+def build_timeline(timestamps: np.ndarray, sentiment_codes: np.ndarray, resolution: str = 'hour',
+                   window: Optional[int] = None, rolling: int = 1, end: Optional[datetime] = None,
+                   labels: Sequence[str] = SENTIMENT_LABELS) -> Dict:
+    """Count sentiments per time bucket.
+
+    timestamps are UTC epoch seconds and sentiment_codes index into SENTIMENT_LABELS.
+    window is the number of buckets ending at `end` (default: the span of the data, capped
+    at MAX_BUCKETS); rolling > 1 replaces each bucket by the sum of the last `rolling` buckets.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown timeline resolution '{resolution}', expected one of {list(RESOLUTIONS)}")
+    if rolling < 1:
+        raise ValueError("Rolling window must be at least 1 bucket")
+
+    bucket_seconds = RESOLUTIONS[resolution]
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    sentiment_codes = np.asarray(sentiment_codes, dtype=np.int64)
+
+    bucket_ids = np.floor_divide(timestamps, bucket_seconds).astype(np.int64)
+    if end is not None:
+        end_bucket = int(end.timestamp() // bucket_seconds)
+    elif len(bucket_ids):
+        end_bucket = int(bucket_ids.max())
+    else:
+        end_bucket = int(datetime.now(timezone.utc).timestamp() // bucket_seconds)
+
+    if window is None:
+        span = end_bucket - int(bucket_ids.min()) + 1 if len(bucket_ids) else 1
+        window = min(max(span, 1), MAX_BUCKETS)
+    start_bucket = end_bucket - window + 1
+
+    # Extra leading buckets feed the rolling sums of the first visible buckets
+    history = rolling - 1
+    offsets = bucket_ids - (start_bucket - history)
+    in_range = (offsets >= 0) & (offsets < window + history)
+
+    n_codes = len(SENTIMENT_LABELS)
+    grid = np.bincount(
+        offsets[in_range] * n_codes + sentiment_codes[in_range],
+        minlength=(window + history) * n_codes
+    ).reshape(window + history, n_codes)
+
+    if rolling > 1:
+        cumulative = np.cumsum(grid, axis=0)
+        cumulative = np.vstack([np.zeros((1, n_codes), dtype=cumulative.dtype), cumulative])
+        grid = cumulative[rolling:] - cumulative[:-rolling]
+
+    time_format = TIME_FORMATS[resolution]
+    bucket_starts = (np.arange(start_bucket, end_bucket + 1) * bucket_seconds).tolist()
+    timeline = {
+        'time': [datetime.fromtimestamp(ts, tz=timezone.utc).strftime(time_format) for ts in bucket_starts]
+    }
+    for label in labels:
+        timeline[label] = grid[:, SENTIMENT_LABELS.index(label)].tolist()
+    timeline['total'] = grid.sum(axis=1).tolist()
+    return timeline
+
+
+# Benchmark the engine on a large synthetic batch
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(42)
+    n_items = 50000
+    now = datetime.now(timezone.utc)
+    timestamps = now.timestamp() - rng.uniform(0, 7 * 86400, n_items)
+    sentiment_codes = rng.integers(0, len(SENTIMENT_LABELS), n_items)
+
+    print("Testing Timeline Engine:")
+    print("=" * 50)
+    for resolution, window, rolling in [('minute', 120, 1), ('hour', 24, 1), ('hour', 168, 6), ('day', None, 1)]:
+        start = time.perf_counter()
+        timeline = build_timeline(timestamps, sentiment_codes, resolution, window, rolling, end=now)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{resolution:>6} window={window} rolling={rolling}: {len(timeline['time'])} buckets, "
+              f"{sum(timeline['total'])} counted, {elapsed:.2f}ms for {n_items} items")
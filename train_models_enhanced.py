@@ -1,21 +1,62 @@
 import pandas as pd
 import numpy as np
 from datasets import load_dataset
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import train_test_split, HalvingRandomSearchCV
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 from sklearn.pipeline import Pipeline
 import re
+import os
+import json
+import time
+import hashlib
+import inspect
+import io
+from datetime import datetime, timezone
+from contextlib import contextmanager
 import joblib
+from joblib import Parallel, delayed
+from scipy.stats import loguniform
+from text_features import FEATURIZER, fit_featurizer
+from model_registry import ModelRegistry
+from model_compression import COMPRESSED_MODEL_PATH, compress_model
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.neural_network import MLPClassifier
-from sklearn.ensemble import RandomForestClassifier, VotingClassifier, ExtraTreesClassifier
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier, ExtraTreesClassifier, StackingClassifier
+from sklearn.frozen import FrozenEstimator
 from sklearn.svm import SVC
 import warnings
 warnings.filterwarnings('ignore')
 
+# Training search settings
+TRAIN_N_JOBS = int(os.getenv('TRAIN_N_JOBS', '-1'))
+TRAIN_CV_FOLDS = int(os.getenv('TRAIN_CV_FOLDS', '3'))
+TRAIN_SEARCH_CANDIDATES = int(os.getenv('TRAIN_SEARCH_CANDIDATES', '8'))
+HALVING_FACTOR = 3
+
+# Preprocessed corpus cache; the key changes whenever the dataset or the preprocessing code changes
+CORPUS_CACHE_DIR = os.getenv('CORPUS_CACHE_DIR', os.path.join('.cache', 'corpus'))
+PREPROCESS_N_JOBS = int(os.getenv('PREPROCESS_N_JOBS', '-1'))
+PREPROCESS_CHUNK_SIZE = 2000
+DATASET_NAME, DATASET_CONFIG = "tweet_eval", "sentiment"
+
+# 'voting' averages the members' probabilities; 'stacking' learns the combination on validation data
+ENSEMBLE_MODE = os.getenv('ENSEMBLE_MODE', 'voting')
+# Share of the validation split the combiner is fit on; the ensemble's validation accuracy is
+# reported on the rest, which the combiner never saw
+ENSEMBLE_FIT_FRACTION = float(os.getenv('ENSEMBLE_FIT_FRACTION', '0.5'))
+
+# Serving budget for model selection; candidates over budget are only chosen if none fit
+MAX_SINGLE_LATENCY_MS = float(os.getenv('MAX_SINGLE_LATENCY_MS', '10'))
+MAX_ARTIFACT_MB = float(os.getenv('MAX_ARTIFACT_MB', '100'))
+LATENCY_SAMPLE_SIZE = 200
+LATENCY_BATCH_SIZE = 256
+
+MODEL_PATH = 'best_enhanced_sentiment_model.pkl'
+MODEL_METADATA_PATH = 'best_enhanced_sentiment_model.json'
+
 # Additional imports for enhanced models
 import nltk
 from nltk.corpus import stopwords
@@ -56,38 +97,108 @@ def enhanced_preprocess_tweet(text):
     tokens = word_tokenize(text)
     
     # Remove stopwords
-    stop_words = set(stopwords.words('english'))
+    stop_words, lemmatizer = _get_text_tools()
     tokens = [word for word in tokens if word not in stop_words]
     
     # Lemmatization
-    lemmatizer = WordNetLemmatizer()
     tokens = [lemmatizer.lemmatize(word) for word in tokens]
     
     return ' '.join(tokens)
 
+_text_tools = None
+
+def _get_text_tools():
+    """
+    Stopword set and lemmatizer, built once per process instead of once per tweet.
+    """
+    global _text_tools
+    if _text_tools is None:
+        _text_tools = (set(stopwords.words('english')), WordNetLemmatizer())
+    return _text_tools
+
+def _preprocess_chunk(texts):
+    return [enhanced_preprocess_tweet(text) for text in texts]
+
+def preprocess_texts(texts):
+    """
+    Preprocess a list of texts, spread over worker processes when there is enough work.
+    """
+    texts = list(texts)
+    if len(texts) <= PREPROCESS_CHUNK_SIZE or PREPROCESS_N_JOBS == 1:
+        return _preprocess_chunk(texts)
+    
+    chunks = [texts[i:i + PREPROCESS_CHUNK_SIZE] for i in range(0, len(texts), PREPROCESS_CHUNK_SIZE)]
+    cleaned_chunks = Parallel(n_jobs=PREPROCESS_N_JOBS)(
+        delayed(_preprocess_chunk)(chunk) for chunk in chunks
+    )
+    return [text for chunk in cleaned_chunks for text in chunk]
+
+def preprocessing_cache_key():
+    """
+    Hash of the dataset identity and the exact preprocessing code.
+    """
+    config = {
+        'dataset': [DATASET_NAME, DATASET_CONFIG],
+        'preprocess_source': inspect.getsource(enhanced_preprocess_tweet),
+        'stopwords': 'english',
+        'lemmatizer': 'WordNetLemmatizer'
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def load_cached_corpus(cache_path):
+    """
+    Read the train/validation/test Parquet files, or return None if the cache is incomplete.
+    """
+    paths = [os.path.join(cache_path, f"{split}.parquet") for split in ('train', 'validation', 'test')]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    return tuple(pd.read_parquet(path) for path in paths)
+
+def save_cached_corpus(cache_path, splits):
+    """
+    Write each split to Parquet via a temporary file, so an interrupted run never leaves a partial cache.
+    """
+    os.makedirs(cache_path, exist_ok=True)
+    for split, df in splits.items():
+        path = os.path.join(cache_path, f"{split}.parquet")
+        tmp_path = f"{path}.tmp"
+        df[['text', 'label', 'cleaned_text']].to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
 def load_and_preprocess_data():
     """
-    Load tweet_eval dataset and preprocess with enhanced cleaning.
+    Load tweet_eval dataset and preprocess with enhanced cleaning, reusing the Parquet cache when present.
     """
-    print("Loading tweet_eval dataset...")
-    ds = load_dataset("tweet_eval", "sentiment")
-    
-    # Convert to pandas for easier manipulation
-    train_df = pd.DataFrame(ds["train"])
-    val_df = pd.DataFrame(ds["validation"])
-    test_df = pd.DataFrame(ds["test"])
+    cache_path = os.path.join(CORPUS_CACHE_DIR, f"{DATASET_NAME}-{DATASET_CONFIG}-{preprocessing_cache_key()}")
+    start = time.perf_counter()
+    cached = load_cached_corpus(cache_path)
+    
+    if cached is not None:
+        train_df, val_df, test_df = cached
+        print(f"Loaded preprocessed corpus from {cache_path} in {time.perf_counter() - start:.1f}s")
+    else:
+        print("Loading tweet_eval dataset...")
+        ds = load_dataset(DATASET_NAME, DATASET_CONFIG)
+        
+        # Convert to pandas for easier manipulation
+        train_df = pd.DataFrame(ds["train"])
+        val_df = pd.DataFrame(ds["validation"])
+        test_df = pd.DataFrame(ds["test"])
+        
+        # Enhanced preprocessing
+        print("Enhanced preprocessing text data...")
+        for df in (train_df, val_df, test_df):
+            df['cleaned_text'] = preprocess_texts(df['text'])
+        print(f"Preprocessed corpus in {time.perf_counter() - start:.1f}s")
+        
+        save_cached_corpus(cache_path, {'train': train_df, 'validation': val_df, 'test': test_df})
+        print(f"Cached preprocessed corpus in {cache_path}")
     
     print(f"Dataset sizes:")
     print(f"Train: {len(train_df)} samples")
     print(f"Validation: {len(val_df)} samples")
     print(f"Test: {len(test_df)} samples")
     
-    # Enhanced preprocessing
-    print("Enhanced preprocessing text data...")
-    train_df['cleaned_text'] = train_df['text'].apply(enhanced_preprocess_tweet)
-    val_df['cleaned_text'] = val_df['text'].apply(enhanced_preprocess_tweet)
-    test_df['cleaned_text'] = test_df['text'].apply(enhanced_preprocess_tweet)
-    
     # Label mapping
     label_map = {0: 'negative', 1: 'neutral', 2: 'positive'}
     train_df['sentiment'] = train_df['label'].map(label_map)
@@ -99,58 +210,109 @@ def load_and_preprocess_data():
     
     return train_df, val_df, test_df
 
-def train_enhanced_models(train_df, val_df, test_df):
+def vectorize_corpus(train_df, val_df, test_df, featurizer_kind=FEATURIZER):
+    """
+    Fit the featurizer once on the training text and transform every split; all candidates share the matrices.
+    FEATURIZER=hashing uses feature hashing with fitted IDF weights instead of a TF-IDF vocabulary.
+    """
+    start = time.perf_counter()
+    vectorizer = fit_featurizer(train_df['cleaned_text'], featurizer_kind)
+    features = {
+        'vectorizer': vectorizer,
+        'X_train': vectorizer.transform(train_df['cleaned_text']),
+        'X_val': vectorizer.transform(val_df['cleaned_text']),
+        'X_test': vectorizer.transform(test_df['cleaned_text'])
+    }
+    features['seconds'] = time.perf_counter() - start
+    print(f"Vectorized {features['X_train'].shape[0]} training texts into "
+          f"{features['X_train'].shape[1]} {featurizer_kind} features in {features['seconds']:.1f}s")
+    return features
+
+def get_model_candidates():
+    """
+    Candidate classifiers with the hyperparameter distributions searched for each.
+    """
+    return {
+        'Logistic Regression (Tuned)': (
+            LogisticRegression(random_state=42, max_iter=1000),
+            {'C': loguniform(0.1, 10)}
+        ),
+        'SVM (RBF Kernel)': (
+            SVC(kernel='rbf', random_state=42, gamma='scale', probability=True),
+            {'C': loguniform(0.3, 10)}
+        ),
+        'Gradient Boosting': (
+            GradientBoostingClassifier(random_state=42),
+            {'n_estimators': [50, 100], 'learning_rate': [0.05, 0.1, 0.2], 'max_depth': [3, 6]}
+        ),
+        'Extra Trees': (
+            ExtraTreesClassifier(random_state=42),
+            {'n_estimators': [100, 200], 'max_depth': [10, 20, None]}
+        ),
+        'Random Forest (Tuned)': (
+            RandomForestClassifier(random_state=42),
+            {'n_estimators': [100, 200], 'max_depth': [10, 20], 'min_samples_split': [2, 5]}
+        )
+    }
+
+def search_candidate(name, estimator, param_distributions, X_train, y_train):
+    """
+    Successive-halving random search for one candidate: poor configs are dropped after
+    training on a fraction of the data, and only the survivors see the full training set.
+    """
+    start = time.perf_counter()
+    search = HalvingRandomSearchCV(
+        estimator,
+        param_distributions,
+        n_candidates=TRAIN_SEARCH_CANDIDATES,
+        factor=HALVING_FACTOR,
+        cv=TRAIN_CV_FOLDS,
+        random_state=42,
+        n_jobs=1  # candidates already run in parallel
+    )
+    search.fit(X_train, y_train)
+    return name, search.best_estimator_, {
+        'best_params': search.best_params_,
+        'cv_score': search.best_score_,
+        'configs_evaluated': len(search.cv_results_['params']),
+        'train_seconds': time.perf_counter() - start
+    }
+
+def train_enhanced_models(train_df, val_df, test_df, features=None):
     """
-    Train enhanced models with hyperparameter tuning and new algorithms.
+    Train enhanced models with hyperparameter search, all candidates in parallel on shared TF-IDF features.
     """
     print("\n" + "="*50)
     print("TRAINING ENHANCED MODELS")
     print("="*50)
     
+    if features is None:
+        features = vectorize_corpus(train_df, val_df, test_df)
+    
     # Prepare data
-    X_train = train_df['cleaned_text']
+    X_train, X_val, X_test = features['X_train'], features['X_val'], features['X_test']
     y_train = train_df['label']
-    X_val = val_df['cleaned_text']
     y_val = val_df['label']
-    X_test = test_df['cleaned_text']
     y_test = test_df['label']
     
-    # Enhanced models with hyperparameter tuning
-    models = {
-        'Logistic Regression (Tuned)': Pipeline([
-            ('tfidf', TfidfVectorizer(max_features=15000, ngram_range=(1, 2), min_df=2, max_df=0.95)),
-            ('clf', LogisticRegression(random_state=42, max_iter=1000, C=1.0))
-        ]),
-        'SVM (RBF Kernel)': Pipeline([
-            ('tfidf', TfidfVectorizer(max_features=15000, ngram_range=(1, 2), min_df=2, max_df=0.95)),
-            ('clf', SVC(kernel='rbf', random_state=42, C=1.0, gamma='scale', probability=True))
-        ]),
-        'Gradient Boosting': Pipeline([
-            ('tfidf', TfidfVectorizer(max_features=15000, ngram_range=(1, 2), min_df=2, max_df=0.95)),
-            ('clf', GradientBoostingClassifier(random_state=42, n_estimators=100, learning_rate=0.1, max_depth=6))
-        ]),
-        'Extra Trees': Pipeline([
-            ('tfidf', TfidfVectorizer(max_features=15000, ngram_range=(1, 2), min_df=2, max_df=0.95)),
-            ('clf', ExtraTreesClassifier(n_estimators=100, random_state=42, max_depth=10))
-        ]),
-        'Random Forest (Tuned)': Pipeline([
-            ('tfidf', TfidfVectorizer(max_features=15000, ngram_range=(1, 2), min_df=2, max_df=0.95)),
-            ('clf', RandomForestClassifier(n_estimators=200, max_depth=10, min_samples_split=5, random_state=42))
-        ])
-    }
+    candidates = get_model_candidates()
+    print(f"Searching {len(candidates)} candidates ({TRAIN_SEARCH_CANDIDATES} configs each, "
+          f"{TRAIN_CV_FOLDS}-fold CV, n_jobs={TRAIN_N_JOBS})...")
+    
+    # IDF is fitted on the whole training split, so CV scores see a little of each held-out fold's
+    # vocabulary statistics; validation and test accuracy below are unaffected
+    searches = Parallel(n_jobs=TRAIN_N_JOBS)(
+        delayed(search_candidate)(name, estimator, params, X_train, y_train)
+        for name, (estimator, params) in candidates.items()
+    )
     
     results = {}
     
-    for name, model in models.items():
-        print(f"\nTraining {name}...")
-        
-        # Train model
-        model.fit(X_train, y_train)
-        
+    for name, clf, search_info in searches:
         # Predictions
-        y_pred_train = model.predict(X_train)
-        y_pred_val = model.predict(X_val)
-        y_pred_test = model.predict(X_test)
+        y_pred_train = clf.predict(X_train)
+        y_pred_val = clf.predict(X_val)
+        y_pred_test = clf.predict(X_test)
         
         # Calculate metrics
         train_acc = accuracy_score(y_train, y_pred_train)
@@ -162,16 +324,22 @@ def train_enhanced_models(train_df, val_df, test_df):
                                          target_names=['negative', 'neutral', 'positive'],
                                          output_dict=True)
         
+        # The shared vectorizer is already fitted, so the pipeline accepts raw text as before
+        model = Pipeline([('tfidf', features['vectorizer']), ('clf', clf)])
+        
         results[name] = {
             'model': model,
             'train_accuracy': train_acc,
             'val_accuracy': val_acc,
             'test_accuracy': test_acc,
             'classification_report': test_report,
-            'predictions': y_pred_test
+            'predictions': y_pred_test,
+            **search_info
         }
         
-        print(f"{name} Results:")
+        print(f"\n{name} Results:")
+        print(f"  Best Params: {search_info['best_params']} ({search_info['configs_evaluated']} configs evaluated)")
+        print(f"  Search Time: {search_info['train_seconds']:.1f}s")
         print(f"  Train Accuracy: {train_acc:.4f}")
         print(f"  Validation Accuracy: {val_acc:.4f}")
         print(f"  Test Accuracy: {test_acc:.4f}")
@@ -179,9 +347,10 @@ def train_enhanced_models(train_df, val_df, test_df):
     
     return results
 
-def create_ensemble_model(results, X_train, y_train, X_val, y_val, X_test, y_test):
+def create_ensemble_model(results, X_train, y_train, X_val, y_val, X_test, y_test, mode=ENSEMBLE_MODE):
     """
     Create an ensemble model combining the best performing models.
+    Members are reused as fitted (FrozenEstimator), so no member is trained a second time.
     """
     print("\n" + "="*50)
     print("CREATING ENSEMBLE MODEL")
@@ -191,51 +360,134 @@ def create_ensemble_model(results, X_train, y_train, X_val, y_val, X_test, y_tes
     sorted_models = sorted(results.items(), key=lambda x: x[1]['val_accuracy'], reverse=True)
     top_models = sorted_models[:3]
     
-    print(f"Creating ensemble with top 3 models:")
+    print(f"Creating {mode} ensemble with top 3 models:")
     for name, result in top_models:
         print(f"  - {name}: {result['val_accuracy']:.4f} validation accuracy")
     
-    # Create ensemble
-    estimators = [(name, result['model']) for name, result in top_models]
-    ensemble = VotingClassifier(estimators=estimators, voting='soft')
-    
-    # Train ensemble
-    print("Training ensemble model...")
-    ensemble.fit(X_train, y_train)
+    start = time.perf_counter()
+    
+    # Members that share one fitted vectorizer are combined behind it, so text is vectorized once per prediction
+    vectorizers = {id(result['model'].named_steps['tfidf']) for _, result in top_models}
+    if len(vectorizers) == 1:
+        vectorizer = top_models[0][1]['model'].named_steps['tfidf']
+        estimators = [(name, FrozenEstimator(result['model'].named_steps['clf'])) for name, result in top_models]
+    else:
+        vectorizer = None
+        estimators = [(name, FrozenEstimator(result['model'])) for name, result in top_models]
+    
+    # Members never saw the validation split, so their probabilities on it are held out. The combiner
+    # is fit on one part of it and scored on the other, so val_accuracy is not measured on its own training data
+    fit_X, eval_X, fit_y, eval_y = train_test_split(
+        X_val, y_val, train_size=ENSEMBLE_FIT_FRACTION, stratify=y_val, random_state=42
+    )
+    
+    if mode == 'stacking':
+        # Only the logistic-regression combiner is trained here
+        combiner = StackingClassifier(
+            estimators=estimators,
+            final_estimator=LogisticRegression(max_iter=1000),
+            stack_method='predict_proba',
+            cv=TRAIN_CV_FOLDS
+        )
+    elif mode == 'voting':
+        # Fitting only records the classes; frozen members are not refit
+        combiner = VotingClassifier(estimators=estimators, voting='soft')
+    else:
+        raise ValueError(f"Unknown ensemble mode '{mode}', expected 'voting' or 'stacking'")
+    
+    print("Combining fitted models...")
+    if vectorizer is not None:
+        combiner.fit(vectorizer.transform(fit_X), fit_y)
+        ensemble = Pipeline([('tfidf', vectorizer), ('clf', combiner)])
+    else:
+        combiner.fit(fit_X, fit_y)
+        ensemble = combiner
+    build_seconds = time.perf_counter() - start
+    print(f"Ensemble built in {build_seconds:.1f}s")
     
     # Evaluate ensemble
     y_pred_train = ensemble.predict(X_train)
-    y_pred_val = ensemble.predict(X_val)
+    y_pred_val = ensemble.predict(eval_X)
     y_pred_test = ensemble.predict(X_test)
     
     train_acc = accuracy_score(y_train, y_pred_train)
-    val_acc = accuracy_score(y_val, y_pred_val)
+    val_acc = accuracy_score(eval_y, y_pred_val)
     test_acc = accuracy_score(y_test, y_pred_test)
     
     test_report = classification_report(y_test, y_pred_test, 
                                      target_names=['negative', 'neutral', 'positive'],
                                      output_dict=True)
     
+    # Re-score the members on the same held-out items, so every validation accuracy compared
+    # against the ensemble comes from one sample; the full-split score is kept alongside
+    print(f"Re-scoring members on the {len(eval_y)} held-out validation items:")
+    for name, result in results.items():
+        result['val_accuracy_full'] = result['val_accuracy']
+        result['val_accuracy'] = accuracy_score(eval_y, result['model'].predict(eval_X))
+        result['val_accuracy_items'] = len(eval_y)
+        print(f"  - {name}: {result['val_accuracy']:.4f} (full validation split {result['val_accuracy_full']:.4f})")
+    
     ensemble_result = {
         'model': ensemble,
         'train_accuracy': train_acc,
         'val_accuracy': val_acc,
         'test_accuracy': test_acc,
         'classification_report': test_report,
-        'predictions': y_pred_test
+        'predictions': y_pred_test,
+        'train_seconds': build_seconds,
+        'ensemble_mode': mode,
+        'val_accuracy_items': len(eval_y)
     }
     
     print(f"Ensemble Results:")
     print(f"  Train Accuracy: {train_acc:.4f}")
-    print(f"  Validation Accuracy: {val_acc:.4f}")
+    print(f"  Validation Accuracy: {val_acc:.4f} (on {len(eval_y)} items the combiner was not fit on)")
     print(f"  Test Accuracy: {test_acc:.4f}")
     print(f"  Test F1-Score: {test_report['weighted avg']['f1-score']:.4f}")
     
     return ensemble_result
 
-def compare_enhanced_models(results, ensemble_result):
+def measure_serving_cost(model, texts):
     """
-    Compare all models including the ensemble.
+    Single-item latency (p50/p95), batch latency, throughput and pickled size of a text-in model.
+    """
+    texts = list(texts)
+    single_texts = texts[:LATENCY_SAMPLE_SIZE]
+    batch = (texts * (LATENCY_BATCH_SIZE // max(len(texts), 1) + 1))[:LATENCY_BATCH_SIZE]
+    
+    model.predict(single_texts[:1])  # warm-up
+    single_ms = []
+    for text in single_texts:
+        start = time.perf_counter()
+        model.predict([text])
+        single_ms.append((time.perf_counter() - start) * 1000)
+    
+    batch_ms = []
+    for _ in range(3):
+        start = time.perf_counter()
+        model.predict(batch)
+        batch_ms.append((time.perf_counter() - start) * 1000)
+    batch_latency = float(np.median(batch_ms))
+    
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    
+    return {
+        'single_p50_ms': float(np.percentile(single_ms, 50)),
+        'single_p95_ms': float(np.percentile(single_ms, 95)),
+        'batch_ms': batch_latency,
+        'throughput_per_s': LATENCY_BATCH_SIZE / (batch_latency / 1000),
+        'artifact_mb': buffer.tell() / 1e6
+    }
+
+def within_budget(serving, max_latency_ms=MAX_SINGLE_LATENCY_MS, max_artifact_mb=MAX_ARTIFACT_MB):
+    return serving['single_p95_ms'] <= max_latency_ms and serving['artifact_mb'] <= max_artifact_mb
+
+def compare_enhanced_models(results, ensemble_result, latency_texts=None,
+                            max_latency_ms=MAX_SINGLE_LATENCY_MS, max_artifact_mb=MAX_ARTIFACT_MB):
+    """
+    Compare all models including the ensemble, and pick the most accurate one that fits the
+    serving budget (p95 single-item latency and artifact size).
     """
     print("\n" + "="*50)
     print("ENHANCED MODEL COMPARISON")
@@ -244,38 +496,112 @@ def compare_enhanced_models(results, ensemble_result):
     # Add ensemble to results
     results['Ensemble'] = ensemble_result
     
+    if latency_texts is not None:
+        print(f"Measuring serving cost (budget: p95 <= {max_latency_ms}ms, size <= {max_artifact_mb}MB)...")
+        for result in results.values():
+            result['serving'] = measure_serving_cost(result['model'], latency_texts)
+    
     # Create comparison DataFrame
     comparison_data = []
     for name, result in results.items():
+        serving = result.get('serving', {})
         comparison_data.append({
             'Model': name,
             'Train Accuracy': result['train_accuracy'],
             'Validation Accuracy': result['val_accuracy'],
             'Test Accuracy': result['test_accuracy'],
-            'Test F1-Score': result['classification_report']['weighted avg']['f1-score']
+            'Test F1-Score': result['classification_report']['weighted avg']['f1-score'],
+            'Train Seconds': result.get('train_seconds'),
+            'p95 ms': serving.get('single_p95_ms'),
+            'Items/s': serving.get('throughput_per_s'),
+            'Size MB': serving.get('artifact_mb'),
+            'In Budget': within_budget(serving, max_latency_ms, max_artifact_mb) if serving else None
         })
     
     comparison_df = pd.DataFrame(comparison_data)
     comparison_df = comparison_df.sort_values('Test Accuracy', ascending=False)
     print(comparison_df.to_string(index=False))
     
-    # Find best model
-    best_model_name = comparison_df.iloc[0]['Model']
+    # Find best model, preferring candidates that are cheap enough to serve
+    eligible = comparison_df[comparison_df['In Budget'] != False]
+    if eligible.empty:
+        print("\n⚠️ No model fits the serving budget, selecting on accuracy alone")
+        eligible = comparison_df
+    best_row = eligible.iloc[0]
+    best_model_name = best_row['Model']
     best_result = results[best_model_name]
+    best_result['selection'] = {
+        'max_single_latency_ms': max_latency_ms,
+        'max_artifact_mb': max_artifact_mb,
+        'within_budget': best_row['In Budget'],
+        'most_accurate_model': comparison_df.iloc[0]['Model']
+    }
     
     print(f"\nBest Model: {best_model_name}")
     print(f"Test Accuracy: {best_result['test_accuracy']:.4f}")
     print(f"Test F1-Score: {best_result['classification_report']['weighted avg']['f1-score']:.4f}")
+    if 'serving' in best_result:
+        serving = best_result['serving']
+        print(f"Serving: p95 {serving['single_p95_ms']:.2f}ms, {serving['throughput_per_s']:.0f} items/s, "
+              f"{serving['artifact_mb']:.1f}MB")
     
+    best_result['comparison'] = comparison_df.to_dict(orient='records')
     return best_model_name, best_result
 
-def save_best_model(best_model_name, best_result):
+def training_data_hash(train_df):
     """
-    Save the best model for later use.
+    Hash of the training texts and labels, recorded with each registered model version.
+    """
+    row_hashes = pd.util.hash_pandas_object(train_df[['cleaned_text', 'label']], index=False)
+    return hashlib.sha256(row_hashes.values.tobytes()).hexdigest()[:16]
+
+def save_best_model(best_model_name, best_result, data_hash=None, validation_texts=None):
+    """
+    Save the best model for later use, with its metrics and serving costs in a JSON file beside it,
+    and register it as a new version in the model registry. With validation texts the linear parts
+    of the model are compressed, and the compressed artifact is the one registered for serving.
     """
     print(f"\nSaving best model: {best_model_name}")
-    joblib.dump(best_result['model'], 'best_enhanced_sentiment_model.pkl')
-    print("Model saved as 'best_enhanced_sentiment_model.pkl'")
+    joblib.dump(best_result['model'], MODEL_PATH)
+    print(f"Model saved as '{MODEL_PATH}'")
+    
+    serving_path, compression, serving = MODEL_PATH, None, best_result.get('serving')
+    if validation_texts is not None:
+        try:
+            compressed, compression = compress_model(best_result['model'], validation_texts)
+            joblib.dump(compressed, COMPRESSED_MODEL_PATH)
+            serving_path = COMPRESSED_MODEL_PATH
+            # The registry serves the compressed artifact, so its metadata carries that model's costs
+            compression['original_serving'] = best_result.get('serving')
+            serving = measure_serving_cost(compressed, validation_texts)
+            print(f"Compressed model saved as '{COMPRESSED_MODEL_PATH}' "
+                  f"({compression['original_bytes'] / 1e6:.1f}MB -> {compression['compressed_bytes'] / 1e6:.1f}MB, "
+                  f"agreement {compression['agreement']:.2%})")
+        except ValueError as e:
+            # Nothing linear to compress, or too much disagreement; serve the full model
+            print(f"Model not compressed: {e}")
+    
+    metadata = {
+        'model_name': best_model_name,
+        'featurizer': FEATURIZER,
+        'saved_at': datetime.now(timezone.utc).isoformat(),
+        'test_accuracy': best_result['test_accuracy'],
+        'val_accuracy': best_result['val_accuracy'],
+        'test_f1': best_result['classification_report']['weighted avg']['f1-score'],
+        'serving': serving,
+        'selection': best_result.get('selection'),
+        'candidates': best_result.get('comparison'),
+        'compression': compression,
+        'training_data_hash': data_hash
+    }
+    with open(MODEL_METADATA_PATH, 'w') as f:
+        json.dump(metadata, f, indent=2, default=lambda value: value.item() if isinstance(value, np.generic) else str(value))
+    print(f"Model metadata saved as '{MODEL_METADATA_PATH}'")
+    
+    # Serving picks the version up once it is activated (the first version is activated right away)
+    metadata['model_path'] = serving_path
+    version = ModelRegistry().register(serving_path, metadata)
+    print(f"Registered '{serving_path}' as model version {version}")
 
 def plot_enhanced_results(results):
     """
@@ -304,9 +630,35 @@ def plot_enhanced_results(results):
     plt.savefig('enhanced_model_comparison.png', dpi=300, bbox_inches='tight')
     plt.show()
 
+@contextmanager
+def timed_phase(timings, phase):
+    """
+    Record the wall-clock time of one training phase.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = time.perf_counter() - start
+
+def print_phase_timings(timings):
+    """
+    Print the time spent in each training phase.
+    """
+    print("\n" + "="*50)
+    print("TRAINING TIME BY PHASE")
+    print("="*50)
+    total = sum(timings.values())
+    for phase, seconds in timings.items():
+        print(f"  {phase:<28} {seconds:8.1f}s  {seconds / total * 100:5.1f}%")
+    print(f"  {'Total':<28} {total:8.1f}s")
+
 if __name__ == "__main__":
+    timings = {}
+    
     # Load and preprocess data
-    train_df, val_df, test_df = load_and_preprocess_data()
+    with timed_phase(timings, 'Load and preprocess'):
+        train_df, val_df, test_df = load_and_preprocess_data()
     
     # Prepare data for ensemble
     X_train = train_df['cleaned_text']
@@ -316,17 +668,25 @@ if __name__ == "__main__":
     X_test = test_df['cleaned_text']
     y_test = test_df['label']
     
-    # Train enhanced models
-    results = train_enhanced_models(train_df, val_df, test_df)
+    # Vectorize once, then train enhanced models
+    with timed_phase(timings, 'Vectorize'):
+        features = vectorize_corpus(train_df, val_df, test_df)
+    with timed_phase(timings, 'Model search and evaluation'):
+        results = train_enhanced_models(train_df, val_df, test_df, features)
     
     # Create ensemble
-    ensemble_result = create_ensemble_model(results, X_train, y_train, X_val, y_val, X_test, y_test)
+    with timed_phase(timings, 'Ensemble'):
+        ensemble_result = create_ensemble_model(results, X_train, y_train, X_val, y_val, X_test, y_test)
     
     # Compare and select best model
-    best_model_name, best_result = compare_enhanced_models(results, ensemble_result)
+    with timed_phase(timings, 'Compare'):
+        best_model_name, best_result = compare_enhanced_models(results, ensemble_result, X_test)
     
     # Save best model
-    save_best_model(best_model_name, best_result)
+    with timed_phase(timings, 'Save'):
+        save_best_model(best_model_name, best_result, training_data_hash(train_df), X_val.tolist())
+    
+    print_phase_timings(timings)
     
     # Plot results
     plot_enhanced_results(results)
@@ -338,9 +698,9 @@ if __name__ == "__main__":
     print("1. Enhanced text preprocessing (stopwords, lemmatization)")
     print("2. Better TF-IDF parameters")
     print("3. Added Gradient Boosting and Extra Trees")
-    print("4. Hyperparameter tuning")
+    print("4. Hyperparameter search with successive halving, candidates trained in parallel")
     print("5. Ensemble model combining top performers")
     print("\nNext steps:")
-    print("1. Use 'best_enhanced_sentiment_model.pkl' for predictions")
+    print(f"1. Use '{MODEL_PATH}' for predictions (metrics in '{MODEL_METADATA_PATH}')")
     print("2. Build your Streamlit dashboard")
     print("3. Test on real-time tweets") 
\ No newline at end of file
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Out-of-Core Sentiment Training
+Streams preprocessed text from Parquet/CSV/JSONL files in chunks and fits the hashed-feature
+SGD model with mini-batch updates, so corpora far larger than memory train on an ordinary machine.
+
+Usage: python train_streaming.py items-2024-*.parquet [more files...]
+Each file needs a text column and a label column ('label' 0/1/2 or 'sentiment'). A 'cleaned_text' column is
+used as is; otherwise 'text' is cleaned with the same preprocessing the API applies before prediction.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import resource
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from model_registry import ModelRegistry
+from online_learner import CLASSES, LABEL_CODES, ONLINE_SEED_MODEL_PATH, make_online_model
+from sentiment_inference import enhanced_preprocess_tweet
+
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '50000'))
+STREAM_EPOCHS = int(os.getenv('STREAM_EPOCHS', '2'))
+# Rows whose text hashes into this percentage are held out for evaluation, in every file
+STREAM_HOLDOUT_PERCENT = int(os.getenv('STREAM_HOLDOUT_PERCENT', '5'))
+# The online learner starts from this model when it has none of its own
+STREAM_MODEL_PATH = os.getenv('STREAM_MODEL_PATH', ONLINE_SEED_MODEL_PATH)
+
+
+def read_chunks(path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield DataFrame chunks from a Parquet, CSV or JSON-lines file without loading it whole"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif path.endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif path.endswith('.jsonl') or path.endswith('.json'):
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        raise ValueError(f"Unsupported training file '{path}', expected .parquet, .csv or .jsonl")
+
+
+def chunk_texts_and_labels(chunk: pd.DataFrame):
+    """Texts, integer labels and holdout mask of one chunk; rows without a usable label are dropped"""
+    if 'label' in chunk.columns:
+        labels = pd.to_numeric(chunk['label'], errors='coerce')
+    else:
+        labels = chunk['sentiment'].map(LABEL_CODES)
+    if 'cleaned_text' in chunk.columns:
+        texts = chunk['cleaned_text'].fillna('').astype(str)
+    else:
+        # Train on the features serving will see
+        texts = chunk['text'].map(enhanced_preprocess_tweet)
+    keep = labels.isin(CLASSES).to_numpy() & (texts.str.len() > 0).to_numpy()
+    texts = texts[keep].tolist()
+    labels = labels[keep].to_numpy(dtype=np.int64)
+    holdout = np.fromiter(
+        (zlib.crc32(text.encode('utf-8')) % 100 < STREAM_HOLDOUT_PERCENT for text in texts),
+        dtype=bool, count=len(texts)
+    )
+    return texts, labels, holdout
+
+
+def evaluate_holdout(model, paths: List[str]) -> Dict:
+    """Accuracy and per-class recall on the holdout rows, streamed from disk"""
+    confusion = np.zeros((len(CLASSES), len(CLASSES)), dtype=np.int64)
+    for path in paths:
+        for chunk in read_chunks(path):
+            texts, labels, holdout = chunk_texts_and_labels(chunk)
+            if not holdout.any():
+                continue
+            predicted = model.predict([text for text, held in zip(texts, holdout) if held])
+            np.add.at(confusion, (labels[holdout], predicted), 1)
+    total = confusion.sum()
+    return {
+        'rows': int(total),
+        'accuracy': float(np.trace(confusion) / total) if total else None,
+        'recall': {
+            name: float(confusion[code, code] / confusion[code].sum()) if confusion[code].sum() else None
+            for name, code in (('negative', 0), ('neutral', 1), ('positive', 2))
+        }
+    }
+
+
+def files_hash(paths: List[str]) -> str:
+    """Identity of the training files (path, size, modification time), without reading them again"""
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def train_streaming(paths: List[str], epochs: int = STREAM_EPOCHS, model_path: str = STREAM_MODEL_PATH) -> Dict:
+    """Fit the online model over every file, chunk by chunk, for the given number of epochs.
+
+    The model is registered as an inactive version in the model registry; activate it, or try it
+    as a shadow candidate, through the API.
+    """
+    model = make_online_model()
+    vectorizer, clf = model.named_steps['tfidf'], model.named_steps['clf']
+    rng = np.random.default_rng(42)
+    start = time.perf_counter()
+    report = {'files': paths, 'epochs': []}
+
+    for epoch in range(1, epochs + 1):
+        epoch_start = time.perf_counter()
+        trained_rows = 0
+        progressive_correct = 0
+        progressive_rows = 0
+        for path in paths:
+            for chunk in read_chunks(path):
+                texts, labels, holdout = chunk_texts_and_labels(chunk)
+                train_idx = np.flatnonzero(~holdout)
+                if not len(train_idx):
+                    continue
+                # Files are often sorted by time or source; shuffle within the chunk for SGD
+                train_idx = rng.permutation(train_idx)
+                features = vectorizer.transform([texts[i] for i in train_idx])
+                chunk_labels = labels[train_idx]
+
+                # Progressive validation: score each chunk before learning from it
+                if trained_rows:
+                    progressive_correct += int((clf.predict(features) == chunk_labels).sum())
+                    progressive_rows += len(train_idx)
+                clf.partial_fit(features, chunk_labels, classes=CLASSES)
+                trained_rows += len(train_idx)
+                print(f"  epoch {epoch}: {trained_rows:,} rows trained"
+                      + (f", progressive accuracy {progressive_correct / progressive_rows:.4f}" if progressive_rows else ""))
+
+        holdout = evaluate_holdout(model, paths)
+        report['epochs'].append({
+            'epoch': epoch,
+            'trained_rows': trained_rows,
+            'progressive_accuracy': progressive_correct / progressive_rows if progressive_rows else None,
+            'holdout': holdout,
+            'seconds': round(time.perf_counter() - epoch_start, 2)
+        })
+        print(f"Epoch {epoch}: holdout accuracy {holdout['accuracy']} on {holdout['rows']:,} rows")
+
+    report.update({
+        'trained_at': datetime.now(timezone.utc).isoformat(),
+        'total_seconds': round(time.perf_counter() - start, 2),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_memory_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    })
+
+    tmp_path = f"{model_path}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, model_path)
+    with open(f"{os.path.splitext(model_path)[0]}.json", 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Model saved as '{model_path}' ({report['total_seconds']}s, peak memory {report['peak_memory_mb']}MB)")
+
+    final_holdout = report['epochs'][-1]['holdout'] if report['epochs'] else {}
+    report['version'] = ModelRegistry().register(model_path, {
+        'model_name': 'SGD (hashed features, streaming)',
+        'featurizer': 'hashing',
+        'saved_at': report['trained_at'],
+        'val_accuracy': final_holdout.get('accuracy'),
+        'holdout': final_holdout,
+        'training_files': paths,
+        'training_data_hash': files_hash(paths),
+        'model_path': model_path
+    }, activate=False)
+    return report
+
+
+if __name__ == "__main__":
+    patterns = sys.argv[1:] or [os.getenv('STREAM_TRAIN_DATA', '')]
+    paths = sorted(path for pattern in patterns if pattern for path in glob.glob(pattern))
+    if not paths:
+        print(__doc__)
+        sys.exit(1)
+
+    print("=" * 50)
+    print(f"STREAMING TRAINING ON {len(paths)} FILE(S)")
+    print("=" * 50)
+    train_streaming(paths)